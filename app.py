@@ -1,7 +1,11 @@
 """
-Entry point for the construction project management chatbot.
+Development entry point for the construction project management chatbot.
+
+This runs Flask's debug server. In production use
+``gunicorn -c gunicorn.conf.py wsgi:app`` instead.
 """
 import os
+from config import DevelopmentConfig
 from main import create_app
 
 def main():
@@ -11,11 +15,11 @@ def main():
         port = int(os.environ.get('PORT', 5000))
         
         # Create Flask app
-        app = create_app()
+        app = create_app(DevelopmentConfig)
         
         # Run the app
-        print(f"Starting chatbot server on port {port}")
-        app.run(host='0.0.0.0', port=port, debug=True)
+        print(f"Starting chatbot development server on port {port}")
+        app.run(host='0.0.0.0', port=port, debug=app.debug)
         
     except Exception as e:
         print(f"Error starting application: {e}")
@@ -0,0 +1,6 @@
+"""
+ASGI entry point: ``uvicorn asgi:app --host 0.0.0.0 --port 5000``.
+"""
+from main import create_asgi_app
+
+app = create_asgi_app()
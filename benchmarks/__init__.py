@@ -0,0 +1,11 @@
+"""
+Offline benchmarks for the chat API.
+
+    python -m benchmarks.fixture --projects 500 --reset    # seed construction_bench
+    python -m benchmarks.run --requests 2000 --concurrency 16 --workers 2
+
+The runner starts ``create_app()`` (or the ASGI app) against the seeded
+database with a deterministic fake Gemini model, replays a mix of
+intercepted and LLM-fallback questions and reports throughput, latency
+percentiles and memory per worker.
+"""
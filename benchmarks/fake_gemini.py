@@ -0,0 +1,107 @@
+"""
+A deterministic stand-in for the Gemini model.
+
+FakeGeminiClient is the real GeminiClient with its model swapped for
+FakeModel, so prompt building, response parsing, streaming and the LLM
+metrics all run as in production; only the network call is replaced by a
+fixed delay and a canned answer chosen from the prompt.
+"""
+import re
+import json
+import time
+import asyncio
+from typing import Dict, Optional
+from chatbot.gemini_client import GeminiClient
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = completion_tokens
+
+class FakeResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.usage_metadata = FakeUsage(len(prompt) // 4, len(text) // 4)
+
+class FakeStream:
+    """Iterable (sync or async) of chunks, each with a ``text``."""
+    def __init__(self, text: str, prompt: str, delay: float, chunk_size: int):
+        parts = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or ['']
+        self.chunks = [FakeResponse(part, '') for part in parts]
+        self.delay = delay / len(self.chunks)
+        self.usage_metadata = FakeUsage(len(prompt) // 4, len(text) // 4)
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+class FakeModel:
+    def __init__(self, sql_by_question: Optional[Dict[str, str]] = None,
+                 latency: float = 0.3, chunk_size: int = 40):
+        """Answer prompts after ``latency`` seconds (spread over the chunks when streaming).
+
+        ``sql_by_question`` gives the SQL to plan for a user message;
+        messages not in it are answered directly.
+        """
+        self.sql_by_question = sql_by_question or {}
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self.answer(contents)
+        if stream:
+            return FakeStream(text, contents, self.latency, self.chunk_size)
+        time.sleep(self.latency)
+        return FakeResponse(text, contents)
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self.answer(contents)
+        if stream:
+            return FakeStream(text, contents, self.latency, self.chunk_size)
+        await asyncio.sleep(self.latency)
+        return FakeResponse(text, contents)
+
+    @staticmethod
+    def _last(pattern: str, prompt: str) -> str:
+        matches = re.findall(pattern, prompt)
+        return matches[-1].strip() if matches else ''
+
+    def answer(self, prompt: str) -> str:
+        """The canned answer for one of GeminiClient's prompt shapes."""
+        if 'Respond with **only** this JSON object' in prompt:
+            question = self._last(r'User: (.*?)\n\nDecide whether', prompt)
+            sql = self.sql_by_question.get(question)
+            return json.dumps({
+                'needs_database': sql is not None,
+                'sql': sql,
+                'answer': None if sql else "I can help with project status, phases, budgets and invoices.",
+            })
+        if 'Analyze this user message' in prompt:
+            question = self._last(r'User Message: (.*)', prompt)
+            return json.dumps({
+                'needs_database': question in self.sql_by_question,
+                'explanation': 'benchmark',
+                'suggested_approach': 'benchmark',
+            })
+        if 'Generate a SQL query' in prompt:
+            question = self._last(r'User Request: (.*)', prompt)
+            return self.sql_by_question.get(question, 'SELECT 1 AS one')
+        if 'Format these database query results' in prompt:
+            rows = self._last(r'Rows: (\d+)', prompt) or '0'
+            question = self._last(r"User's Question: (.*)", prompt)
+            return f"**{question}**\n\nThe query returned {rows} rows. " + "Summary line. " * 20
+        return "I can help with project status, phases, budgets and invoices. " * 3
+
+class FakeGeminiClient(GeminiClient):
+    def __init__(self, sql_by_question: Optional[Dict[str, str]] = None, latency: float = 0.3):
+        super().__init__(api_key='benchmark')
+        self.model = FakeModel(sql_by_question, latency)
@@ -0,0 +1,241 @@
+"""
+Seed a local benchmark database with the chatbot's core tables.
+
+Creates ``project_templates``, ``users``, ``leads``, ``projects``, ``phases``,
+``subphases`` and ``invoices`` (the columns the chat handlers and intents query) and fills
+them with deterministic rows, loaded with COPY. ``--projects`` sets the
+scale; everything else is derived from it.
+
+    createdb construction_bench
+    python -m benchmarks.fixture --projects 500 --reset
+"""
+import sys
+import random
+import argparse
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict
+import psycopg
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_NAME = 'construction_bench'
+
+TABLES = ('invoices', 'subphases', 'phases', 'projects', 'leads', 'users', 'project_templates')
+
+DDL = """
+CREATE TABLE project_templates (
+    id serial PRIMARY KEY,
+    name text UNIQUE NOT NULL
+);
+CREATE TABLE users (
+    id serial PRIMARY KEY,
+    "firstName" text NOT NULL,
+    "lastName" text NOT NULL,
+    email text UNIQUE NOT NULL,
+    "createdAt" timestamptz NOT NULL DEFAULT now(),
+    "updatedAt" timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE leads (
+    id serial PRIMARY KEY,
+    "firstName" text NOT NULL,
+    "lastName" text NOT NULL,
+    email text,
+    "createdAt" timestamptz NOT NULL DEFAULT now(),
+    "updatedAt" timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE projects (
+    id serial PRIMARY KEY,
+    name text UNIQUE NOT NULL,
+    client_id integer REFERENCES leads (id),
+    project_designer_id integer REFERENCES users (id),
+    project_template_id integer REFERENCES project_templates (id),
+    "percentComplete" numeric(5,2) NOT NULL DEFAULT 0,
+    "startDate" date,
+    "createdAt" timestamptz NOT NULL DEFAULT now(),
+    "updatedAt" timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE phases (
+    id serial PRIMARY KEY,
+    project_id integer NOT NULL REFERENCES projects (id),
+    name text NOT NULL,
+    "order" integer NOT NULL,
+    status text NOT NULL,
+    "createdAt" timestamptz NOT NULL DEFAULT now(),
+    "updatedAt" timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE subphases (
+    id serial PRIMARY KEY,
+    phase_id integer NOT NULL REFERENCES phases (id),
+    name text NOT NULL,
+    "order" integer NOT NULL,
+    status text NOT NULL,
+    "createdAt" timestamptz NOT NULL DEFAULT now(),
+    "updatedAt" timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE invoices (
+    id serial PRIMARY KEY,
+    customer_id integer NOT NULL REFERENCES leads (id),
+    "invoiceNumber" text UNIQUE NOT NULL,
+    "totalAmount" numeric(12,2) NOT NULL,
+    "paymentStatus" text NOT NULL,
+    "paymentDate" date,
+    "createdAt" timestamptz NOT NULL DEFAULT now(),
+    "updatedAt" timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX ON projects (client_id);
+CREATE INDEX ON projects (project_designer_id);
+CREATE INDEX ON projects (project_template_id);
+CREATE INDEX ON phases (project_id);
+CREATE INDEX ON subphases (phase_id);
+CREATE INDEX ON invoices (customer_id);
+"""
+
+STREETS = [
+    'CABOT', 'ELM', 'MAPLE', 'HARBOR', 'RIVER', 'OAK', 'CEDAR', 'BIRCH', 'SUMMIT', 'LAKE',
+    'WILLOW', 'PARK', 'MILL', 'BRIDGE', 'HILL', 'ASPEN', 'PINE', 'MEADOW', 'GROVE', 'UNION',
+]
+
+TEMPLATES = ['Kitchen Remodel', 'Bathroom Remodel', 'Home Addition', 'Whole-House Renovation',
+             'New Construction', 'Basement Finish']
+
+FIRST_NAMES = ['Ana', 'Ben', 'Chloe', 'David', 'Elena', 'Farid', 'Grace', 'Hugo', 'Iris', 'Jonas',
+               'Kara', 'Liam', 'Maya', 'Noah', 'Olga', 'Pavel', 'Quinn', 'Rosa', 'Sam', 'Tara']
+LAST_NAMES = ['Adams', 'Brooks', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen',
+              'Khan', 'Lopez', 'Murphy', 'Novak', 'Okafor', 'Patel', 'Reyes', 'Silva', 'Tanaka', 'Weber']
+
+# Phase -> subphases, in build order
+PHASES = [
+    ('Pre-Construction', ['Site Survey', 'Permits', 'Design Review', 'Budget Approval']),
+    ('Demolition', ['Utility Disconnect', 'Interior Demo', 'Debris Removal']),
+    ('Foundation', ['Excavation', 'Footings', 'Waterproofing', 'Backfill']),
+    ('Framing', ['Floor Framing', 'Wall Framing', 'Roof Framing', 'Sheathing', 'Framing Inspection']),
+    ('Rough-In', ['Plumbing Rough-In', 'Electrical Rough-In', 'HVAC Rough-In', 'Rough-In Inspection']),
+    ('Drywall', ['Insulation', 'Hanging', 'Taping', 'Sanding']),
+    ('Finishes', ['Cabinets', 'Countertops', 'Flooring', 'Paint', 'Fixtures', 'Selections Walkthrough']),
+    ('Closeout', ['Punch List', 'Final Inspection', 'Client Walkthrough', 'Handover']),
+]
+
+def project_name(index: int, rng: random.Random) -> str:
+    """Project keys like CABOT-12B (unique per index)."""
+    street = STREETS[index % len(STREETS)]
+    number = index // len(STREETS) + 1
+    return f"{street}-{number}{rng.choice('AB')}"
+
+def generate(projects: int, seed: int = 42) -> Dict[str, list]:
+    """Rows for every table (as tuples in COLUMNS order), deterministic for ``seed``."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    rows = {table: [] for table in TABLES}
+    rows['project_templates'] = [(i, name) for i, name in enumerate(TEMPLATES, start=1)]
+
+    designers = max(5, projects // 20)
+    for i in range(1, designers + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows['users'].append((i, first, last, f"{first}.{last}.{i}@example.com".lower(), now, now))
+
+    phase_id = subphase_id = invoice_id = 0
+    for i in range(1, projects + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows['leads'].append((i, first, last, f"client{i}@example.com", now, now))
+
+        # Completed phases, then one in progress, then not started
+        current = rng.randint(0, len(PHASES))
+        done = total = 0
+        project_phases = []
+        for order, (name, tasks) in enumerate(PHASES, start=1):
+            phase_id += 1
+            if order <= current:
+                status, completed = 'Completed', len(tasks)
+            elif order == current + 1:
+                status, completed = 'In Progress', rng.randint(0, len(tasks) - 1)
+            else:
+                status, completed = 'Not Started', 0
+            project_phases.append((phase_id, i, name, order, status, now, now))
+            for task_order, task in enumerate(tasks, start=1):
+                subphase_id += 1
+                task_status = 'Completed' if task_order <= completed else (
+                    'In Progress' if task_order == completed + 1 and status == 'In Progress' else 'Not Started'
+                )
+                rows['subphases'].append((subphase_id, phase_id, task, task_order, task_status, now, now))
+            done += completed
+            total += len(tasks)
+        rows['phases'].extend(project_phases)
+
+        start = today - timedelta(days=rng.randint(30, 3 * 365))
+        rows['projects'].append((
+            i, project_name(i - 1, rng), i, rng.randint(1, designers), rng.randint(1, len(TEMPLATES)),
+            round(100 * done / total, 2), start, now, now
+        ))
+
+        for _ in range(rng.randint(0, 8)):
+            invoice_id += 1
+            status = rng.choices(['Paid', 'Pending', 'Overdue'], weights=[70, 20, 10])[0]
+            paid = start + timedelta(days=rng.randint(0, max((today - start).days, 1)))
+            rows['invoices'].append((
+                invoice_id, i, f"INV-{invoice_id:07d}", round(rng.lognormvariate(9.5, 0.8), 2),
+                status, paid if status == 'Paid' else None, now, now
+            ))
+    return rows
+
+COLUMNS = {
+    'project_templates': ('id', 'name'),
+    'users': ('id', '"firstName"', '"lastName"', 'email', '"createdAt"', '"updatedAt"'),
+    'leads': ('id', '"firstName"', '"lastName"', 'email', '"createdAt"', '"updatedAt"'),
+    'projects': ('id', 'name', 'client_id', 'project_designer_id', 'project_template_id',
+                 '"percentComplete"', '"startDate"', '"createdAt"', '"updatedAt"'),
+    'phases': ('id', 'project_id', 'name', '"order"', 'status', '"createdAt"', '"updatedAt"'),
+    'subphases': ('id', 'phase_id', 'name', '"order"', 'status', '"createdAt"', '"updatedAt"'),
+    'invoices': ('id', 'customer_id', '"invoiceNumber"', '"totalAmount"', '"paymentStatus"',
+                 '"paymentDate"', '"createdAt"', '"updatedAt"'),
+}
+
+def seed(conn_string: str, projects: int, seed: int = 42, reset: bool = False) -> Dict[str, int]:
+    """Create the tables and COPY the generated rows in; returns row counts per table."""
+    rows = generate(projects, seed)
+    with psycopg.connect(conn_string) as conn:
+        with conn.cursor() as cursor:
+            if reset:
+                # CASCADE also drops views built on them (e.g. the rollups)
+                cursor.execute("DROP TABLE IF EXISTS " + ", ".join(TABLES) + " CASCADE")
+            cursor.execute("SELECT to_regclass('projects') IS NOT NULL")
+            if cursor.fetchone()[0]:
+                raise RuntimeError("Benchmark tables already exist; pass --reset to recreate them")
+            cursor.execute(DDL)
+            # Parents before children
+            for table in reversed(TABLES):
+                with cursor.copy(f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN") as copy:
+                    for row in rows[table]:
+                        copy.write_row(row)
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST(MAX(id), 1)) FROM {table}"
+                )
+            for table in reversed(TABLES):
+                cursor.execute(f"ANALYZE {table}")
+    return {table: len(rows[table]) for table in reversed(TABLES)}
+
+def main(argv=None) -> int:
+    from config import Config
+    from database.db_connector import build_conn_string
+
+    parser = argparse.ArgumentParser(description='Seed the benchmark database.')
+    parser.add_argument('--projects', type=int, default=200, help='number of projects (sets the scale)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--db-name', default=DEFAULT_DB_NAME, help='database to seed (must exist)')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate the benchmark tables')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    conn_string = build_conn_string(dict(Config.DB_CONFIG, dbname=args.db_name))
+    try:
+        counts = seed(conn_string, args.projects, args.seed, args.reset)
+    except Exception as e:
+        logger.error(f"Seeding {args.db_name} failed: {e}")
+        return 1
+    for table, count in counts.items():
+        print(f"{table:<17} {count:>10,} rows")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Replay the benchmark question mix against the chat API.
+
+Each worker process builds the app the way a server worker would
+(``create_app()``, or ``create_asgi_app()`` with ``--asgi``) against the
+benchmark database, swaps in the fake Gemini model and sends its share of
+requests at ``--concurrency``. The report gives overall throughput, latency
+percentiles (overall and per question kind) and each worker's memory.
+
+    python -m benchmarks.run --requests 2000 --concurrency 16 --workers 2 --output before.json
+    python -m benchmarks.run --requests 2000 --concurrency 16 --workers 2 --compare before.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import logging
+import resource
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .fixture import DEFAULT_DB_NAME
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def latency_summary(latencies: List[float]) -> Dict:
+    values = sorted(latencies)
+    summary = {f"p{p}": round(percentile(values, p), 2) for p in PERCENTILES}
+    summary['mean'] = round(sum(values) / len(values), 2) if values else 0.0
+    summary['max'] = round(values[-1], 2) if values else 0.0
+    return summary
+
+def rss_mb() -> Dict:
+    """Current and peak resident memory of this process, in MB."""
+    current = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    return {'rss_mb': round(current, 1) if current is not None else None, 'peak_rss_mb': round(peak, 1)}
+
+def configure_environment(options: Dict):
+    """Point Config at the benchmark database (before config is imported)."""
+    os.environ['DB_NAME'] = options['db_name']
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    os.environ['SCHEMA_CACHE_PATH'] = 'cache/benchmark_schema_catalog.json'
+    os.environ['RESPONSE_CACHE_ENABLED'] = 'False' if options['no_cache'] else 'True'
+    os.environ['SQL_CACHE_ENABLED'] = 'False' if options['no_cache'] else 'True'
+    os.environ['DB_POOL_MAX_SIZE'] = str(max(options['concurrency'], int(os.environ.get('DB_POOL_MAX_SIZE', 10))))
+    os.makedirs('logs', exist_ok=True)
+
+def _build(options: Dict):
+    """The app and the shared chat handler, with the fake model in place."""
+    from .fake_gemini import FakeGeminiClient
+    from .workload import fallback_sql
+    from main import create_app, create_asgi_app
+
+    app = create_asgi_app() if options['asgi'] else create_app(warm_services=False)
+    logging.getLogger().setLevel(logging.WARNING)
+    import services
+    # Start up in the foreground so startup_ms covers the database and cache warm-up
+    services.init()
+    services.chat_handler.gemini = FakeGeminiClient(fallback_sql(), latency=options['llm_latency'])
+    return app, services
+
+def _record(results: List, kind: str, started: float, status: int, body) -> None:
+    if isinstance(body, str):
+        ok = status == 200 and 'event: done' in body
+    else:
+        ok = status == 200 and bool(body) and body.get('success', False)
+    results.append((kind, (time.perf_counter() - started) * 1000, ok))
+
+def _run_wsgi(app, questions, options: Dict, worker: int) -> List:
+    path = '/api/chat/stream' if options['stream'] else '/api/chat'
+    results = []
+
+    def send(i, kind, question):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(path, json={'message': question, 'chat_id': f"bench-{worker}-{i % 50}"})
+        body = response.get_data(as_text=True) if options['stream'] else response.get_json()
+        _record(results, kind, started, response.status_code, body)
+
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+        for future in [pool.submit(send, i, kind, q) for i, (kind, q) in enumerate(questions)]:
+            future.result()
+    return results
+
+async def _run_asgi(app, questions, options: Dict, worker: int) -> List:
+    path = '/api/chat/stream' if options['stream'] else '/api/chat'
+    results = []
+    semaphore = asyncio.Semaphore(options['concurrency'])
+
+    async with app.test_app() as test_app:
+        client = test_app.test_client()
+
+        async def send(i, kind, question):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(path, json={'message': question, 'chat_id': f"bench-{worker}-{i % 50}"})
+                body = await response.get_data(as_text=True) if options['stream'] else await response.get_json()
+                _record(results, kind, started, response.status_code, body)
+
+        await asyncio.gather(*(send(i, kind, q) for i, (kind, q) in enumerate(questions)))
+    return results
+
+def worker_main(worker: int, options: Dict, barrier, output):
+    """One worker process: build the app, warm up, wait for the others, then measure."""
+    try:
+        configure_environment(options)
+        build_started = time.perf_counter()
+        app, services = _build(options)
+        startup_ms = (time.perf_counter() - build_started) * 1000
+        output.put(_measure(worker, options, barrier, app, services, startup_ms))
+    except Exception as e:
+        # Don't leave the other workers waiting at the barrier
+        barrier.abort()
+        output.put({'worker': worker, 'error': f"{type(e).__name__}: {e}"})
+
+def _measure(worker: int, options: Dict, barrier, app, services, startup_ms: float) -> Dict:
+    from .workload import build_workload
+
+    names = services.project_index.names()
+    share = options['requests'] // options['workers'] + (worker < options['requests'] % options['workers'])
+    warmup = build_workload(names, options['warmup'], options['intercept_ratio'], seed=options['seed'] + 1000 + worker)
+    questions = build_workload(names, share, options['intercept_ratio'], seed=options['seed'] + worker)
+
+    def run(batch):
+        if options['asgi']:
+            return asyncio.run(_run_asgi(app, batch, options, worker))
+        return _run_wsgi(app, batch, options, worker)
+
+    run(warmup)
+    barrier.wait()
+    started = time.time()
+    results = run(questions)
+    finished = time.time()
+    return {
+        'worker': worker,
+        'pid': os.getpid(),
+        'startup_ms': round(startup_ms, 1),
+        'started': started,
+        'finished': finished,
+        'results': results,
+        'llm_calls': services.chat_handler.gemini.model.calls,
+        **rss_mb(),
+    }
+
+def run(options: Dict) -> Dict:
+    """Run every worker and merge their results into one report."""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(options['workers'])
+    output = context.Queue()
+    processes = [
+        context.Process(target=worker_main, args=(i, options, barrier, output), name=f"bench-worker-{i}")
+        for i in range(options['workers'])
+    ]
+    for process in processes:
+        process.start()
+    reports = [output.get() for _ in processes]
+    for process in processes:
+        process.join()
+    failed = [r for r in reports if 'error' in r]
+    if failed:
+        raise RuntimeError("; ".join(f"worker {r['worker']}: {r['error']}" for r in failed))
+
+    results = [r for report in reports for r in report['results']]
+    duration = max(r['finished'] for r in reports) - min(r['started'] for r in reports)
+    by_kind = {}
+    for kind in sorted({kind for kind, _, _ in results}):
+        by_kind[kind] = dict(
+            requests=sum(1 for k, _, _ in results if k == kind),
+            **latency_summary([ms for k, ms, _ in results if k == kind])
+        )
+    return {
+        'options': options,
+        'requests': len(results),
+        'errors': sum(1 for _, _, ok in results if not ok),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(results) / duration, 2) if duration else 0.0,
+        'latency_ms': latency_summary([ms for _, ms, _ in results]),
+        'by_kind': by_kind,
+        'workers': [
+            {k: v for k, v in report.items() if k not in ('results', 'started', 'finished')}
+            for report in sorted(reports, key=lambda r: r['worker'])
+        ],
+    }
+
+def format_report(report: Dict, baseline: Optional[Dict] = None) -> str:
+    def delta(value, key, lower_is_better=True):
+        if baseline is None:
+            return ''
+        before = key(baseline)
+        if not before:
+            return ''
+        change = (value - before) / before * 100
+        better = change < 0 if lower_is_better else change > 0
+        return f"  ({change:+.1f}% {'better' if better else 'worse' if change else 'same'})"
+
+    o = report['options']
+    lines = [
+        f"{report['requests']} requests ({report['errors']} errors) in {report['duration_s']}s "
+        f"- {o['workers']} {'ASGI' if o['asgi'] else 'WSGI'} worker(s) x {o['concurrency']} concurrent, "
+        f"LLM latency {o['llm_latency']}s",
+        f"throughput: {report['throughput_rps']} req/s"
+        + delta(report['throughput_rps'], lambda b: b['throughput_rps'], lower_is_better=False),
+    ]
+    for p in PERCENTILES:
+        key = f"p{p}"
+        lines.append(f"latency {key}: {report['latency_ms'][key]} ms"
+                     + delta(report['latency_ms'][key], lambda b, k=key: b['latency_ms'][k]))
+    for kind, summary in report['by_kind'].items():
+        lines.append(f"  {kind:<10} {summary['requests']:>6} requests  "
+                     + "  ".join(f"p{p} {summary[f'p{p}']} ms" for p in PERCENTILES))
+    for worker in report['workers']:
+        lines.append(f"  worker {worker['worker']}: startup {worker['startup_ms']} ms, "
+                     f"rss {worker['rss_mb']} MB (peak {worker['peak_rss_mb']} MB), {worker['llm_calls']} LLM calls")
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the chat API against the seeded database.')
+    parser.add_argument('--requests', type=int, default=1000, help='measured requests (all workers)')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per worker first')
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight per worker')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes')
+    parser.add_argument('--intercept-ratio', type=float, default=0.7, help='share of intent-routed questions')
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='seconds per fake Gemini call')
+    parser.add_argument('--stream', action='store_true', help='use /api/chat/stream')
+    parser.add_argument('--asgi', action='store_true', help='benchmark the Quart app instead of Flask')
+    parser.add_argument('--no-cache', action='store_true', help='disable the answer and SQL caches')
+    parser.add_argument('--db-name', default=DEFAULT_DB_NAME, help='seeded benchmark database')
+    parser.add_argument('--seed', type=int, default=0, help='workload random seed')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare with')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    options = {k: v for k, v in vars(args).items() if k not in ('output', 'compare')}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    try:
+        report = run(options)
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        return 1
+    print(format_report(report, baseline))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
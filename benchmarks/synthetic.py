@@ -0,0 +1,554 @@
+"""
+Synthetic construction data at production scale.
+
+Reads the live schema (``SchemaExtractor.get_full_schema()``: columns, foreign
+keys and unique constraints) and bulk-loads referentially consistent rows
+with COPY, so query plans and indexes can be tested on realistic volumes
+offline. At ``--scale 1`` that is about 1,000 projects, 7,000 phases,
+35,000 subphases and 40,000 invoices; ``--scale 50`` gives tens of
+thousands of projects and millions of subphases and invoices.
+
+Tables are filled parents first. A child table is generated per parent
+row (phases per project, subphases per phase, invoices per client), other
+foreign keys point at random parent rows, and parents a NOT NULL foreign
+key needs are generated too. Values follow the construction domain where
+the column is known (project progress drives phase and subphase status
+and ``percentComplete``; invoice status follows invoice age), the
+database's own column statistics (``pg_stats``) for other low-cardinality
+columns, and the column name and type otherwise.
+
+    python -m benchmarks.synthetic --scale 10 --dry-run
+    python -m benchmarks.synthetic --scale 10 --truncate
+"""
+import re
+import sys
+import uuid
+import random
+import argparse
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional
+import psycopg
+from database import DatabaseConnector, SchemaExtractor
+from database.db_connector import build_conn_string
+from .fixture import DEFAULT_DB_NAME, PHASES, STREETS, FIRST_NAMES, LAST_NAMES, project_name
+
+logger = logging.getLogger(__name__)
+
+TARGET_TABLES = ('users', 'leads', 'projects', 'phases', 'subphases', 'invoices')
+
+# Rows per unit of scale for tables generated on their own
+ROOT_ROWS = {'users': 20, 'leads': 1000, 'projects': 1000}
+DEFAULT_ROOT_ROWS = 50
+
+# Child table -> (owning foreign key, mean rows per parent)
+FAN_OUT = {
+    'phases': ('project_id', 7),
+    'subphases': ('phase_id', 5),
+    'invoices': ('customer_id', 40),
+}
+DEFAULT_FAN_OUT = 3
+
+COMPLETED, IN_PROGRESS, NOT_STARTED = 'Completed', 'In Progress', 'Not Started'
+PAID, PENDING, OVERDUE = 'Paid', 'Pending', 'Overdue'
+
+# Enum labels to use for each status (first label matching the pattern)
+LABEL_PATTERNS = {
+    COMPLETED: r'complete|done|finish|closed',
+    IN_PROGRESS: r'progress|active|ongoing|started',
+    NOT_STARTED: r'not|pending|new|todo|planned',
+    PAID: r'paid|complete|settled',
+    PENDING: r'pending|open|sent|draft|due',
+    OVERDUE: r'overdue|late|past',
+}
+
+# Low-cardinality columns are sampled from pg_stats when its common values cover this much
+MCV_COVERAGE = 0.8
+
+COLUMN_DETAILS_QUERY = """
+SELECT c.table_name, c.column_name, c.udt_name, c.character_maximum_length,
+       (SELECT array_agg(e.enumlabel ORDER BY e.enumsortorder)
+          FROM pg_type t JOIN pg_enum e ON e.enumtypid = t.oid
+         WHERE t.typname = c.udt_name) AS enum_labels
+FROM information_schema.columns c
+WHERE c.table_schema = 'public';
+"""
+
+COLUMN_STATS_QUERY = """
+SELECT tablename, attname, null_frac,
+       most_common_vals::text::text[] AS common_values,
+       most_common_freqs AS common_freqs
+FROM pg_stats
+WHERE schemaname = 'public';
+"""
+
+class SyntheticDataGenerator:
+    def __init__(self, db: DatabaseConnector, scale: float = 1.0, seed: int = 42,
+                 tables: Optional[List[str]] = None):
+        """Plan synthetic data for ``tables`` (default: the construction tables).
+
+        ``scale`` multiplies every table's row count.
+        """
+        self.db = db
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.now = datetime.now(timezone.utc)
+        self.today = self.now.date()
+
+        schema = SchemaExtractor(db=db).get_full_schema()
+        if not schema.get('tables'):
+            raise RuntimeError("Could not read the database schema")
+        self.columns = schema['tables']
+        self.fks = {}  # table -> {column: (parent table, parent column)}
+        for rel in schema['relationships']:
+            self.fks.setdefault(rel['table_name'], {})[rel['column_name']] = (
+                rel['foreign_table_name'], rel['foreign_column_name']
+            )
+        self.primary_keys, self.unique = {}, {}
+        by_constraint = {}
+        for c in schema['constraints']:
+            by_constraint.setdefault((c['table_name'], c['constraint_name'], c['constraint_type']), []).append(c['column_name'])
+        for (table, _, kind), cols in by_constraint.items():
+            if kind == 'PRIMARY KEY':
+                self.primary_keys[table] = cols
+            if kind in ('PRIMARY KEY', 'UNIQUE') and len(cols) == 1:
+                self.unique.setdefault(table, set()).add(cols[0])
+
+        self.details = {(r['table_name'], r['column_name']): r for r in db.execute_query(COLUMN_DETAILS_QUERY)}
+        self.stats = {}
+        for row in db.execute_query(COLUMN_STATS_QUERY):
+            self.stats[(row['tablename'], row['attname'])] = row
+
+        requested = [t for t in (tables or TARGET_TABLES) if t in self.columns]
+        missing = set(tables or ()) - set(requested)
+        if missing:
+            raise RuntimeError(f"Tables not in the schema: {', '.join(sorted(missing))}")
+        self.tables = self._order(self._closure(requested))
+        self.keys = {}     # (table, column) -> values parents hand to children
+        self.traits = {}   # table -> {key: trait} for rows children derive from
+        self.counts = {}
+
+    # ---- planning ----
+
+    def _closure(self, tables: List[str]) -> List[str]:
+        """``tables`` plus every table a NOT NULL foreign key of theirs needs."""
+        needed, pending = set(), list(tables)
+        while pending:
+            table = pending.pop()
+            if table in needed:
+                continue
+            needed.add(table)
+            for column, (parent, _) in self.fks.get(table, {}).items():
+                if parent != table and not self._nullable(table, column):
+                    pending.append(parent)
+        return sorted(needed)
+
+    def _order(self, tables: List[str]) -> List[str]:
+        """Parents before children (self-references and nullable cycles are left NULL)."""
+        ordered, visiting = [], set()
+
+        def visit(table):
+            if table in ordered:
+                return
+            if table in visiting:
+                raise RuntimeError(f"Foreign key cycle through {table}")
+            visiting.add(table)
+            for column, (parent, _) in self.fks.get(table, {}).items():
+                if parent in tables and parent != table and not (parent in visiting and self._nullable(table, column)):
+                    visit(parent)
+            visiting.discard(table)
+            ordered.append(table)
+
+        for table in tables:
+            visit(table)
+        return ordered
+
+    def _nullable(self, table: str, column: str) -> bool:
+        return next((c['is_nullable'] == 'YES' for c in self.columns[table] if c['column_name'] == column), True)
+
+    def _owner(self, table: str) -> Optional[str]:
+        """The foreign key a table's rows are generated per (None for root tables)."""
+        fks = self.fks.get(table, {})
+        if table in FAN_OUT and FAN_OUT[table][0] in fks:
+            return FAN_OUT[table][0]
+        return next((c for c, (parent, _) in fks.items()
+                     if parent != table and parent in self.tables and not self._nullable(table, c)), None)
+
+    def plan(self) -> List[Dict]:
+        """Tables in load order with their estimated row counts."""
+        estimates, plan = {}, []
+        for table in self.tables:
+            owner = self._owner(table)
+            if owner is None:
+                rows = max(1, round(ROOT_ROWS.get(table, DEFAULT_ROOT_ROWS) * self.scale))
+            else:
+                parent = self.fks[table][owner][0]
+                rows = round(estimates.get(parent, 0) * self._mean_children(table, owner))
+            estimates[table] = rows
+            plan.append({'table': table, 'rows': rows,
+                         'per': f"{self.fks[table][owner][0]}.{owner}" if owner else None})
+        return plan
+
+    def _mean_children(self, table: str, owner: str) -> float:
+        if owner in self.unique.get(table, set()):
+            return 1
+        return FAN_OUT[table][1] if table in FAN_OUT else DEFAULT_FAN_OUT
+
+    # ---- traits (what related rows agree on) ----
+
+    def _project_trait(self) -> Dict:
+        """Overall progress and start date: some not started, some done, the rest in between."""
+        r = self.rng.random()
+        progress = 0.0 if r < 0.15 else 1.0 if r < 0.40 else self.rng.betavariate(2, 2)
+        if progress == 0.0:
+            start = self.today + timedelta(days=self.rng.randint(0, 90))
+        elif progress == 1.0:
+            start = self.today - timedelta(days=self.rng.randint(240, 1500))
+        else:
+            start = self.today - timedelta(days=int(30 + progress * self.rng.randint(120, 600)))
+        return {'progress': progress, 'start': start}
+
+    def _phase_traits(self, project: Optional[Dict], count: int) -> List[Dict]:
+        """Phases in build order: those before the project's progress point are done."""
+        templates = sorted(self.rng.sample(range(len(PHASES)), min(count, len(PHASES))))
+        templates += [self.rng.randrange(len(PHASES)) for _ in range(count - len(templates))]
+        progress = project['progress'] if project else self.rng.random()
+        start = project['start'] if project else self.today - timedelta(days=365)
+        position = progress * count
+        traits = []
+        for j, template in enumerate(templates):
+            if j + 1 <= position:
+                status, done = COMPLETED, 1.0
+            elif j < position:
+                status, done = IN_PROGRESS, position - j
+            else:
+                status, done = NOT_STARTED, 0.0
+            traits.append({'template': template, 'status': status, 'done': done,
+                           'start': start + timedelta(days=j * 45)})
+        return traits
+
+    def _subphase_traits(self, phase: Optional[Dict], count: int) -> List[Dict]:
+        template = phase['template'] if phase else self.rng.randrange(len(PHASES))
+        tasks = PHASES[template][1]
+        done = round((phase['done'] if phase else 0.0) * count)
+        traits = []
+        for i in range(count):
+            if i < done:
+                status = COMPLETED
+            elif i == done and phase and phase['status'] == IN_PROGRESS:
+                status = IN_PROGRESS
+            else:
+                status = NOT_STARTED
+            traits.append({'name': tasks[i % len(tasks)], 'status': status,
+                           'start': (phase or {}).get('start', self.today) + timedelta(days=i * 7)})
+        return traits
+
+    def _invoice_trait(self) -> Dict:
+        """Issue date (recent ones more common); status follows age."""
+        issued = self.today - timedelta(days=min(int(self.rng.expovariate(1 / 300)), 1500))
+        age = (self.today - issued).days
+        if age > 90:
+            status = self.rng.choices([PAID, OVERDUE], weights=[95, 5])[0]
+        elif age > 30:
+            status = self.rng.choices([PAID, OVERDUE, PENDING], weights=[60, 25, 15])[0]
+        else:
+            status = self.rng.choices([PENDING, PAID], weights=[70, 30])[0]
+        paid = issued + timedelta(days=self.rng.randint(3, 45)) if status == PAID else None
+        return {'start': issued, 'status': status, 'paid': min(paid, self.today) if paid else None}
+
+    def _children(self, table: str, parent_key, count: int) -> List[Dict]:
+        """Traits for one parent's rows of ``table`` (or all rows of a root table)."""
+        if table == 'projects':
+            return [self._project_trait() for _ in range(count)]
+        if table == 'phases':
+            return self._phase_traits(self.traits.get('projects', {}).get(parent_key), count)
+        if table == 'subphases':
+            phase = self.traits.get('phases', {}).get(parent_key)
+            if phase is not None:
+                # About one row per template task
+                count = max(1, len(PHASES[phase['template']][1]) + self.rng.randint(-1, 1))
+            return self._subphase_traits(phase, count)
+        if table == 'invoices':
+            return [self._invoice_trait() for _ in range(count)]
+        return [{} for _ in range(count)]
+
+    # ---- values ----
+
+    def _label(self, table: str, column: str, wanted: str) -> str:
+        """``wanted``, or the closest label when the column is an enum."""
+        labels = (self.details.get((table, column)) or {}).get('enum_labels')
+        if not labels or wanted in labels:
+            return wanted
+        return next((l for l in labels if re.search(LABEL_PATTERNS[wanted], l, re.IGNORECASE)), labels[0])
+
+    def _created(self, ctx: Dict) -> datetime:
+        if 'created' not in ctx:
+            start = ctx['trait'].get('start')
+            if start is not None:
+                moment = datetime.combine(start, datetime.min.time(), timezone.utc) - timedelta(days=self.rng.randint(0, 30))
+            else:
+                moment = self.now - timedelta(days=self.rng.randint(0, 1100))
+            ctx['created'] = min(moment, self.now)
+        return ctx['created']
+
+    def _domain_value(self, table: str, column: str) -> Optional[Callable[[Dict], object]]:
+        """Generators for the columns the chatbot's queries depend on."""
+        key = column.lower()
+        if key in ('createdat', 'created_at'):
+            return self._created
+        if key in ('updatedat', 'updated_at'):
+            return lambda ctx: self._created(ctx) + (self.now - self._created(ctx)) * self.rng.random()
+        if table == 'projects':
+            if key == 'name':
+                return lambda ctx: project_name(ctx['n'], self.rng)
+            if key == 'percentcomplete':
+                return lambda ctx: Decimal(f"{ctx['trait']['progress'] * 100:.2f}")
+            if key in ('startdate', 'start_date'):
+                return lambda ctx: ctx['trait']['start']
+        if table == 'phases':
+            if key == 'name':
+                return lambda ctx: PHASES[ctx['trait']['template']][0]
+            if key == 'order':
+                return lambda ctx: ctx['index'] + 1
+            if key == 'status':
+                return lambda ctx: self._label(table, column, ctx['trait']['status'])
+        if table == 'subphases':
+            if key == 'name':
+                return lambda ctx: ctx['trait']['name']
+            if key == 'order':
+                return lambda ctx: ctx['index'] + 1
+            if key == 'status':
+                return lambda ctx: self._label(table, column, ctx['trait']['status'])
+        if table == 'invoices':
+            if key == 'invoicenumber':
+                return lambda ctx: f"INV-{ctx['id']:08d}"
+            if key == 'totalamount':
+                return lambda ctx: Decimal(f"{self.rng.lognormvariate(9.5, 0.9):.2f}")
+            if key == 'paymentstatus':
+                return lambda ctx: self._label(table, column, ctx['trait']['status'])
+            if key == 'paymentdate':
+                return lambda ctx: ctx['trait']['paid']
+        return None
+
+    def _value(self, table: str, col: Dict) -> Optional[Callable[[Dict], object]]:
+        """A generator for one column (None: leave it to the column default)."""
+        column, data_type = col['column_name'], col['data_type']
+        nullable = col['is_nullable'] == 'YES'
+        unique = column in self.unique.get(table, set())
+        details = self.details.get((table, column)) or {}
+        domain = self._domain_value(table, column)
+        if domain is not None:
+            return self._typed(data_type, domain)
+
+        stats = self.stats.get((table, column))
+        if stats and stats['common_values'] and not unique and sum(stats['common_freqs']) >= MCV_COVERAGE:
+            values, weights = stats['common_values'], stats['common_freqs']
+            null_frac = stats['null_frac'] if nullable else 0
+            return lambda ctx: None if self.rng.random() < null_frac else self.rng.choices(values, weights)[0]
+
+        key = column.lower()
+        if details.get('enum_labels'):
+            labels = details['enum_labels']
+            return lambda ctx: self.rng.choice(labels)
+        if data_type in ('text', 'character varying', 'character'):
+            return self._text_value(table, key, details.get('character_maximum_length'), unique)
+        if data_type in ('integer', 'bigint', 'smallint'):
+            return (lambda ctx: ctx['n'] + 1) if unique else (lambda ctx: self.rng.randint(0, 100))
+        if data_type in ('numeric', 'double precision', 'real'):
+            return lambda ctx: round(self.rng.uniform(0, 1000), 2)
+        if data_type == 'boolean':
+            return lambda ctx: self.rng.random() < 0.5
+        if data_type == 'date':
+            return lambda ctx: self._created(ctx).date()
+        if data_type.startswith('timestamp'):
+            aware = 'with time zone' in data_type
+            return lambda ctx: self._created(ctx) if aware else self._created(ctx).replace(tzinfo=None)
+        if data_type == 'uuid':
+            return lambda ctx: uuid.UUID(int=self.rng.getrandbits(128))
+        if data_type in ('json', 'jsonb'):
+            return lambda ctx: '{}'
+        if data_type == 'ARRAY':
+            return lambda ctx: '{}'
+        if col['column_default'] is not None or nullable:
+            return None
+        raise RuntimeError(f"Don't know how to generate {table}.{column} ({data_type})")
+
+    @staticmethod
+    def _typed(data_type: str, make: Callable[[Dict], object]) -> Callable[[Dict], object]:
+        """Fit a domain value to the column's actual type."""
+        if data_type == 'date':
+            return lambda ctx: (lambda v: v.date() if isinstance(v, datetime) else v)(make(ctx))
+        if data_type == 'timestamp without time zone':
+            return lambda ctx: (lambda v: v.replace(tzinfo=None) if isinstance(v, datetime) else v)(make(ctx))
+        if data_type in ('integer', 'bigint', 'smallint'):
+            return lambda ctx: (lambda v: int(round(v)) if isinstance(v, Decimal) else v)(make(ctx))
+        return make
+
+    def _text_value(self, table: str, key: str, max_length: Optional[int], unique: bool) -> Callable[[Dict], str]:
+        rng = self.rng
+        if 'email' in key:
+            make = lambda ctx: f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}.{ctx['n']}@example.com".lower()
+        elif 'first' in key:
+            make = lambda ctx: rng.choice(FIRST_NAMES)
+        elif 'last' in key:
+            make = lambda ctx: rng.choice(LAST_NAMES)
+        elif 'phone' in key:
+            make = lambda ctx: f"555-{rng.randint(100, 999)}-{rng.randint(0, 9999):04d}"
+        elif 'address' in key or 'street' in key:
+            make = lambda ctx: f"{rng.randint(1, 9999)} {rng.choice(STREETS).title()} St"
+        elif 'description' in key or 'note' in key:
+            make = lambda ctx: f"{rng.choice(PHASES)[0]} work, {rng.choice(['on schedule', 'awaiting materials', 'client review'])}"
+        else:
+            label = table.rstrip('s').replace('_', ' ').title()
+            make = lambda ctx: f"{label} {ctx['n'] + 1}"
+        if unique and not ('email' in key or key == 'name'):
+            inner = make
+            make = lambda ctx: f"{inner(ctx)}-{ctx['n'] + 1}"
+        if max_length:
+            return lambda ctx: make(ctx)[-max_length:] if unique else make(ctx)[:max_length]
+        return make
+
+    # ---- generation ----
+
+    def _parent_keys(self, table: str, column: str) -> List:
+        """Values of a referenced column: the ones generated here, else the existing ones."""
+        if (table, column) in self.keys:
+            return self.keys[(table, column)]
+        rows = self.db.execute_query(f'SELECT "{column}" AS key FROM "{table}" LIMIT 100000')
+        self.keys[(table, column)] = [r['key'] for r in rows]
+        return self.keys[(table, column)]
+
+    def _next_id(self, table: str, column: str) -> int:
+        rows = self.db.execute_query(f'SELECT COALESCE(MAX("{column}"), 0) AS max_id FROM "{table}"')
+        return int(rows[0]['max_id']) + 1
+
+    def load_columns(self, table: str) -> List[Dict]:
+        """The columns given values (the rest keep their defaults)."""
+        pk = self.primary_keys.get(table, [])
+        return [c for c in self.columns[table]
+                if c['column_name'] in pk or c['column_name'] in self.fks.get(table, {})
+                or self._value(table, c) is not None]
+
+    def rows(self, table: str, columns: List[Dict]) -> Iterator[tuple]:
+        """Generate ``table``'s rows (as tuples in ``columns`` order)."""
+        names = [c['column_name'] for c in columns]
+        pk = self.primary_keys.get(table, [])
+        pk = pk[0] if len(pk) == 1 and pk[0] in names else None
+        pk_type = columns[names.index(pk)]['data_type'] if pk else None
+        serial = pk_type in ('integer', 'bigint', 'smallint')
+        next_id = self._next_id(table, pk) if serial else 1
+        owner = self._owner(table)
+        fks = {c: ref for c, ref in self.fks.get(table, {}).items() if c != owner}
+        referenced = {col for refs in self.fks.values() for parent, col in refs.values() if parent == table}
+        collected = {names.index(col): [] for col in referenced if col in names}
+        traits = self.traits.setdefault(table, {}) if table in ('projects', 'phases') and pk else None
+
+        generators = []
+        for col in columns:
+            name = col['column_name']
+            if name == pk and serial:
+                generators.append(lambda ctx: ctx['id'])
+            elif name == pk and pk_type == 'uuid':
+                generators.append(lambda ctx: uuid.UUID(int=self.rng.getrandbits(128)))
+            elif name == owner:
+                generators.append(lambda ctx: ctx['parent'])
+            elif name in fks:
+                parent_table, parent_column = fks[name]
+                nullable = col['is_nullable'] == 'YES'
+                keys = [] if parent_table == table else self._parent_keys(parent_table, parent_column)
+                if not keys and not nullable:
+                    raise RuntimeError(f"{table}.{name} needs rows in {parent_table}")
+                generators.append((lambda keys: lambda ctx: self.rng.choice(keys) if keys else None)(keys))
+            else:
+                generators.append(self._value(table, col))
+
+        if owner is None:
+            count = max(1, round(ROOT_ROWS.get(table, DEFAULT_ROOT_ROWS) * self.scale))
+            groups = [(None, self._children(table, None, count))]
+        else:
+            parent_table, parent_column = self.fks[table][owner]
+            mean = self._mean_children(table, owner)
+            groups = (
+                (parent, self._children(table, parent, 1 if mean == 1 else max(0, round(self.rng.gauss(mean, mean / 3)))))
+                for parent in self._parent_keys(parent_table, parent_column)
+            )
+
+        n = 0
+        pk_index = names.index(pk) if pk else None
+        for parent, group in groups:
+            for index, trait in enumerate(group):
+                ctx = {'id': next_id + n, 'n': n, 'parent': parent, 'index': index, 'trait': trait}
+                row = tuple(g(ctx) for g in generators)
+                if traits is not None:
+                    traits[row[pk_index]] = trait
+                for i, values in collected.items():
+                    values.append(row[i])
+                n += 1
+                yield row
+        for i, values in collected.items():
+            self.keys[(table, names[i])] = values
+        self.counts[table] = n
+
+    def load(self, conn_string: str, truncate: bool = False) -> Dict[str, int]:
+        """COPY every planned table in (one transaction per table); returns rows loaded."""
+        with psycopg.connect(conn_string) as conn:
+            if truncate:
+                quoted = ", ".join(f'"{t}"' for t in self.tables)
+                logger.info(f"Truncating {quoted} (and tables referencing them)")
+                conn.execute(f"TRUNCATE {quoted} RESTART IDENTITY CASCADE")
+                conn.commit()
+            for table in self.tables:
+                columns = self.load_columns(table)
+                names = ", ".join(f'"{c["column_name"]}"' for c in columns)
+                with conn.cursor() as cursor:
+                    with cursor.copy(f'COPY "{table}" ({names}) FROM STDIN') as copy:
+                        for row in self.rows(table, columns):
+                            copy.write_row(row)
+                    pk = self.primary_keys.get(table, [])
+                    pk_type = next((c['data_type'] for c in columns if [c['column_name']] == pk), None)
+                    if pk_type in ('integer', 'bigint', 'smallint'):
+                        # Keep serial/identity sequences ahead of the loaded ids
+                        cursor.execute(
+                            f'SELECT setval(pg_get_serial_sequence(%s, %s), GREATEST(MAX("{pk[0]}"), 1)) FROM "{table}"',
+                            (f'"{table}"', pk[0])
+                        )
+                conn.commit()
+                logger.info(f"{table}: {self.counts[table]:,} rows")
+            conn.autocommit = True
+            for table in self.tables:
+                conn.execute(f'ANALYZE "{table}"')
+        return dict(self.counts)
+
+def main(argv=None) -> int:
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Bulk-load synthetic construction data into an existing schema.')
+    parser.add_argument('--scale', type=float, default=1.0, help='scale factor (1 = about 1,000 projects)')
+    parser.add_argument('--tables', help='comma-separated tables to fill (default: the construction tables)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--db-name', default=DEFAULT_DB_NAME, help='database to load')
+    parser.add_argument('--truncate', action='store_true',
+                        help='empty the planned tables first (TRUNCATE ... CASCADE also empties tables referencing them)')
+    parser.add_argument('--dry-run', action='store_true', help='print the plan without loading')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    config = dict(Config.DB_CONFIG, dbname=args.db_name, pool_enabled=False)
+    tables = [t.strip() for t in args.tables.split(',')] if args.tables else None
+    try:
+        with DatabaseConnector(config) as db:
+            generator = SyntheticDataGenerator(db, args.scale, args.seed, tables)
+            for step in generator.plan():
+                per = f" (per {step['per']})" if step['per'] else ''
+                print(f"{step['table']:<20} ~{step['rows']:>12,} rows{per}")
+            if args.dry_run:
+                return 0
+            generator.load(build_conn_string(config), truncate=args.truncate)
+    except Exception as e:
+        logger.error(f"Synthetic load into {args.db_name} failed: {e}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
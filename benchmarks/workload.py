@@ -0,0 +1,88 @@
+"""
+The question mix replayed by the benchmark.
+
+Intercept questions are answered by the intent router without Gemini;
+fallback questions go through planning, SQL and formatting, with the fake
+model answering each with the SQL listed here.
+"""
+import random
+from typing import Dict, List, Tuple
+
+INTERCEPT = 'intercept'
+FALLBACK = 'fallback'
+
+# Matched by the built-in intents ({project} is a seeded project name)
+INTERCEPT_QUESTIONS = [
+    "What is the status of {project}?",
+    "Give me the details of {project} project",
+    "Show the budget status for all projects",
+    "What is the budget status for {project} project?",
+    "Which invoices were issued for {project}?",
+    "What subphase is {project} in?",
+    "What is the next subphase for {project}?",
+    "Which tasks are still open for {project}?",
+    "What stage is {project} at?",
+]
+
+# Sent to the LLM path; the fake model plans each with this SQL (None: answered without SQL)
+FALLBACK_QUESTIONS = {
+    "How many projects are more than half complete?": """
+        SELECT COUNT(*) AS projects FROM projects WHERE "percentComplete" > 50
+    """,
+    "Which 20 projects have the most open subphases?": """
+        SELECT p.name, COUNT(sp.id) AS open_subphases
+        FROM projects p
+        JOIN phases ph ON ph.project_id = p.id
+        JOIN subphases sp ON sp.phase_id = ph.id
+        WHERE sp.status <> 'Completed'
+        GROUP BY p.name
+        ORDER BY open_subphases DESC
+        LIMIT 20
+    """,
+    "List the overdue invoices": """
+        SELECT i."invoiceNumber", p.name AS project, i."totalAmount"
+        FROM invoices i
+        JOIN leads l ON i.customer_id = l.id
+        JOIN projects p ON p.client_id = l.id
+        WHERE i."paymentStatus" = 'Overdue'
+        ORDER BY i."totalAmount" DESC
+        LIMIT 100
+    """,
+    "What is the average invoice amount by payment status?": """
+        SELECT "paymentStatus", COUNT(*) AS invoices, ROUND(AVG("totalAmount"), 2) AS average
+        FROM invoices
+        GROUP BY "paymentStatus"
+    """,
+    "Which designers have the most active projects?": """
+        SELECT CONCAT(u."firstName", ' ', u."lastName") AS designer, COUNT(*) AS active_projects
+        FROM projects p
+        JOIN users u ON p.project_designer_id = u.id
+        WHERE p."percentComplete" < 100
+        GROUP BY designer
+        ORDER BY active_projects DESC
+        LIMIT 10
+    """,
+    "How many projects started this year?": """
+        SELECT COUNT(*) AS projects FROM projects
+        WHERE "startDate" >= date_trunc('year', CURRENT_DATE)
+    """,
+    "Hi! What can you help me with?": None,
+}
+
+def build_workload(project_names: List[str], count: int, intercept_ratio: float = 0.7,
+                   seed: int = 0) -> List[Tuple[str, str]]:
+    """``count`` (kind, question) pairs, deterministic for ``seed``."""
+    rng = random.Random(seed)
+    fallback = list(FALLBACK_QUESTIONS)
+    questions = []
+    for _ in range(count):
+        if project_names and rng.random() < intercept_ratio:
+            template = rng.choice(INTERCEPT_QUESTIONS)
+            questions.append((INTERCEPT, template.format(project=rng.choice(project_names))))
+        else:
+            questions.append((FALLBACK, rng.choice(fallback)))
+    return questions
+
+def fallback_sql() -> Dict[str, str]:
+    """Question -> SQL for the fake model (questions without SQL are left out)."""
+    return {question: ' '.join(sql.split()) for question, sql in FALLBACK_QUESTIONS.items() if sql}
@@ -3,5 +3,6 @@ Chatbot module initialization.
 """
 from .gemini_client import GeminiClient
 from .chat_handler import ChatHandler
+from .schema_retriever import SchemaRetriever
 
-__all__ = ['GeminiClient', 'ChatHandler']
\ No newline at end of file
+__all__ = ['GeminiClient', 'ChatHandler', 'SchemaRetriever']
\ No newline at end of file
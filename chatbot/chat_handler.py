@@ -2,30 +2,109 @@
 Main chat handler for construction project management chatbot.
 """
 import json
-import re
+import asyncio
 import logging
-import difflib
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import telemetry
 from .gemini_client import GeminiClient
+from .schema_retriever import SchemaRetriever
+from .timing import StageTimer, Deadline, DeadlineExceeded
+from .result_formatter import ResultFormatter, POLICY_AUTO, POLICY_LOCAL, POLICY_LLM
+from .response_cache import ResponseCache, HISTORY_INDEPENDENT
+from .sql_cache import SqlTemplateCache
+from .project_index import ProjectIndex
+from .intent_router import IntentRouter
+from .search import SearchEngine
 from database.db_connector import DatabaseConnector
+from database.async_db_connector import AsyncDatabaseConnector
+from database.query_guard import QueryRejected
+from database.rollups import ProjectRollups
 from database.schema_extractor import SchemaExtractor
+from database.schema_catalog import SchemaCatalog
 
 logger = logging.getLogger(__name__)
 
+# Appended when a streamed answer is stopped at the request deadline
+PARTIAL_NOTE = "\n\n*(Answer cut short: this request reached its time limit.)*"
+
 class ChatHandler:
-    def __init__(self, api_key: str, db_config: Dict):
-        """Initialize chat handler."""
-        self.gemini = GeminiClient(api_key)
-        self.db = DatabaseConnector(db_config)
-        self.schema_extractor = SchemaExtractor(db_config)
+    def __init__(self,
+                 api_key: str,
+                 db_config: Optional[Dict] = None,
+                 db: Optional[DatabaseConnector] = None,
+                 schema_extractor: Optional[SchemaExtractor] = None,
+                 schema_catalog: Optional[SchemaCatalog] = None,
+                 schema_retriever: Optional[SchemaRetriever] = None,
+                 combined_planning: bool = True,
+                 result_formatter: Optional[ResultFormatter] = None,
+                 format_policy: str = POLICY_AUTO,
+                 response_cache: Optional[ResponseCache] = None,
+                 sql_cache: Optional[SqlTemplateCache] = None,
+                 async_db: Optional[AsyncDatabaseConnector] = None,
+                 response_timeout: Optional[float] = None,
+                 project_index: Optional[ProjectIndex] = None,
+                 intent_router: Optional[IntentRouter] = None,
+                 rollups: Optional[ProjectRollups] = None,
+                 search_engine: Optional[SearchEngine] = None):
+        """Initialize chat handler.
         
-        # Get formatted schema for AI context
-        self.schema_info = self.schema_extractor.get_formatted_schema_prompt()
-        rows = self.db.execute_query("SELECT name FROM projects;")
-        self.all_project_names = [r['name'] for r in rows]
+        ``db``, ``schema_extractor`` and ``schema_catalog`` may be injected so
+        the whole process shares one data-access object and connection pool.
+        ``combined_planning`` asks Gemini for intent and SQL in one call.
+        ``format_policy`` is 'auto', 'local' or 'llm' (see result_formatter).
+        ``response_cache`` enables answer caching and ``sql_cache`` reuse of
+        generated SQL when given. ``async_db`` is the pool used by the
+        ``*_async`` methods (set once the event loop is running).
+        ``response_timeout`` is the per-request deadline in seconds: it caps
+        every Gemini call and SQL statement, and the request then returns a
+        partial or timeout response instead of holding the worker.
+        ``project_index`` resolves project names for the intercepts and
+        ``intent_router`` picks the intercept (default: the built-in intents).
+        ``rollups`` serves precomputed phase, invoice and dashboard
+        aggregates while they are fresh (live queries otherwise).
+        ``search_engine`` backs search_across_database.
+        """
+        if db is None and db_config is None:
+            raise ValueError("Either db_config or db is required")
+        self.gemini = GeminiClient(api_key)
+        self.db = db if db is not None else DatabaseConnector(db_config)
+        self.schema_extractor = schema_extractor or SchemaExtractor(db=self.db)
+        self.schema_catalog = schema_catalog or SchemaCatalog(self.schema_extractor)
+        self.schema_retriever = schema_retriever or SchemaRetriever(
+            self.schema_catalog, self.schema_extractor
+        )
+        self.combined_planning = combined_planning
+        self.result_formatter = result_formatter or ResultFormatter()
+        self.format_policy = format_policy
+        self.response_cache = response_cache
+        self.sql_cache = sql_cache
+        self.async_db = async_db
+        self.response_timeout = response_timeout
         
-        # System prompt for construction management context
-        self.system_prompt = f"""
+        # Warm the schema catalog for AI context
+        self.schema_catalog.snapshot()
+        self.project_index = project_index or ProjectIndex(self.db)
+        self.intent_router = intent_router or IntentRouter()
+        self.rollups = rollups
+        self.search_engine = search_engine or SearchEngine(self.db, self.project_index)
+    
+    @property
+    def all_project_names(self) -> List[str]:
+        return self.project_index.names()
+    
+    @property
+    def schema_info(self) -> str:
+        """Formatted schema for AI context (rebuilt only after DDL changes)."""
+        return self.schema_catalog.prompt
+    
+    @property
+    def system_prompt(self) -> str:
+        """System prompt for construction management context."""
+        return self._build_system_prompt(self.schema_info)
+    
+    def _build_system_prompt(self, schema_info: str) -> str:
+        """Render the system prompt around the given schema text."""
+        return f"""
 You are a professional construction project management assistant. 
  **When you generate SQL you must:**
  - Match ​all​ text-based filters (project names, selection items, etc.) case-insensitively.  
@@ -35,7 +114,7 @@ You are a professional construction project management assistant.
  - If the user asks about “subphase” or “next subphase,” generate the appropriate JOIN+ORDER+LIMIT.
 
 Available Database Schema:
-{self.schema_info}
+{schema_info}
 
 Supported Question Categories (answer *only* these, using live DB data):
 1. **Selection Management**  
@@ -81,76 +160,612 @@ Response Guidelines:
     def process_query(self, user_message: str, conversation_history: List[Dict] = None) -> Dict:
         """Process any user query: first catch project or budget requests, 
         otherwise fall back to Gemini+SQL or pure Gemini."""
+        for event in self._run_pipeline(user_message, conversation_history, stream=False):
+            if event["event"] == "done":
+                return event["data"]
+
+    def process_query_stream(self, user_message: str, conversation_history: List[Dict] = None) -> Iterator[Dict]:
+        """Like process_query, but yield events as the answer is produced.
+        
+        Events are ``progress`` (pipeline stage), ``token`` (a chunk of the
+        answer text) and a final ``done`` carrying the full response dict.
+        """
+        return self._run_pipeline(user_message, conversation_history, stream=True)
+
+    def _run_pipeline(self, user_message: str, conversation_history: Optional[List[Dict]], stream: bool) -> Iterator[Dict]:
+        """Shared driver for process_query and process_query_stream."""
+        timer = StageTimer()
+        deadline = Deadline(self.response_timeout)
         text = user_message.strip()
+        has_history = bool(conversation_history)
+        response = None
+        
+        if self.response_cache is not None:
+            with timer.stage('cache_lookup'):
+                cached = self.response_cache.get(text, has_history)
+            if cached is not None:
+                response = dict(cached, cached=True)
+                yield {"event": "token", "data": {"text": response["message"]}}
+        
+        if response is None:
+            for event in self._process_query(text, conversation_history, timer, deadline, stream):
+                if event["event"] == "response":
+                    response = event["data"]
+                else:
+                    yield event
+            
+            # Cache clean answers; history-dependent ones only for fresh chats
+            category = response.get("category")
+            if (self.response_cache is not None and category
+                    and response.get("success") and "error" not in response
+                    and not response["message"].endswith(PARTIAL_NOTE)
+                    and (category in HISTORY_INDEPENDENT or not has_history)):
+                tables = self.response_cache.tables_for(category, response.get("sql_query"))
+                self.response_cache.set(text, category, dict(response), tables)
+        
+        response["timings"] = timer.as_dict()
+        logger.info(f"process_query timings (ms): {response['timings']}")
+        telemetry.record_request(timer, response.get("category"), self._outcome(response))
+        yield {"event": "done", "data": response}
 
-        # ─── 0) PROJECT DETAIL INTERCEPT ────────────────────────────────
-        #  a) Full project summary ("details of CABOT-1B project")
-        m_detail = re.search(
-            r"\bdetails? of\s+([A-Za-z0-9\-]+)\s+project",
-            text,
-            re.IGNORECASE
-        )
-        if m_detail:
-            # uppercase the key so you get an exact match in your SQL
-            return self._handle_project_summary(m_detail.group(1).upper())
-
-        #  b) Phase‐status / progress ("status of JAIN-1B", "progress of ELMGROVE-1B")
-        m_phase = re.search(
-            r"\b(?:status|progress) of\s+([A-Za-z0-9\-]+)",
-            text,
-            re.IGNORECASE
-        )
-        if m_phase:
-            return self.get_project_phase_details(m_phase.group(1).upper())
+    def _match_intercept(self, text: str) -> Optional[Tuple[str, Callable[[Optional[float]], Optional[Dict]]]]:
+        """Return (category, handler) if a rule-based intent matches.
+        
+        The handler takes the seconds left for the request (its queries'
+        statement timeout) and returns the response, or None when a SQL
+        intent fails (the question then goes to the LLM pipeline instead).
+        """
+        routed = self.intent_router.match(text)
+        if routed is None:
+            return None
+        intent, slots = routed
+        if intent.get('handler'):
+            method = getattr(self, intent['handler'])
+            if 'project' in slots:
+                # uppercase the key so you get an exact match in your SQL
+                return intent['name'], lambda timeout: method(slots['project'].upper(), timeout=timeout)
+            return intent['name'], lambda timeout: method(timeout=timeout)
+        return intent['name'], lambda timeout: self._run_intent_sql(text, intent, slots, timeout)
 
-        # ─── 1) BUDGET / INVOICING INTERCEPT ─────────────────────────────
-        if re.search(r"budget status for all projects", text, re.IGNORECASE):
-            return self.get_budget_status_all()
+    def _run_intent_sql(self, text: str, intent: Dict, slots: Dict[str, str],
+                        timeout: Optional[float] = None) -> Optional[Dict]:
+        """Run a SQL intent with its slot values as parameters."""
+        params = dict(slots)
+        if 'project' in slots:
+            name = self.project_index.resolve(slots['project'])
+            if name is None:
+                return self._project_not_found(slots['project'])
+            params['project'] = name
+        sql = intent['sql']
+        try:
+            rows = self.db.execute_query(sql, params, timeout=timeout)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logger.warning(f"Intent {intent['name']!r} failed, falling back to the LLM: {e}")
+            self.intent_router.record_failure(intent['name'])
+            return None
+        body = self.result_formatter.format(text, rows, force=True)
+        title = intent.get('title')
+        if title:
+            try:
+                body = f"**{title.format(**params)}**\n\n{body}"
+            except (KeyError, IndexError):
+                body = f"**{title}**\n\n{body}"
+        return {"message": body, "success": True, "sql_query": sql.strip()}
 
-        m_budget = re.search(
-            r"budget status for\s+([A-Za-z0-9\-]+)\s+project",
-            text,
-            re.IGNORECASE
+    def _process_query(self, text: str, conversation_history: Optional[List[Dict]],
+                       timer: StageTimer, deadline: Deadline, stream: bool) -> Iterator[Dict]:
+        """Route a cleaned message through the intercepts or the LLM pipeline.
+        
+        Yields progress/token events and finally a ``response`` event.
+        """
+        # SQL planned with history may depend on earlier turns ("the second one"),
+        # so it is neither reused for nor stored under the bare question
+        use_sql_cache = self.sql_cache is not None and not conversation_history
+        try:
+            intercept = self._match_intercept(text)
+            if intercept:
+                category, handler = intercept
+                yield self._progress('lookup', 'Looking up project data')
+                deadline.check('intercept')
+                with timer.stage('intercept'):
+                    result = handler(deadline.remaining())
+                if result is not None:
+                    response = dict(result, category=category)
+                    yield {"event": "token", "data": {"text": response["message"]}}
+                    yield {"event": "response", "data": response}
+                    return
+
+            # ─── 2) FALL BACK TO GEMINI + GENERIC SQL ────────────────────────
+            # Reuse validated SQL for a question shape we've answered before
+            if use_sql_cache:
+                cached_sql = self.sql_cache.lookup(text)
+                if cached_sql is not None:
+                    sql_query, params = cached_sql
+                    try:
+                        response = yield from self._run_sql(
+                            text, sql_query, params, timer, deadline, stream, prepare=True
+                        )
+                        response["sql_cached"] = True
+                        yield {"event": "response", "data": response}
+                        return
+                    except TimeoutError:
+                        raise
+                    except Exception as sql_err:
+                        logger.warning(f"Cached SQL failed, regenerating: {sql_err}")
+                        self.sql_cache.invalidate(text)
+            
+            # Only send the tables/columns relevant to this question
+            with timer.stage('schema_retrieval'):
+                schema_context = self.schema_retriever.retrieve(text) or self.schema_info
+            system_prompt = self._build_system_prompt(schema_context)
+            
+            yield self._progress('generating_sql', 'Generating SQL')
+            
+            # One round trip for intent + SQL (or a direct answer) ...
+            plan = None
+            if self.combined_planning:
+                deadline.check('plan')
+                with timer.stage('plan'):
+                    plan = self.gemini.plan_query(
+                        text, schema_context, conversation_history, system_prompt,
+                        timeout=deadline.remaining()
+                    )
+            
+            # ... falling back to the separate intent / SQL calls
+            if plan is None:
+                deadline.check('intent')
+                with timer.stage('intent'):
+                    intent = self.gemini.analyze_query_intent(
+                        text, schema_context, timeout=deadline.remaining()
+                    )
+                plan = {"needs_database": intent.get('needs_database', True)}
+                if plan["needs_database"]:
+                    deadline.check('generate_sql')
+                    with timer.stage('generate_sql'):
+                        plan["sql"] = self.gemini.generate_sql_query(
+                            text, schema_context, timeout=deadline.remaining()
+                        )
+            
+            if plan["needs_database"]:
+                sql_query = plan["sql"]
+                try:
+                    response = yield from self._run_sql(text, sql_query, None, timer, deadline, stream)
+                    if use_sql_cache:
+                        self.sql_cache.store(text, DatabaseConnector.clean_sql(sql_query))
+                    yield {"event": "response", "data": response}
+                    return
+                except TimeoutError:
+                    raise
+                except QueryRejected as rejected:
+                    yield {"event": "response", "data": self._rejected_response(rejected)}
+                    return
+                except Exception as sql_err:
+                    logger.error(f"SQL execution error: {sql_err}")
+                    yield self._progress('answering', 'Answering without database results')
+                    with timer.stage('generate_response'):
+                        fallback = yield from self._generate_text(
+                            stream, deadline, self.gemini.generate_response_stream, self.gemini.generate_response,
+                            text, conversation_history, system_prompt
+                        )
+                    yield {"event": "response", "data": {
+                        "message": fallback,
+                        "success": True,
+                        "error": str(sql_err)
+                    }}
+                    return
+
+            # pure LLM path (the plan may already carry the answer)
+            resp = plan.get("answer")
+            if resp:
+                yield {"event": "token", "data": {"text": resp}}
+            else:
+                yield self._progress('answering', 'Generating answer')
+                with timer.stage('generate_response'):
+                    resp = yield from self._generate_text(
+                        stream, deadline, self.gemini.generate_response_stream, self.gemini.generate_response,
+                        text, conversation_history, system_prompt
+                    )
+            yield {"event": "response", "data": {
+                "message": resp, "success": True, "no_database": True, "category": "llm_answer"
+            }}
+
+        except Exception as e:
+            if isinstance(e, TimeoutError) or deadline.expired():
+                logger.warning(f"Request timed out: {e}")
+                yield {"event": "response", "data": self._timeout_response(deadline)}
+                return
+            logger.error(f"Error processing query: {e}")
+            yield {"event": "response", "data": {
+                "message": "I’m sorry—something went wrong. Could you rephrase?",
+                "success": False,
+                "error": str(e)
+            }}
+
+    @staticmethod
+    def _outcome(response: Dict) -> str:
+        """Metrics label for how a request ended."""
+        if response.get("cached"):
+            return "cached"
+        if response.get("timed_out"):
+            return "timeout"
+        if not response.get("success") or "error" in response:
+            return "error"
+        return "ok"
+
+    @staticmethod
+    def _progress(stage: str, message: str) -> Dict:
+        return {"event": "progress", "data": {"stage": stage, "message": message}}
+
+    @staticmethod
+    def _timeout_response(deadline: Deadline) -> Dict:
+        return {
+            "message": (
+                f"Sorry, that question took longer than {deadline.seconds:g} seconds to answer. "
+                "Try narrowing it down, for example to a single project."
+            ),
+            "success": False,
+            "timed_out": True,
+            "error": "timeout"
+        }
+
+    @staticmethod
+    def _rejected_response(rejected: QueryRejected) -> Dict:
+        message = (
+            "That question would need too large a scan of the database to answer safely. "
+            "Try narrowing it down, for example to a single project or a date range."
         )
-        if m_budget:
-            return self.get_project_budget_details(m_budget.group(1).upper())
+        return {"message": message, "success": False, "error": str(rejected)}
+
+    def _generate_text(self, stream: bool, deadline: Deadline,
+                       stream_fn: Callable, block_fn: Callable, *args) -> Iterator[Dict]:
+        """Call a Gemini text method, emitting token events when streaming.
+        
+        Use with ``yield from``; the full text is the generator's return value.
+        A stream stopped by the deadline returns what it has plus PARTIAL_NOTE.
+        """
+        deadline.check('generate_text')
+        if not stream:
+            text = block_fn(*args, timeout=deadline.remaining())
+            deadline.check('generate_text')  # the call failed on the deadline
+            yield {"event": "token", "data": {"text": text}}
+            return text
+        parts = []
+        for chunk in stream_fn(*args, timeout=deadline.remaining()):
+            if deadline.expired():
+                if not parts:
+                    deadline.check('generate_text')
+                parts.append(PARTIAL_NOTE)
+                yield {"event": "token", "data": {"text": PARTIAL_NOTE}}
+                break
+            parts.append(chunk)
+            yield {"event": "token", "data": {"text": chunk}}
+        return "".join(parts)
+
+    def _run_sql(self, text: str, sql_query: str, params: Optional[tuple], timer: StageTimer,
+                 deadline: Deadline, stream: bool, prepare: Optional[bool] = None) -> Iterator[Dict]:
+        """Execute generated SQL and format the results (use with ``yield from``)."""
+        deadline.check('execute_sql')
+        yield self._progress('running_query', 'Running query')
+        with timer.stage('execute_sql'):
+            results = self.db.execute_safe(sql_query, params, prepare=prepare, timeout=deadline.remaining())
+        with timer.stage('format_results'):
+            formatted = yield from self._format_results(text, sql_query, results, deadline, stream)
+        return {
+            "message": formatted,
+            "success": True,
+            "sql_query": sql_query,
+            "results_count": len(results),
+            "results_truncated": getattr(results, 'truncated', False),
+            "category": "llm_sql"
+        }
+
+    def _format_results(self, text: str, sql_query: str, results: List[Dict],
+                        deadline: Deadline, stream: bool) -> Iterator[Dict]:
+        """Render results locally when possible; use Gemini per the policy.
+        
+        If Gemini runs out of time the results are still rendered locally.
+        """
+        if self.format_policy != POLICY_LLM:
+            formatted = self.result_formatter.format(
+                text, results, force=self.format_policy == POLICY_LOCAL
+            )
+            if formatted is not None:
+                yield {"event": "token", "data": {"text": formatted}}
+                return formatted
+        yield self._progress('formatting', 'Formatting results')
+        try:
+            return (yield from self._generate_text(
+                stream, deadline, self.gemini.format_query_results_stream, self.gemini.format_query_results,
+                text, sql_query, results
+            ))
+        except DeadlineExceeded:
+            formatted = self.result_formatter.format(text, results, force=True) + PARTIAL_NOTE
+            yield {"event": "token", "data": {"text": formatted}}
+            return formatted
 
-        # ─── 2) FALL BACK TO GEMINI + GENERIC SQL ────────────────────────
+    # ---- asyncio pipeline (ASGI app) ----
+    #
+    # Mirrors the generator pipeline above. Gemini and the database are
+    # awaited natively; intercepts, caches and schema retrieval are blocking
+    # and run in worker threads. Async generators can't return values, so the
+    # helpers finish with an internal ``result`` event instead. Every awaited
+    # stage is bounded by the request deadline and cancelled when it expires.
+
+    async def process_query_async(self, user_message: str, conversation_history: List[Dict] = None) -> Dict:
+        """Async version of process_query."""
+        async for event in self._run_pipeline_async(user_message, conversation_history, stream=False):
+            if event["event"] == "done":
+                return event["data"]
+
+    def process_query_stream_async(self, user_message: str,
+                                   conversation_history: List[Dict] = None) -> AsyncIterator[Dict]:
+        """Async version of process_query_stream."""
+        return self._run_pipeline_async(user_message, conversation_history, stream=True)
+
+    async def _run_pipeline_async(self, user_message: str, conversation_history: Optional[List[Dict]],
+                                  stream: bool) -> AsyncIterator[Dict]:
+        """Shared driver for process_query_async and process_query_stream_async."""
+        timer = StageTimer()
+        deadline = Deadline(self.response_timeout)
+        text = user_message.strip()
+        has_history = bool(conversation_history)
+        response = None
+        
+        if self.response_cache is not None:
+            with timer.stage('cache_lookup'):
+                cached = await asyncio.to_thread(self.response_cache.get, text, has_history)
+            if cached is not None:
+                response = dict(cached, cached=True)
+                yield {"event": "token", "data": {"text": response["message"]}}
+        
+        if response is None:
+            async for event in self._process_query_async(text, conversation_history, timer, deadline, stream):
+                if event["event"] == "response":
+                    response = event["data"]
+                else:
+                    yield event
+            
+            category = response.get("category")
+            if (self.response_cache is not None and category
+                    and response.get("success") and "error" not in response
+                    and not response["message"].endswith(PARTIAL_NOTE)
+                    and (category in HISTORY_INDEPENDENT or not has_history)):
+                tables = self.response_cache.tables_for(category, response.get("sql_query"))
+                await asyncio.to_thread(self.response_cache.set, text, category, dict(response), tables)
+        
+        response["timings"] = timer.as_dict()
+        logger.info(f"process_query timings (ms): {response['timings']}")
+        telemetry.record_request(timer, response.get("category"), self._outcome(response))
+        yield {"event": "done", "data": response}
+
+    async def _process_query_async(self, text: str, conversation_history: Optional[List[Dict]],
+                                   timer: StageTimer, deadline: Deadline, stream: bool) -> AsyncIterator[Dict]:
+        """Async version of _process_query."""
         try:
-            intent = self.gemini.analyze_query_intent(text, self.schema_info)
-            if intent.get('needs_database', True):
-                sql_query = self.gemini.generate_sql_query(text, self.schema_info)
+            intercept = self._match_intercept(text)
+            if intercept:
+                category, handler = intercept
+                yield self._progress('lookup', 'Looking up project data')
+                with timer.stage('intercept'):
+                    # The statement timeout stops the queries server-side as well
+                    result = await self._within_deadline(
+                        deadline, 'intercept', asyncio.to_thread(handler, deadline.remaining())
+                    )
+                if result is not None:
+                    response = dict(result, category=category)
+                    yield {"event": "token", "data": {"text": response["message"]}}
+                    yield {"event": "response", "data": response}
+                    return
+
+            # History-dependent SQL isn't reused or cached (see _process_query)
+            use_sql_cache = self.sql_cache is not None and not conversation_history
+            if use_sql_cache:
+                cached_sql = self.sql_cache.lookup(text)
+                if cached_sql is not None:
+                    sql_query, params = cached_sql
+                    try:
+                        async for event in self._run_sql_async(
+                            text, sql_query, params, timer, deadline, stream, prepare=True
+                        ):
+                            if event["event"] == "result":
+                                response = dict(event["data"], sql_cached=True)
+                                yield {"event": "response", "data": response}
+                                return
+                            yield event
+                    except TimeoutError:
+                        raise
+                    except Exception as sql_err:
+                        logger.warning(f"Cached SQL failed, regenerating: {sql_err}")
+                        self.sql_cache.invalidate(text)
+            
+            with timer.stage('schema_retrieval'):
+                schema_context = await asyncio.to_thread(self.schema_retriever.retrieve, text) or self.schema_info
+            system_prompt = self._build_system_prompt(schema_context)
+            
+            yield self._progress('generating_sql', 'Generating SQL')
+            
+            plan = None
+            if self.combined_planning:
+                with timer.stage('plan'):
+                    plan = await self._within_deadline(deadline, 'plan', self.gemini.plan_query_async(
+                        text, schema_context, conversation_history, system_prompt,
+                        timeout=deadline.remaining()
+                    ))
+            
+            if plan is None:
+                with timer.stage('intent'):
+                    intent = await self._within_deadline(deadline, 'intent', self.gemini.analyze_query_intent_async(
+                        text, schema_context, timeout=deadline.remaining()
+                    ))
+                plan = {"needs_database": intent.get('needs_database', True)}
+                if plan["needs_database"]:
+                    with timer.stage('generate_sql'):
+                        plan["sql"] = await self._within_deadline(deadline, 'generate_sql', self.gemini.generate_sql_query_async(
+                            text, schema_context, timeout=deadline.remaining()
+                        ))
+            
+            if plan["needs_database"]:
+                sql_query = plan["sql"]
                 try:
-                    results = self.db.execute_safe(sql_query)
-                    formatted = self.gemini.format_query_results(text, sql_query, results)
-                    return {
-                        "message": formatted,
-                        "success": True,
-                        "sql_query": sql_query,
-                        "results_count": len(results)
-                    }
+                    async for event in self._run_sql_async(text, sql_query, None, timer, deadline, stream):
+                        if event["event"] == "result":
+                            if use_sql_cache:
+                                self.sql_cache.store(text, DatabaseConnector.clean_sql(sql_query))
+                            yield {"event": "response", "data": event["data"]}
+                            return
+                        yield event
+                except TimeoutError:
+                    raise
+                except QueryRejected as rejected:
+                    yield {"event": "response", "data": self._rejected_response(rejected)}
+                    return
                 except Exception as sql_err:
                     logger.error(f"SQL execution error: {sql_err}")
-                    fallback = self.gemini.generate_response(
-                        text, conversation_history, self.system_prompt
-                    )
-                    return {
+                    yield self._progress('answering', 'Answering without database results')
+                    with timer.stage('generate_response'):
+                        async for event in self._generate_text_async(
+                            stream, deadline, self.gemini.generate_response_stream_async, self.gemini.generate_response_async,
+                            text, conversation_history, system_prompt
+                        ):
+                            if event["event"] == "result":
+                                fallback = event["data"]
+                            else:
+                                yield event
+                    yield {"event": "response", "data": {
                         "message": fallback,
                         "success": True,
                         "error": str(sql_err)
-                    }
+                    }}
+                    return
 
-            # pure LLM path
-            resp = self.gemini.generate_response(text, conversation_history, self.system_prompt)
-            return {"message": resp, "success": True, "no_database": True}
+            resp = plan.get("answer")
+            if resp:
+                yield {"event": "token", "data": {"text": resp}}
+            else:
+                yield self._progress('answering', 'Generating answer')
+                with timer.stage('generate_response'):
+                    async for event in self._generate_text_async(
+                        stream, deadline, self.gemini.generate_response_stream_async, self.gemini.generate_response_async,
+                        text, conversation_history, system_prompt
+                    ):
+                        if event["event"] == "result":
+                            resp = event["data"]
+                        else:
+                            yield event
+            yield {"event": "response", "data": {
+                "message": resp, "success": True, "no_database": True, "category": "llm_answer"
+            }}
 
         except Exception as e:
+            if isinstance(e, TimeoutError) or deadline.expired():
+                logger.warning(f"Request timed out: {e}")
+                yield {"event": "response", "data": self._timeout_response(deadline)}
+                return
             logger.error(f"Error processing query: {e}")
-            return {
+            yield {"event": "response", "data": {
                 "message": "I’m sorry—something went wrong. Could you rephrase?",
                 "success": False,
                 "error": str(e)
-            }
+            }}
+
+    @staticmethod
+    async def _within_deadline(deadline: Deadline, stage: str, awaitable):
+        """Await a stage, cancelling it if the request deadline expires."""
+        if deadline.expired():
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            deadline.check(stage)
+        try:
+            return await asyncio.wait_for(awaitable, deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded during {stage}")
+
+    async def _generate_text_async(self, stream: bool, deadline: Deadline, stream_fn: Callable,
+                                   block_fn: Callable, *args) -> AsyncIterator[Dict]:
+        """Async version of _generate_text; ends with a ``result`` event."""
+        if not stream:
+            text = await self._within_deadline(
+                deadline, 'generate_text', block_fn(*args, timeout=deadline.remaining())
+            )
+            yield {"event": "token", "data": {"text": text}}
+            yield {"event": "result", "data": text}
+            return
+        deadline.check('generate_text')
+        parts = []
+        chunks = stream_fn(*args, timeout=deadline.remaining())
+        try:
+            while True:
+                try:
+                    chunk = await self._within_deadline(deadline, 'generate_text', chunks.__anext__())
+                except StopAsyncIteration:
+                    break
+                except DeadlineExceeded:
+                    if not parts:
+                        raise
+                    parts.append(PARTIAL_NOTE)
+                    yield {"event": "token", "data": {"text": PARTIAL_NOTE}}
+                    break
+                parts.append(chunk)
+                yield {"event": "token", "data": {"text": chunk}}
+        finally:
+            await chunks.aclose()
+        yield {"event": "result", "data": "".join(parts)}
+
+    async def _execute_safe_async(self, sql_query: str, params: Optional[tuple],
+                                  prepare: Optional[bool], deadline: Deadline):
+        """Run SQL on the async pool, or the sync pool in a thread without one."""
+        timeout = deadline.remaining()
+        if self.async_db is not None:
+            query = self.async_db.execute_safe(sql_query, params, prepare=prepare, timeout=timeout)
+        else:
+            query = asyncio.to_thread(self.db.execute_safe, sql_query, params, prepare=prepare, timeout=timeout)
+        return await self._within_deadline(deadline, 'execute_sql', query)
+
+    async def _run_sql_async(self, text: str, sql_query: str, params: Optional[tuple], timer: StageTimer,
+                             deadline: Deadline, stream: bool, prepare: Optional[bool] = None) -> AsyncIterator[Dict]:
+        """Async version of _run_sql; ends with a ``result`` event."""
+        yield self._progress('running_query', 'Running query')
+        with timer.stage('execute_sql'):
+            results = await self._execute_safe_async(sql_query, params, prepare, deadline)
+        with timer.stage('format_results'):
+            async for event in self._format_results_async(text, sql_query, results, deadline, stream):
+                if event["event"] == "result":
+                    formatted = event["data"]
+                else:
+                    yield event
+        yield {"event": "result", "data": {
+            "message": formatted,
+            "success": True,
+            "sql_query": sql_query,
+            "results_count": len(results),
+            "results_truncated": getattr(results, 'truncated', False),
+            "category": "llm_sql"
+        }}
+
+    async def _format_results_async(self, text: str, sql_query: str, results: List[Dict],
+                                    deadline: Deadline, stream: bool) -> AsyncIterator[Dict]:
+        """Async version of _format_results; ends with a ``result`` event."""
+        if self.format_policy != POLICY_LLM:
+            formatted = self.result_formatter.format(
+                text, results, force=self.format_policy == POLICY_LOCAL
+            )
+            if formatted is not None:
+                yield {"event": "token", "data": {"text": formatted}}
+                yield {"event": "result", "data": formatted}
+                return
+        yield self._progress('formatting', 'Formatting results')
+        try:
+            async for event in self._generate_text_async(
+                stream, deadline, self.gemini.format_query_results_stream_async, self.gemini.format_query_results_async,
+                text, sql_query, results
+            ):
+                yield event
+        except DeadlineExceeded:
+            formatted = self.result_formatter.format(text, results, force=True) + PARTIAL_NOTE
+            yield {"event": "token", "data": {"text": formatted}}
+            yield {"event": "result", "data": formatted}
 
     
     # def process_query(self, 
@@ -227,8 +842,11 @@ Response Guidelines:
 
 
         
-    def get_project_phase_details(self, project_name: str) -> Dict:
+    def get_project_phase_details(self, project_name: str, timeout: Optional[float] = None) -> Dict:
         """Get the status of each phase for a given project."""
+        name = self.project_index.resolve(project_name)
+        if name is None:
+            return self._project_not_found(project_name)
         try:
             sql = f"""
             SELECT
@@ -239,12 +857,12 @@ Response Guidelines:
             FROM projects p
             JOIN phases ph
               ON ph.project_id = p.id
-            WHERE p.name ILIKE %s
+            WHERE p.name = %s
             ORDER BY ph."order";
             """
-            rows = self.db.execute_query(sql, (f"%{project_name}%",))
+            rows = self.db.execute_query(sql, (name,), timeout=timeout)
             if not rows:
-                return {"message": f"No phases found for project '{project_name}'.", "success": True}
+                return {"message": f"No phases found for project '{name}'.", "success": True}
 
             # Build markdown table
             header = "| Phase | Order | Status |\n|---|---|---|\n"
@@ -256,6 +874,8 @@ Response Guidelines:
                 "message": f"**Phase Status for {rows[0]['project_name']}:**\n\n" + header + body,
                 "success": True
             }
+        except TimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching phase details: {e}")
             return {"message": "Sorry, I couldn’t fetch the phase details right now.", "success": False}
@@ -297,8 +917,19 @@ Response Guidelines:
                 "message": "Sorry, I couldn’t retrieve budget status right now.",
                 "success": False
             }
-    def get_budget_status_all(self) -> Dict:
+    def get_budget_status_all(self, timeout: Optional[float] = None) -> Dict:
         """Return # of invoices and total invoiced per project."""
+        rows = self.rollups.invoice_totals(timeout=timeout) if self.rollups is not None else None
+        if rows is None:
+            rows = self._budget_status_live(timeout)
+        header = "| Project | # Invoices | Total Invoiced |\n|---|---|---|\n"
+        body = "\n".join(
+            f"| **{r['project']}** | {r['invoice_count']} | ${r['total_invoiced']} |"
+            for r in rows
+        )
+        return {"message": f"**Budget Status for All Projects**\n\n{header}{body}", "success": True}
+
+    def _budget_status_live(self, timeout: Optional[float] = None) -> List[Dict]:
         sql = """
         SELECT
           p.name AS project,
@@ -307,19 +938,17 @@ Response Guidelines:
         FROM projects p
         LEFT JOIN leads  l ON p.client_id   = l.id
         LEFT JOIN invoices i ON i.customer_id = l.id
-        GROUP BY p.name
+        GROUP BY p.id
         ORDER BY total_invoiced DESC;
         """
-        rows = self.db.execute_query(sql)
-        header = "| Project | # Invoices | Total Invoiced |\n|---|---|---|\n"
-        body = "\n".join(
-            f"| **{r['project']}** | {r['invoice_count']} | ${r['total_invoiced']} |"
-            for r in rows
-        )
-        return {"message": f"**Budget Status for All Projects**\n\n{header}{body}", "success": True}
+        # One row per project, like chatbot_invoice_rollup (names may repeat)
+        return self.db.execute_query(sql, timeout=timeout)
 
-    def get_project_budget_details(self, project_key: str) -> Dict:
+    def get_project_budget_details(self, project_key: str, timeout: Optional[float] = None) -> Dict:
         """Return every invoice for a single project."""
+        name = self.project_index.resolve(project_key)
+        if name is None:
+            return self._project_not_found(project_key)
         sql = """
         SELECT
           p.name            AS project,
@@ -333,10 +962,10 @@ Response Guidelines:
         WHERE p.name = %s
         ORDER BY i."paymentDate" DESC;
         """
-        rows = self.db.execute_query(sql, (project_key,))
+        rows = self.db.execute_query(sql, (name,), timeout=timeout)
         if not rows:
             return {
-                "message": f"No invoices found for project **{project_key}**.",
+                "message": f"No invoices found for project **{name}**.",
                 "success": True
             }
 
@@ -350,46 +979,37 @@ Response Guidelines:
             "success": True
         }
 
-    def _handle_project_summary(self, raw_name: str) -> Dict:
-        """
-        1) Try exact summary
-        2) Fuzzy-match against self.all_project_names
-        3) If no close match, list all projects
-        """
-        # 1) exact
-        resp = self.get_project_summary(raw_name)
-        if resp.get("success"):
-            return resp
-        
-        # 2) fuzzy
-        candidates = [n.upper() for n in self.all_project_names]
-        matches = difflib.get_close_matches(raw_name.upper(), candidates, n=3, cutoff=0.6)
+    def _project_not_found(self, raw_name: str, max_listed: int = 50) -> Dict:
+        """Suggest close project names; list projects if nothing is close."""
+        matches = self.project_index.search(raw_name, limit=5)
         if matches:
-            suggestions = [n for n in self.all_project_names if n.upper() in matches]
-            list_md = "\n".join(f"- **{n}**" for n in suggestions)
+            list_md = "\n".join(f"- **{name}**" for name, _ in matches)
             return {
                 "message": (
-                    f"I couldn't find an exact project named '{raw_name}'.\n"
+                    f"I couldn't find an exact project named **{raw_name}**.\n"
                     "Did you mean:\n\n" + list_md
                 ),
                 "success": True
             }
-        
-        # 3) list all
-        full_list = "\n".join(f"- **{n}**" for n in self.all_project_names)
+
+        names = self.project_index.names()
+        full_list = "\n".join(f"- **{n}**" for n in names[:max_listed])
+        if len(names) > max_listed:
+            full_list += f"\n- …and {len(names) - max_listed} more"
         return {
             "message": (
-                f"No project matches '{raw_name}'. Here are all available projects:\n\n" + full_list
+                f"No project matches **{raw_name}**. Here are the available projects:\n\n" + full_list
             ),
             "success": True
         }
 
-    
-    
-    def get_project_summary(self, project_name: str) -> Dict:
+    def get_project_summary(self, project_name: str, timeout: Optional[float] = None) -> Dict:
         """Get comprehensive project summary as a Markdown message."""
+        # 1) Resolve the name through the project index (suggestions on a miss)
+        name = self.project_index.resolve(project_name)
+        if name is None:
+            return self._project_not_found(project_name)
         try:
-            # 1) Try to load exactly that project (case‐insensitive)
             sql_project = """
             SELECT
               p.id,
@@ -407,40 +1027,18 @@ Response Guidelines:
               ON p.project_designer_id = u.id
             LEFT JOIN leads l
               ON p.client_id = l.id
-            WHERE UPPER(p.name) = %s
+            WHERE p.name = %s
             LIMIT 1;
             """
-            proj_rows = self.db.execute_query(sql_project, (project_name.upper(),))
+            proj_rows = self.db.execute_query(sql_project, (name,), timeout=timeout)
             if not proj_rows:
-                # 1a) suggestions on partial match
-                suggestions = self.db.execute_query(
-                    "SELECT name FROM projects WHERE name ILIKE %s ORDER BY name LIMIT 5",
-                    (f"%{project_name}%",)
-                )
-                if suggestions:
-                    items = "\n".join(f"- **{r['name']}**" for r in suggestions)
-                    return {
-                        "message": (
-                            f"I couldn't find an exact project named **{project_name}**.\n"
-                            "Did you mean:\n\n" + items
-                        ),
-                        "success": True
-                    }
-                # 1b) full list fallback
-                all_names = self.db.execute_query("SELECT name FROM projects ORDER BY name", ())
-                items = "\n".join(f"- **{r['name']}**" for r in all_names)
-                return {
-                    "message": (
-                        f"No project matches **{project_name}**. Here are all available projects:\n\n"
-                        + items
-                    ),
-                    "success": True
-                }
+                return self._project_not_found(project_name)
 
             # 2) We have an exact match
             project = proj_rows[0]
 
-            # 3) Load phase/subphase counts for % done
+            # 3) Load phase/subphase counts for % done (precomputed when fresh)
+            phases = self.rollups.phase_progress(project["id"], timeout=timeout) if self.rollups is not None else None
             phase_q = """
             SELECT
               ph.name   AS phase_name,
@@ -455,7 +1053,8 @@ Response Guidelines:
             GROUP BY ph.id
             ORDER BY ph."order";
             """
-            phases = self.db.execute_query(phase_q, (project["id"],))
+            if phases is None:
+                phases = self.db.execute_query(phase_q, (project["id"],), timeout=timeout)
 
             # 4) Build the Markdown response
             header = (
@@ -481,6 +1080,8 @@ Response Guidelines:
 
             return {"message": header + rows_md, "success": True}
 
+        except TimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error getting project summary: {e}")
             return {
@@ -489,42 +1090,12 @@ Response Guidelines:
             }
     
     def search_across_database(self, search_term: str) -> Dict:
-        """Search across multiple tables for relevant information."""
+        """Search projects, phases and tasks at once, ranked across entities."""
         try:
-            results = {}
-            
-            # Search projects
-            project_query = f"""
-            SELECT name, 'project' as type, id
-            FROM projects
-            WHERE name ILIKE '%{search_term}%'
-            LIMIT 10;
-            """
-            results['projects'] = self.db.execute_query(project_query)
-            
-            # Search phases
-            phase_query = f"""
-            SELECT ph.name, 'phase' as type, ph.id, p.name as project_name
-            FROM phases ph
-            JOIN projects p ON ph.project_id = p.id
-            WHERE ph.name ILIKE '%{search_term}%'
-            LIMIT 10;
-            """
-            results['phases'] = self.db.execute_query(phase_query)
-            
-            # Search subphases/tasks
-            task_query = f"""
-            SELECT sp.name, 'task' as type, sp.id, ph.name as phase_name, p.name as project_name
-            FROM subphases sp
-            JOIN phases ph ON sp.phase_id = ph.id
-            JOIN projects p ON ph.project_id = p.id
-            WHERE sp.name ILIKE '%{search_term}%'
-            LIMIT 10;
-            """
-            results['tasks'] = self.db.execute_query(task_query)
-            
+            found = self.search_engine.search(search_term)
             return {
-                "results": results,
+                "results": found["results"],
+                "ranked": found["ranked"],
                 "success": True
             }
             
@@ -552,7 +1123,9 @@ Response Guidelines:
             LEFT JOIN subphases sp ON ph.id = sp.phase_id;
             """
             
-            dashboard_data = self.db.execute_query(dashboard_query)[0]
+            dashboard_data = self.rollups.dashboard() if self.rollups is not None else None
+            if dashboard_data is None:
+                dashboard_data = self.db.execute_query(dashboard_query)[0]
             
             # Get recent activity
             recent_query = """
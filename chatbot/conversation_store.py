@@ -0,0 +1,169 @@
+"""
+Conversation history storage.
+
+Every backend keeps at most ``max_messages`` per chat (appends are O(1) and
+drop the oldest messages) and expires chats idle for longer than ``ttl``.
+The in-process backend is per worker; the SQLite and Redis backends are
+shared by every worker on the host / cluster and survive restarts.
+"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+class InMemoryConversationStore:
+    def __init__(self, max_messages: int = 20, ttl: int = 86400, max_chats: int = 10000):
+        """Per-process store: a ring buffer per chat, LRU across chats."""
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self._chats = OrderedDict()  # chat_id -> [deque, last_access]
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: str) -> List[Dict]:
+        with self._lock:
+            item = self._chats.get(chat_id)
+            if item is None:
+                return []
+            if time.time() - item[1] > self.ttl:
+                del self._chats[chat_id]
+                return []
+            return list(item[0])
+
+    def append(self, chat_id: str, *messages: Dict):
+        with self._lock:
+            item = self._chats.get(chat_id)
+            if item is None:
+                item = [deque(maxlen=self.max_messages), 0.0]
+                self._chats[chat_id] = item
+            item[0].extend(messages)
+            item[1] = time.time()
+            self._chats.move_to_end(chat_id)
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+
+    def clear(self, chat_id: str):
+        with self._lock:
+            self._chats.pop(chat_id, None)
+
+    def size(self) -> int:
+        return len(self._chats)
+
+class SqliteConversationStore:
+    def __init__(self, path: str, max_messages: int = 20, ttl: int = 86400):
+        """Store shared by all workers on a host via a SQLite file."""
+        self.path = path
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_chat ON chat_messages (chat_id, seq)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections aren't shareable)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self):
+        """Drop connections inherited from the parent process."""
+        self._local = threading.local()
+
+    def get(self, chat_id: str) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT role, content FROM chat_messages "
+            "WHERE chat_id = ? AND created_at >= ? ORDER BY seq",
+            (chat_id, time.time() - self.ttl)
+        ).fetchall()
+        return [{'role': role, 'content': content} for role, content in rows]
+
+    def append(self, chat_id: str, *messages: Dict):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO chat_messages (chat_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(chat_id, m['role'], m['content'], now) for m in messages]
+            )
+            # Keep only the newest max_messages for this chat
+            conn.execute(
+                "DELETE FROM chat_messages WHERE chat_id = ? AND seq <= ("
+                "  SELECT seq FROM chat_messages WHERE chat_id = ? "
+                "  ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (chat_id, chat_id, self.max_messages)
+            )
+            if now - self._last_sweep > 300:
+                conn.execute("DELETE FROM chat_messages WHERE created_at < ?", (now - self.ttl,))
+                self._last_sweep = now
+
+    def clear(self, chat_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chat_messages WHERE chat_id = ?", (chat_id,))
+
+    def size(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(DISTINCT chat_id) FROM chat_messages"
+        ).fetchone()[0]
+
+class RedisConversationStore:
+    def __init__(self, url: str, max_messages: int = 20, ttl: int = 86400,
+                 prefix: str = 'chatbot:conversation:'):
+        """Store shared across hosts via a Redis-compatible server."""
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The 'redis' package is required for the redis conversation store")
+        self.client = redis.Redis.from_url(url)
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, chat_id: str) -> List[Dict]:
+        return [json.loads(m) for m in self.client.lrange(self.prefix + chat_id, 0, -1)]
+
+    def append(self, chat_id: str, *messages: Dict):
+        key = self.prefix + chat_id
+        pipe = self.client.pipeline()
+        pipe.rpush(key, *[json.dumps(m) for m in messages])
+        pipe.ltrim(key, -self.max_messages, -1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def clear(self, chat_id: str):
+        self.client.delete(self.prefix + chat_id)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+def create_conversation_store(backend: str = 'memory',
+                              url: str = None,
+                              max_messages: int = 20,
+                              ttl: int = 86400,
+                              max_chats: int = 10000):
+    """Build a conversation store by name ('memory', 'sqlite' or 'redis')."""
+    if backend == 'memory':
+        return InMemoryConversationStore(max_messages, ttl, max_chats)
+    if backend == 'sqlite':
+        return SqliteConversationStore(url or 'conversations.db', max_messages, ttl)
+    if backend == 'redis':
+        if not url:
+            raise ValueError("A URL is required for the redis conversation store")
+        return RedisConversationStore(url, max_messages, ttl)
+    raise ValueError(f"Unknown conversation store backend: {backend}")
@@ -1,18 +1,74 @@
 """
 Simple Gemini API client for construction chatbot.
 """
-import google.generativeai as genai
+import json
+import re
+import time
 import logging
-from typing import List, Dict, Optional
+from collections.abc import Hashable
+from decimal import Decimal
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import telemetry
 
 logger = logging.getLogger(__name__)
 
+SQL_RULES = """1. Only use SELECT statements.
+2. Wrap **every** table and column name in double quotes exactly as shown in the schema 
+   (e.g. "projects"."createdAt", "phases"."status").
+3. Include appropriate JOIN, WHERE, and ORDER BY clauses.
+5. Use proper PostgreSQL syntax.
+6. Handle NULL values appropriately.
+7. Use table aliases (also quoted) for readability."""
+
+# Rows pasted into the formatting prompt; the rest are summarized
+PROMPT_SAMPLE_ROWS = 30
+
+def summarize_results(results: List[Dict], sample_rows: int = PROMPT_SAMPLE_ROWS) -> str:
+    """Compact prompt text for query results: a row sample plus aggregates.
+    
+    Rows are written as pipe-separated values under one header line. When
+    there are more rows than ``sample_rows``, numeric columns are summarized
+    (min / max / sum / avg) over every fetched row instead of pasting them.
+    """
+    if not results:
+        return "(no rows)"
+    columns = getattr(results, 'columns', None) or list(results[0].keys())
+    rows = getattr(results, 'rows', None)
+    if rows is None:
+        rows = [tuple(r.values()) for r in results]
+    
+    lines = [" | ".join(columns)]
+    lines.extend(" | ".join("" if v is None else str(v) for v in row) for row in rows[:sample_rows])
+    
+    total = f"{len(rows)}+" if getattr(results, 'truncated', False) else str(len(rows))
+    if len(rows) <= sample_rows:
+        return f"Rows: {total}\n" + "\n".join(lines)
+    
+    summaries = []
+    for index, column in enumerate(columns):
+        values = [row[index] for row in rows
+                  if isinstance(row[index], (int, float, Decimal)) and not isinstance(row[index], bool)]
+        if values:
+            summaries.append(
+                f"- {column}: min={min(values)}, max={max(values)}, "
+                f"sum={sum(values)}, avg={round(sum(values) / len(values), 2)}"
+            )
+        else:
+            distinct = len({row[index] for row in rows if isinstance(row[index], Hashable)})
+            summaries.append(f"- {column}: {distinct} distinct values")
+    return (
+        f"Rows: {total} (first {sample_rows} shown)\n" + "\n".join(lines)
+        + f"\n\nColumn summaries over all {len(rows)} fetched rows:\n" + "\n".join(summaries)
+    )
+
 class GeminiClient:
     def __init__(self, api_key: str, model_name: str = 'gemini-1.5-flash'):
         """Initialize Gemini client."""
         if not api_key:
             raise ValueError("Gemini API key is required")
         
+        # Imported here: the SDK is slow to import and only needed once a client exists
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
         
@@ -44,35 +100,97 @@ class GeminiClient:
             "candidate_count": 1
         }
     
+    @staticmethod
+    def _request_options(timeout: Optional[float]) -> Dict:
+        """Client-side timeout for one API call (None keeps the library default).
+        
+        Every public call takes ``timeout`` (seconds) so the chat pipeline can
+        hand down what's left of the request deadline.
+        """
+        if timeout is None:
+            return {}
+        return {"request_options": {"timeout": max(timeout, 0.1)}}
+    
+    def _generate(self, call: str, contents, **kwargs):
+        """generate_content, recording latency and token usage under ``call``."""
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(contents, **kwargs)
+        except Exception:
+            telemetry.LLM_ERRORS.inc(call=call)
+            raise
+        if kwargs.get('stream'):
+            return self._observed_stream(call, started, response)
+        telemetry.observe_llm(call, time.perf_counter() - started, response)
+        return response
+    
+    @staticmethod
+    def _observed_stream(call: str, started: float, response) -> Iterator:
+        try:
+            yield from response
+        finally:
+            # Usage metadata is only complete once the stream is consumed
+            telemetry.observe_llm(call, time.perf_counter() - started, response)
+    
+    async def _generate_async(self, call: str, contents, **kwargs):
+        """Async version of _generate."""
+        started = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(contents, **kwargs)
+        except Exception:
+            telemetry.LLM_ERRORS.inc(call=call)
+            raise
+        if kwargs.get('stream'):
+            return self._observed_stream_async(call, started, response)
+        telemetry.observe_llm(call, time.perf_counter() - started, response)
+        return response
+    
+    @staticmethod
+    async def _observed_stream_async(call: str, started: float, response) -> AsyncIterator:
+        try:
+            async for chunk in response:
+                yield chunk
+        finally:
+            telemetry.observe_llm(call, time.perf_counter() - started, response)
+    
+    def _build_conversation_prompt(self,
+                                   prompt: str,
+                                   conversation_history: Optional[List[Dict]] = None,
+                                   system_prompt: Optional[str] = None) -> str:
+        """Build the full prompt from system prompt, history and message."""
+        # Build conversation context
+        context = []
+        
+        if system_prompt:
+            context.append(f"System: {system_prompt}")
+        
+        if conversation_history:
+            for msg in conversation_history[-5:]:  # Last 5 messages
+                role = msg.get('role', 'user')
+                content = msg.get('content', '')
+                context.append(f"{role.capitalize()}: {content}")
+        
+        # Add current prompt
+        context.append(f"User: {prompt}")
+        
+        # Join all context
+        return "\n".join(context)
+    
     def generate_response(self, 
                          prompt: str, 
                          conversation_history: Optional[List[Dict]] = None,
-                         system_prompt: Optional[str] = None) -> str:
+                         system_prompt: Optional[str] = None,
+                         timeout: Optional[float] = None) -> str:
         """Generate response from Gemini API."""
         try:
-            # Build conversation context
-            context = []
-            
-            if system_prompt:
-                context.append(f"System: {system_prompt}")
-            
-            if conversation_history:
-                for msg in conversation_history[-5:]:  # Last 5 messages
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    context.append(f"{role.capitalize()}: {content}")
-            
-            # Add current prompt
-            context.append(f"User: {prompt}")
-            
-            # Join all context
-            full_prompt = "\n".join(context)
+            full_prompt = self._build_conversation_prompt(prompt, conversation_history, system_prompt)
             
             # Generate response
-            response = self.model.generate_content(
+            response = self._generate('generate_response',
                 full_prompt,
                 generation_config=self.generation_config,
-                safety_settings=self.safety_settings
+                safety_settings=self.safety_settings,
+                **self._request_options(timeout)
             )
             
             if response.text:
@@ -86,11 +204,40 @@ class GeminiClient:
             logger.error(f"Error generating response: {e}")
             return f"I encountered an error: {str(e)}. Please try again."
     
-    def generate_sql_query(self, 
-                           user_request: str, 
-                           schema_info: str) -> str:
-        """Generate SQL query based on user request and schema."""
-        sql_prompt = f"""You are a SQL expert for a construction project management database.
+    def generate_response_stream(self,
+                                 prompt: str,
+                                 conversation_history: Optional[List[Dict]] = None,
+                                 system_prompt: Optional[str] = None,
+                                 timeout: Optional[float] = None) -> Iterator[str]:
+        """Stream a response from Gemini API chunk by chunk."""
+        try:
+            full_prompt = self._build_conversation_prompt(prompt, conversation_history, system_prompt)
+            response = self._generate('generate_response_stream',
+                full_prompt,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                stream=True,
+                **self._request_options(timeout)
+            )
+            
+            produced = False
+            for chunk in response:
+                if chunk.text:
+                    produced = True
+                    yield chunk.text
+            
+            if not produced:
+                # Handle blocked content or other issues
+                logger.warning("No response text generated")
+                yield "I'm sorry, I couldn't generate a response for that query."
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            yield f"I encountered an error: {str(e)}. Please try again."
+    
+    def _build_sql_prompt(self, user_request: str, schema_info: str) -> str:
+        """Build the prompt for generating SQL from a request."""
+        return f"""You are a SQL expert for a construction project management database.
 
 Database Schema:
 {schema_info}
@@ -98,23 +245,25 @@ Database Schema:
 User Request: {user_request}
 
 Generate a SQL query to answer this request. Follow these rules **exactly**:
-1. Only use SELECT statements.
-2. Wrap **every** table and column name in double quotes exactly as shown in the schema 
-   (e.g. "projects"."createdAt", "phases"."status").
-3. Include appropriate JOIN, WHERE, and ORDER BY clauses.
-5. Use proper PostgreSQL syntax.
-6. Handle NULL values appropriately.
-7. Use table aliases (also quoted) for readability.
+{SQL_RULES}
 
 Provide **only** the SQL query, no explanation:"""
+    
+    def generate_sql_query(self, 
+                           user_request: str, 
+                           schema_info: str,
+                           timeout: Optional[float] = None) -> str:
+        """Generate SQL query based on user request and schema."""
+        sql_prompt = self._build_sql_prompt(user_request, schema_info)
 
         try:
-            response = self.model.generate_content(
+            response = self._generate('generate_sql_query',
                 sql_prompt,
                 generation_config={
                     "temperature": 0.3,   # Lower temperature for precise SQL
                     "max_output_tokens": 1024
-                }
+                },
+                **self._request_options(timeout)
             )
             # Strip any leading/trailing whitespace or code fences
             return response.text.strip().strip("```").strip()
@@ -122,16 +271,17 @@ Provide **only** the SQL query, no explanation:"""
             logger.error(f"Error generating SQL query: {e}")
             raise
     
-    def format_query_results(self, 
-                            user_request: str, 
-                            query: str, 
-                            results: List[Dict]) -> str:
-        """Format query results into natural language response."""
+    def _build_format_prompt(self,
+                             user_request: str,
+                             query: str,
+                             results: List[Dict]) -> str:
+        """Build the prompt for turning query results into prose."""
         format_prompt = f"""Format these database query results into a natural, conversational response.
 
 User's Question: {user_request}
 SQL Query Used: {query}
-Results: {results}
+Results:
+{summarize_results(results)}
 
 Requirements:
 1. Present information clearly and concisely
@@ -143,14 +293,24 @@ Requirements:
 7. If there are too many results, summarize key points
 
 Format the response:"""
+        return format_prompt
+    
+    def format_query_results(self, 
+                            user_request: str, 
+                            query: str, 
+                            results: List[Dict],
+                            timeout: Optional[float] = None) -> str:
+        """Format query results into natural language response."""
+        format_prompt = self._build_format_prompt(user_request, query, results)
         
         try:
-            response = self.model.generate_content(
+            response = self._generate('format_query_results',
                 format_prompt,
                 generation_config={
                     "temperature": 0.0,
                     "max_output_tokens": 2048
-                }
+                },
+                **self._request_options(timeout)
             )
             
             return response.text.strip()
@@ -159,9 +319,36 @@ Format the response:"""
             logger.error(f"Error formatting results: {e}")
             return f"I found {len(results)} results but had trouble formatting them."
     
-    def analyze_query_intent(self, user_message: str, schema_info: str) -> Dict:
-        """Analyze user query to determine if SQL is needed."""
-        intent_prompt = f"""Analyze this user message to determine if a database query is needed.
+    def format_query_results_stream(self,
+                                   user_request: str,
+                                   query: str,
+                                   results: List[Dict],
+                                   timeout: Optional[float] = None) -> Iterator[str]:
+        """Stream the formatted query results chunk by chunk."""
+        format_prompt = self._build_format_prompt(user_request, query, results)
+        
+        try:
+            response = self._generate('format_query_results_stream',
+                format_prompt,
+                generation_config={
+                    "temperature": 0.0,
+                    "max_output_tokens": 2048
+                },
+                stream=True,
+                **self._request_options(timeout)
+            )
+            
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+            
+        except Exception as e:
+            logger.error(f"Error streaming formatted results: {e}")
+            yield f"I found {len(results)} results but had trouble formatting them."
+    
+    def _build_intent_prompt(self, user_message: str, schema_info: str) -> str:
+        """Build the prompt for deciding whether SQL is needed."""
+        return f"""Analyze this user message to determine if a database query is needed.
 
 User Message: {user_message}
 Available Database: {schema_info}
@@ -172,18 +359,22 @@ Respond with JSON format:
     "explanation": "brief explanation of why database is or isn't needed",
     "suggested_approach": "how to handle this query"
 }}"""
+    
+    def analyze_query_intent(self, user_message: str, schema_info: str, timeout: Optional[float] = None) -> Dict:
+        """Analyze user query to determine if SQL is needed."""
+        intent_prompt = self._build_intent_prompt(user_message, schema_info)
         
         try:
-            response = self.model.generate_content(
+            response = self._generate('analyze_query_intent',
                 intent_prompt,
                 generation_config={
                     "temperature": 0.3,
                     "max_output_tokens": 512
-                }
+                },
+                **self._request_options(timeout)
             )
             
             # Parse JSON response
-            import json
             try:
                 return json.loads(response.text.strip())
             except json.JSONDecodeError:
@@ -201,4 +392,264 @@ Respond with JSON format:
                 "needs_database": True,
                 "explanation": f"Error in analysis: {e}",
                 "suggested_approach": "Execute database query"
-            }
\ No newline at end of file
+            }
+    
+    def _build_plan_prompt(self,
+                           user_message: str,
+                           schema_info: str,
+                           conversation_history: Optional[List[Dict]] = None,
+                           system_prompt: Optional[str] = None) -> str:
+        """Build the combined intent + SQL planning prompt."""
+        context = []
+        if system_prompt:
+            context.append(f"System: {system_prompt}")
+        else:
+            context.append(f"Database Schema:\n{schema_info}")
+        
+        if conversation_history:
+            for msg in conversation_history[-5:]:  # Last 5 messages
+                role = msg.get('role', 'user')
+                content = msg.get('content', '')
+                context.append(f"{role.capitalize()}: {content}")
+        
+        context.append(f"""User: {user_message}
+
+Decide whether answering this message needs a database query.
+If it does, write the SQL query following these rules **exactly**:
+{SQL_RULES}
+If it does not, write the final answer for the user in Markdown.
+
+Respond with **only** this JSON object:
+{{
+    "needs_database": true/false,
+    "sql": "the SQL query, or null",
+    "answer": "the Markdown answer, or null"
+}}""")
+        return "\n".join(context)
+    
+    def plan_query(self,
+                   user_message: str,
+                   schema_info: str,
+                   conversation_history: Optional[List[Dict]] = None,
+                   system_prompt: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Optional[Dict]:
+        """Decide intent and produce SQL (or a direct answer) in one call.
+        
+        Returns None if the model's output can't be parsed, so callers can
+        fall back to analyze_query_intent + generate_sql_query.
+        """
+        try:
+            response = self._generate('plan_query',
+                self._build_plan_prompt(user_message, schema_info, conversation_history, system_prompt),
+                generation_config={
+                    "temperature": 0.0,
+                    "max_output_tokens": 2048
+                },
+                safety_settings=self.safety_settings,
+                **self._request_options(timeout)
+            )
+            plan = self._parse_json(response.text)
+        except Exception as e:
+            logger.error(f"Error planning query: {e}")
+            return None
+        return self._normalize_plan(plan)
+    
+    @staticmethod
+    def _normalize_plan(plan) -> Optional[Dict]:
+        """Validate a parsed plan; None means fall back to the multi-call path."""
+        if not isinstance(plan, dict) or 'needs_database' not in plan:
+            logger.warning("Could not parse combined plan; falling back to multi-call path")
+            return None
+        
+        needs_database = plan['needs_database']
+        if isinstance(needs_database, str):
+            needs_database = needs_database.strip().lower() == 'true'
+        plan['needs_database'] = bool(needs_database)
+        if plan['needs_database']:
+            sql = (plan.get('sql') or '').strip().strip("```").strip()
+            if not sql:
+                return None
+            plan['sql'] = sql
+        return plan
+    
+    @staticmethod
+    def _parse_json(text: str):
+        """Parse a JSON object from model output, tolerating code fences."""
+        if not text:
+            return None
+        cleaned = re.sub(r'^\s*```(?:json)?\s*|\s*```\s*$', '', text.strip())
+        try:
+            return json.loads(cleaned)
+        except json.JSONDecodeError:
+            match = re.search(r'\{.*\}', cleaned, re.DOTALL)
+            if not match:
+                return None
+            try:
+                return json.loads(match.group(0))
+            except json.JSONDecodeError:
+                return None
+    
+    # ---- asyncio variants (used by the ASGI app) ----
+    
+    async def generate_response_async(self,
+                                      prompt: str,
+                                      conversation_history: Optional[List[Dict]] = None,
+                                      system_prompt: Optional[str] = None,
+                                      timeout: Optional[float] = None) -> str:
+        """Async version of generate_response."""
+        try:
+            full_prompt = self._build_conversation_prompt(prompt, conversation_history, system_prompt)
+            response = await self._generate_async('generate_response',
+                full_prompt,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                **self._request_options(timeout)
+            )
+            
+            if response.text:
+                return response.text
+            logger.warning("No response text generated")
+            return "I'm sorry, I couldn't generate a response for that query."
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return f"I encountered an error: {str(e)}. Please try again."
+    
+    async def generate_response_stream_async(self,
+                                             prompt: str,
+                                             conversation_history: Optional[List[Dict]] = None,
+                                             system_prompt: Optional[str] = None,
+                                             timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Async version of generate_response_stream."""
+        try:
+            full_prompt = self._build_conversation_prompt(prompt, conversation_history, system_prompt)
+            response = await self._generate_async('generate_response_stream',
+                full_prompt,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                stream=True,
+                **self._request_options(timeout)
+            )
+            
+            produced = False
+            async for chunk in response:
+                if chunk.text:
+                    produced = True
+                    yield chunk.text
+            
+            if not produced:
+                logger.warning("No response text generated")
+                yield "I'm sorry, I couldn't generate a response for that query."
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            yield f"I encountered an error: {str(e)}. Please try again."
+    
+    async def generate_sql_query_async(self, user_request: str, schema_info: str, timeout: Optional[float] = None) -> str:
+        """Async version of generate_sql_query."""
+        try:
+            response = await self._generate_async('generate_sql_query',
+                self._build_sql_prompt(user_request, schema_info),
+                generation_config={
+                    "temperature": 0.3,
+                    "max_output_tokens": 1024
+                },
+                **self._request_options(timeout)
+            )
+            return response.text.strip().strip("```").strip()
+        except Exception as e:
+            logger.error(f"Error generating SQL query: {e}")
+            raise
+    
+    async def format_query_results_async(self,
+                                         user_request: str,
+                                         query: str,
+                                         results: List[Dict],
+                                         timeout: Optional[float] = None) -> str:
+        """Async version of format_query_results."""
+        try:
+            response = await self._generate_async('format_query_results',
+                self._build_format_prompt(user_request, query, results),
+                generation_config={
+                    "temperature": 0.0,
+                    "max_output_tokens": 2048
+                },
+                **self._request_options(timeout)
+            )
+            return response.text.strip()
+        except Exception as e:
+            logger.error(f"Error formatting results: {e}")
+            return f"I found {len(results)} results but had trouble formatting them."
+    
+    async def format_query_results_stream_async(self,
+                                                user_request: str,
+                                                query: str,
+                                                results: List[Dict],
+                                                timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Async version of format_query_results_stream."""
+        try:
+            response = await self._generate_async('format_query_results_stream',
+                self._build_format_prompt(user_request, query, results),
+                generation_config={
+                    "temperature": 0.0,
+                    "max_output_tokens": 2048
+                },
+                stream=True,
+                **self._request_options(timeout)
+            )
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Error streaming formatted results: {e}")
+            yield f"I found {len(results)} results but had trouble formatting them."
+    
+    async def analyze_query_intent_async(self, user_message: str, schema_info: str, timeout: Optional[float] = None) -> Dict:
+        """Async version of analyze_query_intent."""
+        try:
+            response = await self._generate_async('analyze_query_intent',
+                self._build_intent_prompt(user_message, schema_info),
+                generation_config={
+                    "temperature": 0.3,
+                    "max_output_tokens": 512
+                },
+                **self._request_options(timeout)
+            )
+            try:
+                return json.loads(response.text.strip())
+            except json.JSONDecodeError:
+                return {
+                    "needs_database": True,
+                    "explanation": "Defaulting to database query",
+                    "suggested_approach": "Execute database query"
+                }
+        except Exception as e:
+            logger.error(f"Error analyzing query intent: {e}")
+            return {
+                "needs_database": True,
+                "explanation": f"Error in analysis: {e}",
+                "suggested_approach": "Execute database query"
+            }
+    
+    async def plan_query_async(self,
+                               user_message: str,
+                               schema_info: str,
+                               conversation_history: Optional[List[Dict]] = None,
+                               system_prompt: Optional[str] = None,
+                               timeout: Optional[float] = None) -> Optional[Dict]:
+        """Async version of plan_query."""
+        try:
+            response = await self._generate_async('plan_query',
+                self._build_plan_prompt(user_message, schema_info, conversation_history, system_prompt),
+                generation_config={
+                    "temperature": 0.0,
+                    "max_output_tokens": 2048
+                },
+                safety_settings=self.safety_settings,
+                **self._request_options(timeout)
+            )
+            plan = self._parse_json(response.text)
+        except Exception as e:
+            logger.error(f"Error planning query: {e}")
+            return None
+        return self._normalize_plan(plan)
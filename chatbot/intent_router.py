@@ -0,0 +1,232 @@
+"""
+Rule-based intent routing ahead of the LLM.
+
+Each intent is a set of question patterns mapped to either a ChatHandler
+method or a parameterized SQL template. All patterns are compiled into one
+alternation, so a question is routed with a single regex scan (the
+earliest match wins, ties go to the intent listed first); only unmatched
+questions pay for a Gemini round trip.
+
+Patterns may use slots: ``{project}`` captures a project key such as
+CABOT-1B or "cabot 1b" (resolved through the project index), ``{days}`` a
+number of days and ``{text}`` free text. Intents can be added through a
+JSON file (``INTENT_ROUTES_PATH``) using the same shape as BUILTIN_INTENTS.
+"""
+import re
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SLOTS = {
+    'project': r'(?P<project>[A-Za-z]+[- ]?\d+[A-Za-z0-9]*)',
+    'days': r'(?P<days>\d{1,3})',
+    'text': r'(?P<text>.+?)',
+}
+
+# Legacy intercept patterns capture any word as the project
+ANY_PROJECT = r'(?P<project>[A-Za-z0-9\-]+)'
+
+# Listed in priority order for matches starting at the same position
+BUILTIN_INTENTS = [
+    {
+        'name': 'project_detail',
+        'patterns': [rf'\bdetails? of\s+{ANY_PROJECT}\s+project'],
+        'handler': 'get_project_summary',
+    },
+    {
+        'name': 'phase_status',
+        'patterns': [rf'\b(?:status|progress) of\s+{ANY_PROJECT}'],
+        'handler': 'get_project_phase_details',
+    },
+    {
+        'name': 'budget_all',
+        'patterns': [r'budget status for all projects'],
+        'handler': 'get_budget_status_all',
+    },
+    {
+        'name': 'budget_project',
+        'patterns': [
+            rf'budget status for\s+{ANY_PROJECT}\s+project',
+            r'\binvoices?\b.*?\b(?:issued |sent |billed )?(?:for|on|to)\s+(?:project\s+)?{project}',
+        ],
+        'handler': 'get_project_budget_details',
+    },
+    {
+        'name': 'current_subphase',
+        'patterns': [
+            r'\b(?:what|which) (?:sub-?phase|subphase) is\s+(?:project\s+)?{project}',
+            r'\bcurrent sub-?phase (?:of|for|in|on)\s+(?:project\s+)?{project}',
+            r'\b{project}(?: project)?\'?s? current sub-?phase',
+        ],
+        'title': 'Current subphase for {project}',
+        'sql': """
+            SELECT ph.name AS phase_name, sp.name AS subphase_name, sp.status
+            FROM projects p
+            JOIN phases ph ON ph.project_id = p.id
+            JOIN subphases sp ON sp.phase_id = ph.id
+            WHERE p.name = %(project)s AND sp.status IS DISTINCT FROM 'Completed'
+            ORDER BY ph."order", sp."order"
+            LIMIT 1
+        """,
+    },
+    {
+        'name': 'next_subphase',
+        'patterns': [r'\bnext sub-?phase (?:of|for|in|on)\s+(?:project\s+)?{project}'],
+        'title': 'Next subphase for {project}',
+        'sql': """
+            SELECT ph.name AS phase_name, sp.name AS subphase_name, sp.status
+            FROM projects p
+            JOIN phases ph ON ph.project_id = p.id
+            JOIN subphases sp ON sp.phase_id = ph.id
+            WHERE p.name = %(project)s AND sp.status IS DISTINCT FROM 'Completed'
+            ORDER BY ph."order", sp."order"
+            OFFSET 1 LIMIT 1
+        """,
+    },
+    {
+        'name': 'open_phase_items',
+        'patterns': [
+            r'\b(?:items|tasks|subphases)\b.*?\b(?:still|left|remaining|need)\b.*?\b(?:for|on|in|of)\s+(?:project\s+)?{project}',
+        ],
+        'title': 'Open items in the current phase of {project}',
+        'sql': """
+            SELECT ph.name AS phase_name, sp.name AS subphase_name, sp.status
+            FROM projects p
+            JOIN phases ph ON ph.project_id = p.id
+            JOIN subphases sp ON sp.phase_id = ph.id
+            WHERE p.name = %(project)s
+              AND sp.status IS DISTINCT FROM 'Completed'
+              AND ph.id = (
+                SELECT ph2.id
+                FROM phases ph2
+                JOIN subphases sp2 ON sp2.phase_id = ph2.id
+                WHERE ph2.project_id = p.id AND sp2.status IS DISTINCT FROM 'Completed'
+                ORDER BY ph2."order"
+                LIMIT 1
+              )
+            ORDER BY sp."order"
+        """,
+    },
+    {
+        'name': 'project_stage',
+        'patterns': [
+            r'\bwhat (?:stage|phase)(?: and (?:stage|phase))? is\s+(?:project\s+)?{project}',
+            r'\bcurrent (?:stage|phase) (?:of|for)\s+(?:project\s+)?{project}',
+        ],
+        'title': 'Current phase of {project}',
+        'sql': """
+            SELECT ph.name AS phase_name, ph."order" AS phase_order, ph.status AS phase_status,
+                   p."percentComplete" AS percent_complete
+            FROM projects p
+            LEFT JOIN phases ph ON ph.project_id = p.id AND ph.status IS DISTINCT FROM 'Completed'
+            WHERE p.name = %(project)s
+            ORDER BY ph."order"
+            LIMIT 1
+        """,
+    },
+]
+
+def expand_slots(pattern: str) -> str:
+    """Replace ``{slot}`` placeholders with their capture groups (other braces are kept)."""
+    return re.sub(r'\{(\w+)\}', lambda m: SLOTS.get(m.group(1), m.group(0)), pattern)
+
+def load_intent_file(path: Optional[str]) -> List[Dict]:
+    """Read extra intent definitions (a JSON list) from ``path``."""
+    if not path:
+        return []
+    try:
+        with open(path) as f:
+            intents = json.load(f)
+        logger.info(f"Loaded {len(intents)} intents from {path}")
+        return intents
+    except Exception as e:
+        logger.error(f"Failed to load intents from {path}: {e}")
+        return []
+
+class IntentRouter:
+    def __init__(self, intents: Optional[Iterable[Dict]] = None):
+        """Compile ``intents`` (default BUILTIN_INTENTS).
+
+        An intent has a ``name``, a list of ``patterns`` and either a
+        ``handler`` (a ChatHandler method taking the project and a
+        ``timeout`` keyword) or ``sql`` with ``%(slot)s`` parameters plus
+        an optional ``title``.
+        """
+        self.intents = []
+        self._group_slots = {}  # outer group name -> {inner group: slot}
+        self._pattern = None
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = 0
+        self.failures = Counter()
+        self.extend(BUILTIN_INTENTS if intents is None else intents)
+
+    def extend(self, intents: Iterable[Dict]):
+        """Add intents after the existing ones and recompile."""
+        for intent in intents:
+            if not intent.get('name') or not intent.get('patterns'):
+                logger.error(f"Skipping intent without a name or patterns: {intent}")
+                continue
+            if not intent.get('handler') and not intent.get('sql'):
+                logger.error(f"Skipping intent {intent['name']!r}: needs a handler or sql")
+                continue
+            self.intents.append(dict(intent))
+        self._compile()
+
+    def _compile(self):
+        alternatives = []
+        group_slots = {}
+        for i, intent in enumerate(self.intents):
+            for j, pattern in enumerate(intent['patterns']):
+                outer = f"i{i}p{j}"
+                slots = {}
+
+                def rename(match):
+                    inner = f"{outer}_{match.group(1)}"
+                    slots[inner] = match.group(1)
+                    return f"(?P<{inner}>"
+
+                body = re.sub(r'\(\?P<(\w+)>', rename, expand_slots(pattern))
+                try:
+                    re.compile(body)
+                except re.error as e:
+                    logger.error(f"Skipping bad pattern for intent {intent['name']!r}: {e}")
+                    continue
+                group_slots[outer] = (i, slots)
+                alternatives.append(f"(?P<{outer}>{body})")
+        self._group_slots = group_slots
+        self._pattern = re.compile('|'.join(alternatives) or r'(?!)', re.IGNORECASE | re.DOTALL)
+
+    def match(self, text: str) -> Optional[Tuple[Dict, Dict[str, str]]]:
+        """Return (intent, slot values) for the intent matching ``text``, or None."""
+        m = self._pattern.search(text)
+        with self._lock:
+            if m is None:
+                self.misses += 1
+                return None
+            index, slots = self._group_slots[m.lastgroup]
+            intent = self.intents[index]
+            self.hits[intent['name']] += 1
+        values = {slot: m.group(inner).strip() for inner, slot in slots.items() if m.group(inner)}
+        return intent, values
+
+    def record_failure(self, name: str):
+        """An intent matched but its handler failed (the LLM answers instead)."""
+        with self._lock:
+            self.failures[name] += 1
+
+    def stats(self) -> Dict:
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            'intents': len(self.intents),
+            'hits': hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'by_intent': dict(self.hits),
+            'failures': dict(self.failures),
+        }
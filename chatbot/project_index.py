@@ -0,0 +1,259 @@
+"""
+In-memory project-name index for the intercepts.
+
+Names are normalized to uppercase alphanumeric keys ("Cabot 1b" and
+"CABOT-1B" share the key "CABOT1B") and indexed three ways: an exact-key
+map, a sorted key list for prefix lookups (bisect), and a trigram inverted
+index for fuzzy matches ranked by trigram similarity, like pg_trgm. The
+index reloads only projects whose ``updatedAt`` moved past the last
+high-water mark, and rebuilds fully when the project count shows a
+deletion.
+"""
+import re
+import time
+import bisect
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+def normalize_name(name: str) -> str:
+    """'Cabot-1b' / 'cabot 1B' -> 'CABOT1B'."""
+    return re.sub(r'[^A-Z0-9]', '', (name or '').upper())
+
+def trigrams(key: str) -> Set[str]:
+    """Trigrams of a normalized key, padded like pg_trgm so short keys still match."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProjectIndex:
+    def __init__(self,
+                 db,
+                 refresh_interval: float = 30,
+                 max_candidates: int = 200,
+                 posting_budget: int = 2000):
+        """Initialize the index and load every project name.
+
+        ``refresh_interval`` bounds how often (seconds) the database is
+        asked for changed projects. Fuzzy candidates are collected from the
+        query's rarest trigrams first, reading at most ``posting_budget``
+        posting entries (common trigrams barely discriminate); the best
+        ``max_candidates`` are then scored on all of their trigrams.
+        """
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.max_candidates = max_candidates
+        self.posting_budget = posting_budget
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._names = {}       # project id -> name
+        self._keys = {}        # project id -> normalized key
+        self._grams = {}       # project id -> trigram set
+        self._by_key = {}      # key -> set of project ids
+        self._postings = {}    # trigram -> set of project ids
+        self._sorted_keys = []
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._incremental = True
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    # ---- loading ----
+
+    def reload(self):
+        """Rebuild the whole index from the projects table."""
+        incremental = True
+        try:
+            rows = self.db.execute_query('SELECT id, name, "updatedAt" AS updated_at FROM projects')
+        except Exception as e:
+            if self._incremental:
+                logger.warning(f"projects.updatedAt unavailable, reloading the project index in full until it is: {e}")
+            incremental = False
+            rows = self.db.execute_query("SELECT id, name, NULL AS updated_at FROM projects")
+
+        with self._lock:
+            self._names.clear()
+            self._keys.clear()
+            self._grams.clear()
+            self._by_key.clear()
+            self._postings.clear()
+            for row in rows:
+                self._add(row['id'], row['name'])
+            self._sorted_keys = sorted(self._by_key)
+            stamps = [row['updated_at'] for row in rows if row['updated_at'] is not None]
+            self._watermark = max(stamps) if stamps else None
+            self._incremental = incremental
+            self._refreshed_at = time.monotonic()
+        logger.info(f"Project index loaded ({len(self._names)} projects)")
+
+    def maybe_refresh(self):
+        """Apply changes from the projects table, at most every refresh_interval.
+
+        One thread refreshes at a time, querying without holding the index
+        lock; lookups meanwhile use the current index rather than wait.
+        """
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return
+            self._refreshed_at = time.monotonic()
+            try:
+                self._refresh()
+            except Exception as e:
+                # Retried (incrementally) after the next interval
+                logger.error(f"Project index refresh failed: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self):
+        if not self._incremental:
+            # updatedAt couldn't be read last time; reload() tries it again
+            self.reload()
+            return
+
+        # >= so rows sharing the high-water timestamp aren't missed
+        watermark = self._watermark
+        if watermark is None:
+            rows = self.db.execute_query(
+                'SELECT id, name, "updatedAt" AS updated_at FROM projects'
+            )
+        else:
+            rows = self.db.execute_query(
+                'SELECT id, name, "updatedAt" AS updated_at FROM projects WHERE "updatedAt" >= %s',
+                (watermark,)
+            )
+        # Deletions don't move updatedAt; a count mismatch means rebuild
+        total = self.db.execute_query("SELECT COUNT(*) AS n FROM projects")[0]['n']
+
+        changed = 0
+        with self._lock:
+            for row in rows:
+                if self._names.get(row['id']) != row['name']:
+                    self._remove(row['id'])
+                    self._add(row['id'], row['name'])
+                    changed += 1
+                if row['updated_at'] is not None and (self._watermark is None or row['updated_at'] > self._watermark):
+                    self._watermark = row['updated_at']
+            if changed:
+                self._sorted_keys = sorted(self._by_key)
+            stale = total != len(self._names)
+        if changed:
+            logger.info(f"Project index updated ({changed} changed projects)")
+        if stale:
+            self.reload()
+
+    def _add(self, project_id, name: str):
+        key = normalize_name(name)
+        grams = trigrams(key)
+        self._names[project_id] = name
+        self._keys[project_id] = key
+        self._grams[project_id] = grams
+        self._by_key.setdefault(key, set()).add(project_id)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(project_id)
+
+    def _remove(self, project_id):
+        if project_id not in self._names:
+            return
+        key = self._keys.pop(project_id)
+        del self._names[project_id]
+        ids = self._by_key.get(key)
+        if ids is not None:
+            ids.discard(project_id)
+            if not ids:
+                del self._by_key[key]
+        for gram in self._grams.pop(project_id):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(project_id)
+                if not posting:
+                    del self._postings[gram]
+
+    # ---- lookups ----
+
+    def names(self) -> List[str]:
+        """Every project name, sorted."""
+        self.maybe_refresh()
+        with self._lock:
+            return sorted(self._names.values())
+
+    def resolve(self, text: str) -> Optional[str]:
+        """The project a user means: an exact key match or a unique prefix match."""
+        self.maybe_refresh()
+        key = normalize_name(text)
+        if not key:
+            return None
+        with self._lock:
+            ids = self._by_key.get(key)
+            if ids and len(ids) == 1:
+                return self._names[next(iter(ids))]
+            if ids:
+                return None  # several projects normalize the same way
+            prefixed = self._prefix_keys(key, limit=2)
+            if len(prefixed) == 1 and len(self._by_key[prefixed[0]]) == 1:
+                return self._names[next(iter(self._by_key[prefixed[0]]))]
+        return None
+
+    def search(self, text: str, limit: int = 5, cutoff: float = 0.3) -> List[Tuple[str, float]]:
+        """Ranked fuzzy matches as (name, score); exact 1.0, prefix >= 0.8."""
+        self.maybe_refresh()
+        key = normalize_name(text)
+        if not key:
+            return []
+        query_grams = trigrams(key)
+        with self._lock:
+            scores = {}
+            for pid in self._by_key.get(key, ()):
+                scores[pid] = 1.0
+            for prefixed in self._prefix_keys(key, limit=limit):
+                for pid in self._by_key[prefixed]:
+                    scores.setdefault(pid, max(0.8, self._similarity(query_grams, pid)))
+
+            # Collect candidates from the rarest trigrams first
+            postings = sorted((self._postings.get(g, ()) for g in query_grams), key=len)
+            counts = Counter()
+            read = 0
+            for posting in postings:
+                if counts and read + len(posting) > self.posting_budget:
+                    break
+                counts.update(posting)
+                read += len(posting)
+            for pid, _ in counts.most_common(self.max_candidates):
+                if pid not in scores:
+                    scores[pid] = self._similarity(query_grams, pid)
+
+            ranked = sorted(
+                ((self._names[pid], score) for pid, score in scores.items() if score >= cutoff),
+                key=lambda item: (-item[1], item[0])
+            )
+        return [(name, round(score, 3)) for name, score in ranked[:limit]]
+
+    def _prefix_keys(self, key: str, limit: int) -> List[str]:
+        """Indexed keys starting with ``key`` (excluding ``key`` itself)."""
+        found = []
+        start = bisect.bisect_right(self._sorted_keys, key)
+        for candidate in self._sorted_keys[start:start + limit]:
+            if not candidate.startswith(key):
+                break
+            found.append(candidate)
+        return found
+
+    def _similarity(self, query_grams: Set[str], project_id) -> float:
+        grams = self._grams[project_id]
+        shared = len(query_grams & grams)
+        return shared / (len(query_grams) + len(grams) - shared)
+
+    def stats(self) -> Dict:
+        return {
+            'projects': len(self._names),
+            'trigrams': len(self._postings),
+            'watermark': str(self._watermark) if self._watermark is not None else None,
+            'incremental': self._incremental,
+        }
@@ -0,0 +1,278 @@
+"""
+Answer cache for /api/chat.
+
+Responses are keyed on a normalized question plus the schema fingerprint,
+expire per question category, and are invalidated when any table they read
+from has changed (see database.watermarks). Storage is pluggable: an
+in-process LRU or a Redis-compatible server shared by all workers.
+"""
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from database.watermarks import UPDATED_AT_COLUMNS, updated_at_indexes, read_watermarks
+
+logger = logging.getLogger(__name__)
+
+# Categories whose answers don't depend on conversation history
+HISTORY_INDEPENDENT = {
+    'project_detail', 'phase_status', 'budget_all', 'budget_project',
+    'current_subphase', 'next_subphase', 'open_phase_items', 'project_stage',
+}
+
+# Tables each intercept reads from (LLM answers are parsed from their SQL)
+CATEGORY_TABLES = {
+    'project_detail': ('projects', 'phases', 'subphases', 'project_templates', 'users', 'leads'),
+    'phase_status': ('projects', 'phases'),
+    'budget_all': ('projects', 'leads', 'invoices'),
+    'budget_project': ('projects', 'leads', 'invoices'),
+    'current_subphase': ('projects', 'phases', 'subphases'),
+    'next_subphase': ('projects', 'phases', 'subphases'),
+    'open_phase_items': ('projects', 'phases', 'subphases'),
+    'project_stage': ('projects', 'phases'),
+}
+
+DEFAULT_TTLS = {
+    'project_detail': 300,
+    'phase_status': 120,
+    'budget_all': 300,
+    'budget_project': 300,
+    'current_subphase': 120,
+    'next_subphase': 120,
+    'open_phase_items': 120,
+    'project_stage': 120,
+    'llm_sql': 600,
+    'llm_answer': 3600,
+}
+
+FILLER_WORDS = re.compile(r'\b(please|can you|could you|would you|tell me|show me|give me|kindly)\b')
+
+def normalize_question(question: str) -> str:
+    """Normalize wording so trivially different phrasings share a key."""
+    text = question.lower().strip()
+    text = FILLER_WORDS.sub(' ', text)
+    text = re.sub(r"[^\w\s\-%]", ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+class InMemoryCacheBackend:
+    def __init__(self, max_entries: int = 1000):
+        """In-process LRU with per-entry TTL."""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class RedisCacheBackend:
+    def __init__(self, url: str, prefix: str = 'chatbot:answer:'):
+        """Redis-compatible backend; LRU eviction is the server's maxmemory-policy."""
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The 'redis' package is required for the redis cache backend")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, entry: Dict, ttl: int):
+        self.client.setex(self.prefix + key, ttl, json.dumps(entry, default=str))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+def create_cache_backend(backend: str, max_entries: int = 1000, url: Optional[str] = None):
+    """Build a cache backend by name ('memory' or 'redis')."""
+    if backend == 'redis':
+        if not url:
+            raise ValueError("A cache URL is required for the redis backend")
+        return RedisCacheBackend(url)
+    if backend == 'memory':
+        return InMemoryCacheBackend(max_entries)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+class ResponseCache:
+    def __init__(self,
+                 backend,
+                 db,
+                 schema_catalog,
+                 ttls: Optional[Dict[str, int]] = None,
+                 watermark_interval: float = 5):
+        """Initialize the cache.
+
+        ``watermark_interval`` bounds how often (seconds) a table's
+        watermark is re-read from the database; only the tables a lookup
+        depends on are read.
+        """
+        self.backend = backend
+        self.db = db
+        self.catalog = schema_catalog
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.watermark_interval = watermark_interval
+        self._lock = threading.Lock()
+        self._watermarks = {}   # table -> watermark
+        self._read_at = {}      # table -> monotonic time of the last read
+        self._indexed = None    # (fingerprint, {table: indexed updatedAt column})
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stores = 0
+
+    def _key(self, question: str) -> str:
+        raw = f"{self.catalog.fingerprint}|{normalize_question(question)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _indexed_columns(self) -> Dict[str, str]:
+        """updatedAt columns usable for MAX() without a scan, per table (re-read after DDL)."""
+        fingerprint = self.catalog.fingerprint
+        if self._indexed is None or self._indexed[0] != fingerprint:
+            try:
+                indexed = updated_at_indexes(self.db)
+            except Exception as e:
+                logger.error(f"Failed to read updatedAt indexes: {e}")
+                indexed = {}
+            unindexed = sorted(
+                table for table, columns in self.catalog.tables.items()
+                if table not in indexed and {c['column_name'] for c in columns} & set(UPDATED_AT_COLUMNS)
+            )
+            if unindexed:
+                logger.warning(
+                    f"No index on updatedAt for {', '.join(unindexed)}; the answer cache "
+                    f"watches their write counters instead (index the column for exact invalidation)"
+                )
+            self._indexed = (fingerprint, indexed)
+        return self._indexed[1]
+
+    def watermarks(self, tables: Iterable[str]) -> Dict[str, str]:
+        """Current watermark of each of ``tables``, re-read at most every interval."""
+        known = self.catalog.tables
+        tables = [t for t in tables if t in known]
+
+        def stale():
+            now = time.monotonic()
+            return [t for t in tables if t not in self._read_at or now - self._read_at[t] >= self.watermark_interval]
+
+        if stale():
+            with self._lock:
+                pending = stale()
+                if pending:
+                    try:
+                        self._watermarks.update(read_watermarks(self.db, pending, self._indexed_columns()))
+                    except Exception as e:
+                        logger.error(f"Failed to read cache watermarks: {e}")
+                    now = time.monotonic()
+                    for table in pending:
+                        self._read_at[table] = now
+        return {t: self._watermarks[t] for t in tables if t in self._watermarks}
+
+    def tables_for(self, category: str, sql_query: Optional[str] = None) -> List[str]:
+        """Tables an answer depends on (all tables if unknown)."""
+        if category in CATEGORY_TABLES:
+            return list(CATEGORY_TABLES[category])
+        known = self.catalog.tables.keys()
+        if sql_query:
+            found = [t for t in known if re.search(rf'\b{re.escape(t)}\b', sql_query)]
+            if found:
+                return found
+        return list(known)
+
+    def get(self, question: str, has_history: bool = False) -> Optional[Dict]:
+        """Return a cached response, or None on miss / stale entry."""
+        try:
+            key = self._key(question)
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Response cache lookup failed: {e}")
+            return None
+
+        if entry is None or (has_history and entry['category'] not in HISTORY_INDEPENDENT):
+            self.misses += 1
+            return None
+
+        current = self.watermarks(entry['tables'])
+        if any(current.get(t) != entry['watermarks'].get(t) for t in entry['tables'] if t in current):
+            self.invalidations += 1
+            self.misses += 1
+            self.backend.delete(key)
+            return None
+
+        self.hits += 1
+        return entry['response']
+
+    def set(self, question: str, category: str, response: Dict, tables: Optional[Iterable[str]] = None):
+        """Store a response for its category's TTL."""
+        ttl = self.ttls.get(category)
+        if not ttl:
+            return
+        tables = list(tables) if tables is not None else self.tables_for(category)
+        current = self.watermarks(tables)
+        entry = {
+            'category': category,
+            'tables': tables,
+            'watermarks': {t: current[t] for t in tables if t in current},
+            'response': response,
+        }
+        try:
+            self.backend.set(self._key(question), entry, ttl)
+            self.stores += 1
+        except Exception as e:
+            logger.error(f"Response cache store failed: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'stores': self.stores,
+            'evictions': self.backend.evictions,
+            'size': self.backend.size(),
+        }
@@ -0,0 +1,141 @@
+"""
+Deterministic Markdown rendering for query results.
+
+Covers the common result shapes (single value, single record, lists and
+tables) in the same style as the hand-built intercept tables, so the
+format_query_results LLM round trip is only needed for unusual shapes.
+"""
+import re
+import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, List, Optional
+
+PERCENT_COLUMN = re.compile(r'percent|pct|progress|completion', re.IGNORECASE)
+CURRENCY_COLUMN = re.compile(r'amount|total|budget|price|cost|invoiced|balance|paid|revenue', re.IGNORECASE)
+NAME_COLUMN = re.compile(r'^(name|project|project_name|.*_name)$', re.IGNORECASE)
+COUNT_COLUMN = re.compile(r'count|^num_|number|_no$|order|quantity|^total_\w+s$', re.IGNORECASE)
+
+# Format policies
+POLICY_AUTO = 'auto'    # local formatter, LLM only for unusual shapes
+POLICY_LOCAL = 'local'  # never call the LLM
+POLICY_LLM = 'llm'      # always call the LLM (previous behaviour)
+
+def humanize(column: str) -> str:
+    """'project_name' / 'totalAmount' -> 'Project Name' / 'Total Amount'."""
+    words = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', column).replace('_', ' ').split()
+    return ' '.join(w if w.isupper() else w.capitalize() for w in words)
+
+def progress_bar(percent: float, width: int = 10) -> str:
+    """Text progress bar, e.g. ``▓▓▓▓▓░░░░░ 50%``."""
+    clamped = max(0.0, min(100.0, float(percent)))
+    filled = int(round(clamped / 100 * width))
+    return f"{'▓' * filled}{'░' * (width - filled)} {round(clamped)}%"
+
+class ResultFormatter:
+    def __init__(self, max_table_rows: int = 50, max_columns: int = 8):
+        """Initialize formatter limits; larger shapes are left to the LLM."""
+        self.max_table_rows = max_table_rows
+        self.max_columns = max_columns
+
+    def is_supported(self, results: List[Dict]) -> bool:
+        """Whether the result shape can be rendered locally."""
+        if not results:
+            return True
+        if len(self._columns(results)) > self.max_columns:
+            return False
+        for row in islice(results, self.max_table_rows):
+            for value in row.values():
+                if isinstance(value, (dict, list, tuple, set, bytes)):
+                    return False
+        return True
+
+    def format(self, user_request: str, results: List[Dict], force: bool = False) -> Optional[str]:
+        """Render results as Markdown, or None if the shape is unusual."""
+        if not force and not self.is_supported(results):
+            return None
+
+        if not results:
+            return "No matching records were found in the database for that question."
+
+        columns = self._columns(results)
+
+        # Single value
+        if len(results) == 1 and len(columns) == 1:
+            column = columns[0]
+            return f"**{humanize(column)}:** {self.format_value(column, results[0][column])}"
+
+        # Single record
+        if len(results) == 1:
+            row = results[0]
+            return "\n".join(
+                f"- **{humanize(col)}:** {self.format_value(col, row[col])}" for col in columns
+            )
+
+        # Single column list
+        if len(columns) == 1:
+            column = columns[0]
+            shown = islice(results, self.max_table_rows)
+            items = "\n".join(f"- **{self.format_value(column, r[column])}**" for r in shown)
+            return f"**{humanize(column)}** ({self._count(results)} found):\n\n{items}{self._truncation_note(results)}"
+
+        # Table
+        shown = islice(results, self.max_table_rows)
+        header = "| " + " | ".join(humanize(c) for c in columns) + " |\n"
+        header += "|" + "---|" * len(columns) + "\n"
+        body = "\n".join(
+            "| " + " | ".join(self._format_cell(c, r[c], i == 0) for i, c in enumerate(columns)) + " |"
+            for r in shown
+        )
+        return f"**Results** ({self._count(results)} rows):\n\n{header}{body}{self._truncation_note(results)}"
+
+    def format_value(self, column: str, value) -> str:
+        """Format one value using the column name as a hint."""
+        if value is None:
+            return '—'
+        if isinstance(value, bool):
+            return 'Yes' if value else 'No'
+        if isinstance(value, datetime.datetime):
+            if value.time() == datetime.time(0, 0):
+                return value.strftime('%Y-%m-%d')
+            return value.strftime('%Y-%m-%d %H:%M')
+        if isinstance(value, datetime.date):
+            return value.strftime('%Y-%m-%d')
+        if isinstance(value, (int, float, Decimal)):
+            if COUNT_COLUMN.search(column):
+                return str(value)
+            if PERCENT_COLUMN.search(column):
+                return progress_bar(value)
+            if isinstance(value, int):
+                # Money columns are numeric; an integer in 'total'/'paid' is a count
+                return str(value)
+            if CURRENCY_COLUMN.search(column):
+                return f"${value:,.2f}"
+            return f"{value:,.2f}"
+        return str(value).replace('|', '\\|').replace('\n', ' ')
+
+    def _format_cell(self, column: str, value, first: bool) -> str:
+        """Format a table cell, bolding the leading name column."""
+        text = self.format_value(column, value)
+        if first and value is not None and NAME_COLUMN.match(column):
+            return f"**{text}**"
+        return text
+
+    @staticmethod
+    def _columns(results: List[Dict]) -> List[str]:
+        """Column names (a ResultSet carries them; a list of dicts has row keys)."""
+        columns = getattr(results, 'columns', None)
+        return list(columns) if columns is not None else list(results[0].keys())
+
+    @staticmethod
+    def _count(results: List[Dict]) -> str:
+        """Row count, marked with '+' when the fetch hit its row cap."""
+        return f"{len(results)}+" if getattr(results, 'truncated', False) else str(len(results))
+
+    def _truncation_note(self, results: List[Dict]) -> str:
+        if getattr(results, 'truncated', False):
+            return (f"\n\n*Showing first {min(len(results), self.max_table_rows)} rows; "
+                    f"the query matched more than {len(results)}, so try narrowing the question.*")
+        if len(results) <= self.max_table_rows:
+            return ""
+        return f"\n\n*Showing first {self.max_table_rows} of {len(results)} results.*"
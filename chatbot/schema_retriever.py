@@ -0,0 +1,227 @@
+"""
+Relevance-pruned schema context for LLM prompts.
+
+Instead of sending every table and column to Gemini, the retriever keeps a
+small local index over table/column names, FK neighborhoods and domain
+synonyms, and renders only the part of the schema a question is about.
+"""
+import re
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from database.schema_catalog import SchemaCatalog
+from database.schema_extractor import SchemaExtractor
+
+logger = logging.getLogger(__name__)
+
+# Question words -> name fragments they refer to in the schema
+SYNONYMS = {
+    'project': ['project'],
+    'job': ['project'],
+    'phase': ['phase'],
+    'stage': ['phase'],
+    'subphase': ['subphase'],
+    'task': ['subphase', 'task'],
+    'step': ['subphase'],
+    'selection': ['selection'],
+    'finish': ['selection'],
+    'walkthrough': ['walkthrough'],
+    'inspection': ['walkthrough', 'inspection'],
+    'invoice': ['invoice'],
+    'invoiced': ['invoice'],
+    'bill': ['invoice'],
+    'billed': ['invoice'],
+    'billing': ['invoice'],
+    'budget': ['invoice', 'budget', 'amount'],
+    'payment': ['invoice', 'payment'],
+    'paid': ['invoice', 'payment'],
+    'milestone': ['milestone', 'payment'],
+    'client': ['lead', 'client'],
+    'customer': ['lead', 'customer'],
+    'homeowner': ['lead', 'client'],
+    'designer': ['user', 'designer'],
+    'pm': ['user', 'manager'],
+    'manager': ['user', 'manager'],
+    'purchase': ['purchase', 'order'],
+    'po': ['purchase', 'order'],
+    'procurement': ['purchase', 'procure', 'trade'],
+    'bought': ['purchase', 'procure', 'buyout'],
+    'buyout': ['purchase', 'buyout'],
+    'trade': ['trade', 'vendor'],
+    'vendor': ['vendor', 'trade'],
+    'template': ['template'],
+    'overdue': ['due', 'date', 'status'],
+    'due': ['due', 'date'],
+    'upcoming': ['due', 'date'],
+    'percent': ['percent', 'complete'],
+    'progress': ['percent', 'complete', 'status'],
+    'complete': ['complete', 'status'],
+    'completed': ['complete', 'status'],
+    'status': ['status'],
+    'schedule': ['date', 'schedule'],
+    'scheduled': ['date', 'schedule'],
+}
+
+STOP_WORDS = {
+    'a', 'an', 'the', 'of', 'for', 'in', 'on', 'at', 'to', 'is', 'are', 'was',
+    'be', 'what', 'which', 'who', 'how', 'many', 'much', 'do', 'does', 'did',
+    'any', 'all', 'me', 'show', 'list', 'give', 'tell', 'with', 'and', 'or',
+    'has', 'have', 'been', 'still', 'need', 'needs', 'my', 'our', 'we', 'it',
+    'this', 'that', 'there', 'currently', 'next', 'most', 'recent', 'by',
+}
+
+# Columns always kept for context tables so joins stay possible
+KEY_COLUMN_PATTERN = re.compile(r'^(id|name|status|.*_id|.*Id)$')
+
+TABLE_WEIGHT = 3.0
+COLUMN_WEIGHT = 1.0
+
+def split_identifier(name: str) -> List[str]:
+    """Split snake_case / camelCase identifiers into lowercase words."""
+    words = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', name).replace('_', ' ').split()
+    return [w.lower() for w in words]
+
+def normalize_token(token: str) -> str:
+    """Crude singularization so 'subphases' and 'subphase' match."""
+    token = token.lower()
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+class SchemaRetriever:
+    def __init__(self,
+                 schema_catalog: SchemaCatalog,
+                 schema_extractor: SchemaExtractor,
+                 max_tables: int = 6,
+                 max_columns: int = 30,
+                 anchor_tables: tuple = ('projects',)):
+        """Initialize the retriever over a schema catalog.
+
+        ``anchor_tables`` are always included since nearly every question is
+        scoped to a project.
+        """
+        self.catalog = schema_catalog
+        self.extractor = schema_extractor
+        self.max_tables = max_tables
+        self.anchor_tables = anchor_tables
+        self.max_columns = max_columns
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._token_index = {}
+        self._neighbors = {}
+
+    def _ensure_index(self):
+        """(Re)build the local index when the schema fingerprint changes."""
+        snapshot = self.catalog.snapshot()
+        if self._fingerprint == snapshot['fingerprint'] and self._token_index:
+            return snapshot
+
+        with self._lock:
+            if self._fingerprint == snapshot['fingerprint'] and self._token_index:
+                return snapshot
+
+            # token -> list of (table, column or None, weight)
+            token_index = defaultdict(list)
+            for table, columns in snapshot['tables'].items():
+                for word in split_identifier(table):
+                    token_index[normalize_token(word)].append((table, None, TABLE_WEIGHT))
+                for col in columns:
+                    for word in split_identifier(col['column_name']):
+                        token_index[normalize_token(word)].append(
+                            (table, col['column_name'], COLUMN_WEIGHT)
+                        )
+
+            neighbors = defaultdict(set)
+            for rel in snapshot['relationships']:
+                neighbors[rel['table_name']].add(rel['foreign_table_name'])
+                neighbors[rel['foreign_table_name']].add(rel['table_name'])
+
+            self._token_index = dict(token_index)
+            self._neighbors = dict(neighbors)
+            self._fingerprint = snapshot['fingerprint']
+            logger.info(f"Schema retrieval index built ({len(self._token_index)} tokens)")
+        return snapshot
+
+    def _question_terms(self, question: str) -> Set[str]:
+        """Tokenize a question and expand it with synonyms."""
+        terms = set()
+        for word in re.findall(r'[A-Za-z]+', question):
+            token = normalize_token(word)
+            if token in STOP_WORDS or len(token) < 2:
+                continue
+            terms.add(token)
+            for fragment in SYNONYMS.get(token, []) + SYNONYMS.get(word.lower(), []):
+                terms.add(normalize_token(fragment))
+        return terms
+
+    def select(self, question: str) -> Dict[str, Set[str]]:
+        """Return {table: matched columns} for the tables relevant to a question."""
+        snapshot = self._ensure_index()
+        terms = self._question_terms(question)
+
+        table_scores = defaultdict(float)
+        matched_columns = defaultdict(set)
+        for term in terms:
+            for token, postings in self._token_index.items():
+                if token != term and not (len(term) >= 4 and term in token):
+                    continue
+                for table, column, weight in postings:
+                    table_scores[table] += weight
+                    if column:
+                        matched_columns[table].add(column)
+
+        if not table_scores:
+            return {}
+
+        ranked = sorted(table_scores, key=lambda t: (-table_scores[t], t))
+        selected = ranked[:self.max_tables]
+        for anchor in self.anchor_tables:
+            if anchor not in selected and anchor in snapshot['tables']:
+                selected.append(anchor)
+
+        # Pull in FK neighbors that bridge two selected tables, then the best
+        # scoring remaining neighbors, so the model can still write the joins.
+        bridge_counts = defaultdict(int)
+        for table in selected:
+            for neighbor in self._neighbors.get(table, ()):
+                if neighbor not in selected and neighbor in snapshot['tables']:
+                    bridge_counts[neighbor] += 1
+        for neighbor in sorted(bridge_counts, key=lambda t: (-bridge_counts[t], -table_scores[t], t)):
+            if len(selected) >= self.max_tables + len(self.anchor_tables) + 2:
+                break
+            if bridge_counts[neighbor] > 1 or table_scores[neighbor] > 0:
+                selected.append(neighbor)
+
+        return {table: matched_columns.get(table, set()) for table in selected}
+
+    def retrieve(self, question: str) -> Optional[str]:
+        """Render the pruned schema prompt, or None if nothing matched."""
+        try:
+            selection = self.select(question)
+        except Exception as e:
+            logger.error(f"Schema retrieval failed: {e}")
+            return None
+        if not selection:
+            return None
+
+        snapshot = self.catalog.snapshot()
+        pruned = {}
+        for table, matched in selection.items():
+            columns = snapshot['tables'].get(table, [])
+            if len(columns) > self.max_columns:
+                columns = [
+                    col for col in columns
+                    if col['column_name'] in matched or KEY_COLUMN_PATTERN.match(col['column_name'])
+                ]
+            pruned[table] = columns
+
+        relationships = [
+            rel for rel in snapshot['relationships']
+            if rel['table_name'] in pruned and rel['foreign_table_name'] in pruned
+        ]
+        return self.extractor.format_schema_prompt(pruned, relationships)
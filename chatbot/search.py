@@ -0,0 +1,205 @@
+"""
+Cross-entity name search (projects, phases and subphases).
+
+All entities are searched by one parameterized ``UNION ALL`` statement (one
+round trip, each branch capped) and merged into a single ranking. Each
+branch uses the predicate its table's indexes can serve (see
+database.search_indexes): with a ``pg_trgm`` GIN index it matches with
+``ILIKE``/``%``; with a ``to_tsvector`` index it matches words; otherwise it
+falls back to plain ``ILIKE``. Without a trigram index on projects, project
+hits also come from the in-memory ProjectIndex, which catches typos without
+any database support.
+
+Every mode scores on the same tiers (exact > prefix > substring or word >
+fuzzy-only), so entities searched in different modes rank comparably;
+trigram or ProjectIndex similarity only breaks ties within a tier.
+"""
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from database.search_indexes import SearchIndexManager, TRGM, FTS
+
+logger = logging.getLogger(__name__)
+
+# (type, result key, table, alias.column) in tie-break order
+ENTITIES = (
+    ('project', 'projects', 'projects', 'p.name'),
+    ('phase', 'phases', 'phases', 'ph.name'),
+    ('task', 'tasks', 'subphases', 'sp.name'),
+)
+
+ILIKE = 'ilike'
+
+# Score tiers shared by every mode
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+MATCH_SCORE = 0.5
+FUZZY_SCORE = 0.3   # trigram or ProjectIndex match that isn't a substring
+
+PLAIN_SCORE = (
+    f"CASE WHEN lower({{col}}) = lower(%(term)s) THEN {EXACT_SCORE}"
+    f" WHEN {{col}} ILIKE %(prefix)s THEN {PREFIX_SCORE}"
+    f" ELSE {MATCH_SCORE} END"
+)
+
+TRGM_SCORE = (
+    f"CASE WHEN lower({{col}}) = lower(%(term)s) THEN {EXACT_SCORE}"
+    f" WHEN {{col}} ILIKE %(prefix)s THEN {PREFIX_SCORE}"
+    f" WHEN {{col}} ILIKE %(pattern)s THEN {MATCH_SCORE}"
+    f" ELSE {FUZZY_SCORE} END"
+)
+
+# predicate kind -> (score, tie-break similarity, match)
+PREDICATES = {
+    TRGM: (TRGM_SCORE, "similarity({col}, %(term)s)", "({col} ILIKE %(pattern)s OR {col} %% %(term)s)"),
+    FTS: (PLAIN_SCORE, "NULL::real", "to_tsvector('simple', COALESCE({col}, '')) @@ plainto_tsquery('simple', %(term)s)"),
+    ILIKE: (PLAIN_SCORE, "NULL::real", "{col} ILIKE %(pattern)s"),
+}
+
+BRANCHES = {
+    'project': """
+        SELECT 'project' AS type, p.id, p.name,
+               NULL::text AS phase_name, NULL::text AS project_name, {score} AS score,
+               {similarity} AS similarity
+        FROM projects p
+        WHERE {match}
+    """,
+    'phase': """
+        SELECT 'phase' AS type, ph.id, ph.name,
+               NULL::text AS phase_name, p.name AS project_name, {score} AS score,
+               {similarity} AS similarity
+        FROM phases ph
+        JOIN projects p ON ph.project_id = p.id
+        WHERE {match}
+    """,
+    'task': """
+        SELECT 'task' AS type, sp.id, sp.name,
+               ph.name AS phase_name, p.name AS project_name, {score} AS score,
+               {similarity} AS similarity
+        FROM subphases sp
+        JOIN phases ph ON sp.phase_id = ph.id
+        JOIN projects p ON ph.project_id = p.id
+        WHERE {match}
+    """,
+}
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so the term is matched literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def build_search_sql(modes: Tuple[str, ...]) -> str:
+    """The UNION ALL statement over every entity (each branch ranked and capped).
+
+    ``modes`` gives each entity's predicate kind, in ENTITIES order.
+    """
+    branches = []
+    for (entity, _, _, column), mode in zip(ENTITIES, modes):
+        score, similarity, match = PREDICATES[mode]
+        body = BRANCHES[entity].format(
+            score=score.format(col=column),
+            similarity=similarity.format(col=column),
+            match=match.format(col=column)
+        )
+        branches.append(
+            f"({body.rstrip()}\n        ORDER BY score DESC, similarity DESC NULLS LAST, length({column})"
+            f"\n        LIMIT %(limit)s)"
+        )
+    return "\nUNION ALL\n".join(branches)
+
+class SearchEngine:
+    def __init__(self, db, project_index=None, limit: int = 10, detect_interval: float = 600):
+        """Initialize the engine.
+
+        ``limit`` caps each entity's hits. Which search indexes exist is
+        re-checked every ``detect_interval`` seconds, so indexes created
+        later (``python -m database.search_indexes --create``) are picked up.
+        """
+        self.db = db
+        self.project_index = project_index
+        self.limit = limit
+        self.detect_interval = detect_interval
+        self.indexes = SearchIndexManager(db)
+        self._modes = (ILIKE,) * len(ENTITIES)
+        self._detected_at = None
+        self._sql = {}
+        self.searches = 0
+
+    def modes(self) -> Tuple[str, ...]:
+        """The predicate kind for each entity, from the indexes that exist."""
+        now = time.monotonic()
+        if self._detected_at is not None and now - self._detected_at < self.detect_interval:
+            return self._modes
+        self._detected_at = now
+        try:
+            usable = self.indexes.usable()
+        except Exception as e:
+            logger.warning(f"Search index detection failed, searching with ILIKE: {e}")
+            usable = {}
+        modes = []
+        for _, _, table, _ in ENTITIES:
+            kinds = usable.get(table, [])
+            modes.append(TRGM if TRGM in kinds else FTS if FTS in kinds else ILIKE)
+        modes = tuple(modes)
+        if modes != self._modes:
+            logger.info(f"Search predicates: {dict(zip((e[0] for e in ENTITIES), modes))}")
+        self._modes = modes
+        return modes
+
+    def _search_sql(self, modes: Tuple[str, ...]) -> str:
+        if modes not in self._sql:
+            self._sql[modes] = build_search_sql(modes)
+        return self._sql[modes]
+
+    def search(self, term: str, limit: Optional[int] = None, timeout: Optional[float] = None) -> Dict:
+        """Search every entity at once; returns per-type hits and one ranked list."""
+        term = (term or '').strip()
+        limit = limit or self.limit
+        results = {key: [] for _, key, _, _ in ENTITIES}
+        if not term:
+            return {'results': results, 'ranked': []}
+
+        self.searches += 1
+        modes = self.modes()
+        escaped = escape_like(term)
+        params = {
+            'term': term,
+            'pattern': f'%{escaped}%',
+            'prefix': f'{escaped}%',
+            'limit': limit,
+        }
+        rows = [
+            dict(row, score=float(row['score']),
+                 similarity=float(row['similarity']) if row['similarity'] is not None else None)
+            for row in self.db.execute_query(self._search_sql(modes), params, timeout=timeout)
+        ]
+
+        # Typo-tolerant project matches from the in-memory index
+        if modes[0] != TRGM and self.project_index is not None:
+            found = {row['name'] for row in rows if row['type'] == 'project'}
+            # Names ILIKE didn't match: typo candidates, ranked below substring hits
+            for name, similarity in self.project_index.search(term, limit=limit):
+                if name not in found:
+                    rows.append({'type': 'project', 'id': None, 'name': name,
+                                 'phase_name': None, 'project_name': None,
+                                 'score': FUZZY_SCORE, 'similarity': similarity})
+
+        order = {entity: i for i, (entity, _, _, _) in enumerate(ENTITIES)}
+
+        def rank(row):
+            return (-row['score'], -(row['similarity'] or 0.0), order[row['type']], row['name'])
+
+        rows.sort(key=rank)
+        keys = {entity: key for entity, key, _, _ in ENTITIES}
+        for row in rows:
+            bucket = results[keys[row['type']]]
+            if len(bucket) < limit:
+                bucket.append(row)
+        ranked = [row for key in results for row in results[key]]
+        ranked.sort(key=rank)
+        return {'results': results, 'ranked': ranked}
+
+    def stats(self) -> Dict:
+        return {
+            'predicates': dict(zip((entity for entity, _, _, _ in ENTITIES), self._modes)),
+            'searches': self.searches,
+        }
@@ -0,0 +1,163 @@
+"""
+Cache of validated, parameterized SQL for repeated questions.
+
+A question like "open selections for CABOT-1B" is reduced to a template
+("open selections for {0}") plus its literals. When Gemini's SQL for it runs
+successfully, every string literal in the SQL that contains one of those
+values is swapped for a ``%s`` placeholder, so the next "open selections for
+JAIN-1B" reuses the same statement with new parameters: no LLM call, and a
+prepared statement on the Postgres side.
+"""
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Literals pulled out of questions: quoted phrases, dates, project keys (CABOT-1B)
+QUESTION_LITERAL = re.compile(
+    r'"([^"]+)"'
+    r"|'([^']+)'"
+    r'|\b(\d{4}-\d{2}-\d{2})\b'
+    r'|\b([A-Za-z]+-\d+[A-Za-z0-9]*)\b'
+)
+SQL_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+class SqlTemplateCache:
+    def __init__(self, schema_catalog=None, max_entries: int = 500):
+        """Initialize the cache; entries are scoped to the schema fingerprint."""
+        self.catalog = schema_catalog
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def extract(question: str) -> Tuple[str, List[str]]:
+        """Split a question into a template and its literal values."""
+        literals = []
+
+        def replace(match):
+            value = next(g for g in match.groups() if g)
+            literals.append(value)
+            return '{%d}' % (len(literals) - 1)
+
+        template = QUESTION_LITERAL.sub(replace, question.strip())
+        template = re.sub(r'\s+', ' ', template.lower()).rstrip('?.! ')
+        return template, literals
+
+    def _key(self, template: str) -> str:
+        fingerprint = self.catalog.fingerprint if self.catalog is not None else ''
+        return f"{fingerprint}|{template}"
+
+    def lookup(self, question: str) -> Optional[Tuple[str, Optional[tuple]]]:
+        """Return (sql, params) for a known question shape, or None."""
+        template, literals = self.extract(question)
+        with self._lock:
+            entry = self._entries.get(self._key(template))
+            if entry is None or len(literals) != entry['literal_count']:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(self._key(template))
+            self.hits += 1
+
+        if not entry['params']:
+            return entry['sql'], None
+        params = []
+        for index, prefix, suffix, case in entry['params']:
+            value = literals[index]
+            if case == 'upper':
+                value = value.upper()
+            elif case == 'lower':
+                value = value.lower()
+            params.append(f"{prefix}{value}{suffix}")
+        return entry['sql'], tuple(params)
+
+    def store(self, question: str, sql: str) -> bool:
+        """Parameterize successfully executed SQL and remember it."""
+        template, literals = self.extract(question)
+        parameterized = self.parameterize(sql, literals)
+        if parameterized is None:
+            return False
+
+        sql_template, params = parameterized
+        with self._lock:
+            key = self._key(template)
+            self._entries[key] = {
+                'sql': sql_template,
+                'params': params,
+                'literal_count': len(literals),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+        return True
+
+    def invalidate(self, question: str):
+        """Forget the entry for a question's template (e.g. after it failed)."""
+        template, _ = self.extract(question)
+        with self._lock:
+            self._entries.pop(self._key(template), None)
+
+    @staticmethod
+    def parameterize(sql: str, literals: List[str]):
+        """Replace string literals containing question values with %s.
+
+        Returns (sql_template, param_specs), or None if a value from the
+        question doesn't appear in the SQL (the SQL can't be reused safely).
+        """
+        if not literals:
+            return sql, []
+
+        parts = []
+        params = []
+        found = set()
+        position = 0
+        for match in SQL_STRING_LITERAL.finditer(sql):
+            parts.append(sql[position:match.start()].replace('%', '%%'))
+            position = match.end()
+
+            content = match.group(0)[1:-1].replace("''", "'")
+            spec = None
+            for index, value in enumerate(literals):
+                at = content.lower().find(value.lower())
+                if at < 0:
+                    continue
+                matched = content[at:at + len(value)]
+                if matched == value:
+                    case = 'asis'
+                elif matched == value.upper():
+                    case = 'upper'
+                elif matched == value.lower():
+                    case = 'lower'
+                else:
+                    case = 'asis'
+                spec = (index, content[:at], content[at + len(value):], case)
+                found.add(index)
+                break
+
+            if spec is None:
+                parts.append(match.group(0).replace('%', '%%'))
+            else:
+                parts.append('%s')
+                params.append(spec)
+        parts.append(sql[position:].replace('%', '%%'))
+
+        if len(found) != len(literals):
+            return None
+        return ''.join(parts), params
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'stores': self.stores,
+            'size': len(self._entries),
+        }
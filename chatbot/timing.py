@@ -0,0 +1,58 @@
+"""
+Per-stage timing and the per-request deadline for the chat pipeline.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request runs out of time before a stage starts."""
+
+class Deadline:
+    def __init__(self, seconds: Optional[float]):
+        """Start a request deadline; ``None`` or 0 means no limit."""
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded if there's no time left for ``stage``."""
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds}s exceeded before {stage}")
+
+class StageTimer:
+    def __init__(self):
+        """Start timing a single request."""
+        self.started = time.perf_counter()
+        self.started_ns = time.time_ns()
+        self.stages = {}
+        self.spans = []  # (stage, wall-clock start ns, duration ns) per run of a stage
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block; repeated stages accumulate."""
+        start_ns = time.time_ns()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed * 1000
+            self.spans.append((name, start_ns, int(elapsed * 1e9)))
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, plus the request total."""
+        timings = {name: round(ms, 1) for name, ms in self.stages.items()}
+        timings['total'] = round(self.total_ms(), 1)
+        return timings
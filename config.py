@@ -2,6 +2,7 @@
 Application configuration.
 """
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -25,13 +26,99 @@ class Config:
         'dbname': os.environ.get('DB_NAME', 'construction_db'),
         'user': os.environ.get('DB_USER', 'postgres'),
         'password': os.environ.get('DB_PASSWORD', ''),
-        'sslmode': os.environ.get('DB_SSLMODE', 'prefer')  # Added sslmode for Neon
+        'sslmode': os.environ.get('DB_SSLMODE', 'prefer'),  # Added sslmode for Neon
+        
+        # Connection pool (one pool shared by all request threads)
+        'pool_enabled': os.environ.get('DB_POOL_ENABLED', 'True').lower() == 'true',
+        'pool_min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+        'pool_max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),  # seconds to wait for a free connection
+        'pool_max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+        'pool_reconnect_timeout': float(os.environ.get('DB_POOL_RECONNECT_TIMEOUT', 300)),
+        
+        # Auto-prepare statements executed this many times on a connection
+        'prepare_threshold': int(os.environ.get('DB_PREPARE_THRESHOLD', 5)),
+        
+        # Generated-query results: server-side cursor, fetched in batches up to a row cap
+        'server_side_cursors': os.environ.get('DB_SERVER_SIDE_CURSORS', 'True').lower() == 'true',
+        'fetch_batch_size': int(os.environ.get('DB_FETCH_BATCH_SIZE', 200)),
+        'max_result_rows': int(os.environ.get('DB_MAX_RESULT_ROWS', 1000))
     }
     
+    # Read replicas ("host[:port],host[:port]", same credentials as the primary).
+    # Read-only chatbot queries go to replicas under the lag limit, else the primary.
+    DB_REPLICAS = [h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+    DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 30))  # seconds
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 10))
+    
+    # Schema catalog (persisted, rebuilt only when the schema fingerprint changes)
+    SCHEMA_CACHE_PATH = os.environ.get('SCHEMA_CACHE_PATH', 'cache/schema_catalog.json')
+    SCHEMA_CHECK_INTERVAL = int(os.environ.get('SCHEMA_CHECK_INTERVAL', 60))
+    
+    # Relevance-pruned schema context sent to the LLM
+    SCHEMA_CONTEXT_MAX_TABLES = int(os.environ.get('SCHEMA_CONTEXT_MAX_TABLES', 6))
+    SCHEMA_CONTEXT_MAX_COLUMNS = int(os.environ.get('SCHEMA_CONTEXT_MAX_COLUMNS', 30))
+    
+    # Ask Gemini for intent + SQL in a single round trip (falls back to separate calls)
+    LLM_COMBINED_PLANNING = os.environ.get('LLM_COMBINED_PLANNING', 'True').lower() == 'true'
+    
+    # Result formatting: 'auto' (local, LLM for unusual shapes), 'local' or 'llm'
+    RESULT_FORMAT_POLICY = os.environ.get('RESULT_FORMAT_POLICY', 'auto')
+    RESULT_FORMAT_MAX_ROWS = int(os.environ.get('RESULT_FORMAT_MAX_ROWS', 50))
+    RESULT_FORMAT_MAX_COLUMNS = int(os.environ.get('RESULT_FORMAT_MAX_COLUMNS', 8))
+    
+    # Answer cache for /api/chat ('memory' or 'redis')
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')  # e.g. redis://localhost:6379/0
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+    RESPONSE_CACHE_TTLS = json.loads(os.environ.get('RESPONSE_CACHE_TTLS', '{}'))  # {"category": seconds}
+    RESPONSE_CACHE_WATERMARK_INTERVAL = float(os.environ.get('RESPONSE_CACHE_WATERMARK_INTERVAL', 5))
+    
+    # Cache of validated, parameterized SQL for repeated question shapes
+    SQL_CACHE_ENABLED = os.environ.get('SQL_CACHE_ENABLED', 'True').lower() == 'true'
+    SQL_CACHE_MAX_ENTRIES = int(os.environ.get('SQL_CACHE_MAX_ENTRIES', 500))
+    
+    # EXPLAIN-based cost gate for LLM-generated SQL (planner cost units / estimated rows)
+    SQL_GUARD_ENABLED = os.environ.get('SQL_GUARD_ENABLED', 'True').lower() == 'true'
+    SQL_GUARD_MAX_COST = float(os.environ.get('SQL_GUARD_MAX_COST', 1000000))
+    SQL_GUARD_MAX_ROWS = float(os.environ.get('SQL_GUARD_MAX_ROWS', 100000))
+    SQL_GUARD_DEFAULT_LIMIT = int(os.environ.get('SQL_GUARD_DEFAULT_LIMIT', 1000))  # 0 disables
+    
+    # In-memory project-name index used by the intercepts
+    PROJECT_INDEX_REFRESH_INTERVAL = float(os.environ.get('PROJECT_INDEX_REFRESH_INTERVAL', 30))
+    
+    # Materialized rollups for summaries, budget status and the dashboard
+    ROLLUPS_ENABLED = os.environ.get('ROLLUPS_ENABLED', 'True').lower() == 'true'
+    ROLLUP_REFRESH_INTERVAL = float(os.environ.get('ROLLUP_REFRESH_INTERVAL', 60))  # seconds between change checks
+    ROLLUP_MAX_AGE = float(os.environ.get('ROLLUP_MAX_AGE', 900))  # seconds before a forced refresh
+    
+    # Cross-entity search: hits returned per entity type
+    SEARCH_RESULT_LIMIT = int(os.environ.get('SEARCH_RESULT_LIMIT', 10))
+    
+    # Extra rule-based intents (JSON list, same shape as chatbot.intent_router.BUILTIN_INTENTS)
+    INTENT_ROUTES_PATH = os.environ.get('INTENT_ROUTES_PATH')
+    
     # Application settings
     MAX_CONVERSATION_LENGTH = int(os.environ.get('MAX_CONVERSATION_LENGTH', 20))
+    
+    # Conversation history store ('memory', 'sqlite' or 'redis')
+    CONVERSATION_STORE_BACKEND = os.environ.get('CONVERSATION_STORE_BACKEND', 'memory')
+    CONVERSATION_STORE_URL = os.environ.get('CONVERSATION_STORE_URL')  # SQLite path or Redis URL
+    CONVERSATION_TTL = int(os.environ.get('CONVERSATION_TTL', 86400))
+    CONVERSATION_MAX_CHATS = int(os.environ.get('CONVERSATION_MAX_CHATS', 10000))
+    
+    # Per-request deadline (seconds) across Gemini calls and SQL; 0 disables
     RESPONSE_TIMEOUT = int(os.environ.get('RESPONSE_TIMEOUT', 30))
     
+    # Seconds a request waits for the services to finish starting before a 503
+    STARTUP_REQUEST_WAIT = float(os.environ.get('STARTUP_REQUEST_WAIT', 5))
+    
+    # Request traces as OTLP/JSON: appended to a file and/or posted to a collector
+    TRACE_EXPORT_FILE = os.environ.get('TRACE_EXPORT_FILE')  # e.g. logs/traces.jsonl
+    TRACE_EXPORT_ENDPOINT = os.environ.get('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT')  # e.g. http://localhost:4318/v1/traces
+    TRACE_SERVICE_NAME = os.environ.get('OTEL_SERVICE_NAME', 'construction-chatbot')
+    
     @staticmethod
     def init_app(app):
         """Initialize app with config."""
@@ -3,5 +3,13 @@ Database module initialization.
 """
 from .db_connector import DatabaseConnector
 from .schema_extractor import SchemaExtractor
+from .schema_catalog import SchemaCatalog
+from .async_db_connector import AsyncDatabaseConnector
+from .query_guard import QueryGuard, QueryRejected
+from .result_set import ResultSet
+from .replica_router import ReplicaRouter, AsyncReplicaRouter
+from .rollups import ProjectRollups
 
-__all__ = ['DatabaseConnector', 'SchemaExtractor']
\ No newline at end of file
+__all__ = ['DatabaseConnector', 'SchemaExtractor', 'SchemaCatalog', 'AsyncDatabaseConnector',
+           'QueryGuard', 'QueryRejected', 'ResultSet',
+           'ReplicaRouter', 'AsyncReplicaRouter', 'ProjectRollups']
\ No newline at end of file
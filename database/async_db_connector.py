@@ -0,0 +1,132 @@
+"""
+Asyncio database access for the ASGI app, built on psycopg's AsyncConnectionPool.
+"""
+import logging
+import telemetry
+import psycopg
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from .db_connector import (
+    DatabaseConnector, QueryTimeout, build_conn_string, pool_stats, statement_timeout_ms
+)
+from .query_guard import QueryGuard
+from .result_set import ResultSet
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseConnector:
+    def __init__(self, db_config, query_guard=None):
+        """Initialize the connector; call ``await open()`` inside the event loop."""
+        self.config = db_config
+        self.query_guard = query_guard
+        self.pool = None
+
+    async def open(self):
+        """Open the async connection pool."""
+        try:
+            self.pool = AsyncConnectionPool(
+                build_conn_string(self.config),
+                min_size=self.config.get('pool_min_size', 1),
+                max_size=self.config.get('pool_max_size', 10),
+                timeout=self.config.get('pool_timeout', 30),
+                max_idle=self.config.get('pool_max_idle', 600),
+                reconnect_timeout=self.config.get('pool_reconnect_timeout', 300),
+                kwargs={
+                    'row_factory': dict_row,
+                    'autocommit': False,
+                    'prepare_threshold': self.config.get('prepare_threshold', 5)
+                },
+                check=AsyncConnectionPool.check_connection,
+                name='chatbot-db-async',
+                open=False
+            )
+            await self.pool.open(wait=True, timeout=self.config.get('pool_timeout', 30))
+            logger.info(
+                f"Async database connection pool established "
+                f"(min={self.pool.min_size}, max={self.pool.max_size})"
+            )
+        except Exception as e:
+            logger.error(f"Failed to open async connection pool: {e}")
+            raise
+
+    async def execute_query(self, query, params=None, prepare=None, timeout=None):
+        """Execute any SQL query with optional parameters.
+        
+        ``timeout`` behaves as in DatabaseConnector.execute_query. If the
+        awaiting task is cancelled, psycopg cancels the query server-side.
+        """
+        with telemetry.timed_db('execute_query'):
+            try:
+                async with self.pool.connection(timeout=timeout) as conn:
+                    async with conn.cursor() as cursor:
+                        await self._begin(cursor, query, params, timeout)
+                        await cursor.execute(query, params, prepare=prepare)
+                        if cursor.description:  # SELECT query
+                            return await cursor.fetchall()
+                        return cursor.rowcount
+            except (psycopg.errors.QueryCanceled, PoolTimeout) as e:
+                logger.error(f"Async query timed out after {timeout}s: {e}")
+                raise QueryTimeout(str(e)) from e
+            except Exception as e:
+                logger.error(f"Async query execution failed: {e}")
+                raise
+
+    async def fetch_result_set(self, query, params=None, prepare=None, timeout=None,
+                               guard=False, max_rows=None):
+        """Async version of DatabaseConnector.fetch_result_set."""
+        max_rows = max_rows or self.config.get('max_result_rows', 1000)
+        batch_size = self.config.get('fetch_batch_size', 200)
+        server_side = self.config.get('server_side_cursors', True) and not prepare
+        with telemetry.timed_db('fetch_result_set'):
+            try:
+                async with self.pool.connection(timeout=timeout) as conn:
+                    async with conn.cursor() as cursor:
+                        await self._begin(cursor, query, params, timeout, guard)
+
+                    if server_side:
+                        async with conn.cursor(name='chatbot_results', row_factory=tuple_row) as cursor:
+                            cursor.itersize = batch_size
+                            await cursor.execute(query, params)
+                            return await ResultSet.fetch_async(cursor, max_rows, batch_size)
+
+                    async with conn.cursor(row_factory=tuple_row) as cursor:
+                        await cursor.execute(query, params, prepare=prepare)
+                        return await ResultSet.fetch_async(cursor, max_rows, batch_size)
+            except (psycopg.errors.QueryCanceled, PoolTimeout) as e:
+                logger.error(f"Async query timed out after {timeout}s: {e}")
+                raise QueryTimeout(str(e)) from e
+            except Exception as e:
+                logger.error(f"Async query execution failed: {e}")
+                raise
+
+    async def _begin(self, cursor, query, params, timeout, guard=False):
+        """Apply the statement timeout and (optionally) the plan check."""
+        if timeout is not None:
+            await cursor.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                (statement_timeout_ms(timeout),)
+            )
+        if guard and self.query_guard is not None:
+            await cursor.execute(QueryGuard.explain_sql(query), params, prepare=False)
+            self.query_guard.check(query, await cursor.fetchall())
+
+    async def execute_safe(self, query, params=None, prepare=None, timeout=None):
+        """Clean, safety-check, and execute SELECT/CTE queries only."""
+        cleaned = DatabaseConnector.clean_sql(query)
+        if not DatabaseConnector._is_safe_query(cleaned):
+            raise ValueError("Only SELECT (or WITH) queries are allowed for safety")
+        if self.query_guard is not None:
+            cleaned = self.query_guard.apply_limit(cleaned)
+        return await self.fetch_result_set(cleaned, params, prepare=prepare, timeout=timeout, guard=True)
+
+    def get_pool_stats(self):
+        """Return async pool metrics (same shape as DatabaseConnector)."""
+        if self.pool is None:
+            return {'pooled': False, 'connected': False}
+        return pool_stats(self.pool)
+
+    async def close(self):
+        """Close the async connection pool."""
+        if self.pool is not None and not self.pool.closed:
+            await self.pool.close()
+            logger.info("Async database connection pool closed")
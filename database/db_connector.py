@@ -1,60 +1,228 @@
 import psycopg
-from psycopg.rows import dict_row
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import ConnectionPool, PoolTimeout
+from contextlib import contextmanager
+import threading
 import re
 import json
 import logging
+import telemetry
+from .query_guard import QueryGuard
+from .result_set import ResultSet
 
 logger = logging.getLogger(__name__)
 
+class QueryTimeout(TimeoutError):
+    """A query (or the wait for a pooled connection) ran past its timeout."""
+
+def statement_timeout_ms(timeout):
+    """Seconds -> a Postgres statement_timeout value (at least 1ms)."""
+    return f"{max(1, int(timeout * 1000))}ms"
+
+def build_conn_string(config):
+    """Build the connection string for psycopg3 from a DB_CONFIG dict."""
+    return f"postgresql://{config.get('user')}:{config.get('password')}@{config.get('host')}:{config.get('port', 5432)}/{config.get('dbname')}?sslmode={config.get('sslmode', 'prefer')}"
+
+def pool_stats(pool):
+    """Summarize psycopg_pool stats (sync or async pool) for sizing under load."""
+    stats = pool.get_stats()
+    size = stats.get('pool_size', 0)
+    available = stats.get('pool_available', 0)
+    queued = stats.get('requests_queued', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'pooled': True,
+        'min_size': pool.min_size,
+        'max_size': pool.max_size,
+        'size': size,
+        'available': available,
+        'in_use': size - available,
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': stats.get('requests_num', 0),
+        'requests_queued': queued,
+        'wait_ms_total': wait_ms,
+        'wait_ms_avg': round(wait_ms / queued, 2) if queued else 0.0,
+        'checkout_timeouts': stats.get('requests_errors', 0),
+        'connection_errors': stats.get('connections_errors', 0),
+        'connections_lost': stats.get('connections_lost', 0)
+    }
+
 class DatabaseConnector:
-    def __init__(self, db_config):
-        """Initialize database connection with psycopg3."""
+    def __init__(self, db_config, query_guard=None):
+        """Initialize database connection with psycopg3.
+        
+        ``query_guard`` (a QueryGuard) vets execute_safe queries with EXPLAIN.
+        """
         self.config = db_config
+        self.query_guard = query_guard
         self.conn = None
+        self.pool = None
+        # Serializes access to the single shared connection when not pooled
+        self._lock = threading.RLock()
         self.connect()
     
+    def _conn_string(self):
+        """Build the connection string for psycopg3."""
+        return build_conn_string(self.config)
+    
     def connect(self):
-        """Establish database connection."""
+        """Establish database connection (or connection pool)."""
         try:
-            # Create connection string for psycopg3
-            conn_string = f"postgresql://{self.config.get('user')}:{self.config.get('password')}@{self.config.get('host')}:{self.config.get('port', 5432)}/{self.config.get('dbname')}?sslmode={self.config.get('sslmode', 'prefer')}"
-            
-            self.conn = psycopg.connect(
-                conn_string,
-                row_factory=dict_row,
-                autocommit=False
-            )
-            logger.info("Database connection established")
+            if self.config.get('pool_enabled'):
+                self.pool = ConnectionPool(
+                    self._conn_string(),
+                    min_size=self.config.get('pool_min_size', 1),
+                    max_size=self.config.get('pool_max_size', 10),
+                    timeout=self.config.get('pool_timeout', 30),
+                    max_idle=self.config.get('pool_max_idle', 600),
+                    reconnect_timeout=self.config.get('pool_reconnect_timeout', 300),
+                    kwargs={
+                        'row_factory': dict_row,
+                        'autocommit': False,
+                        'prepare_threshold': self.config.get('prepare_threshold', 5)
+                    },
+                    # Health check on checkout; broken connections are replaced
+                    check=ConnectionPool.check_connection,
+                    reconnect_failed=self._on_reconnect_failed,
+                    name='chatbot-db',
+                    open=False
+                )
+                self.pool.open(wait=True, timeout=self.config.get('pool_timeout', 30))
+                logger.info(
+                    f"Database connection pool established "
+                    f"(min={self.pool.min_size}, max={self.pool.max_size})"
+                )
+            else:
+                self.conn = psycopg.connect(
+                    self._conn_string(),
+                    row_factory=dict_row,
+                    autocommit=False,
+                    prepare_threshold=self.config.get('prepare_threshold', 5)
+                )
+                logger.info("Database connection established")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
     
-    def execute_query(self, query, params=None):
-        """Execute any SQL query with optional parameters."""
-        try:
-            # Ensure connection is alive
-            if self.conn.closed:
+    def _on_reconnect_failed(self, pool):
+        """Called by the pool when it gives up reconnecting."""
+        logger.error(f"Connection pool '{pool.name}' failed to reconnect to the database")
+    
+    @contextmanager
+    def connection(self, timeout=None):
+        """Check out a connection for one unit of work.
+        
+        The transaction is committed when the block exits cleanly and rolled
+        back on error, so a failure never touches another request's work.
+        ``timeout`` caps the wait for a pooled connection (seconds).
+        """
+        if self.pool is not None:
+            with self.pool.connection(timeout=timeout) as conn:
+                yield conn
+            return
+        
+        with self._lock:
+            # Ensure connection is alive, reconnect after a failure
+            if self.conn is None or self.conn.closed or self.conn.broken:
                 self.connect()
-            
-            with self.conn.cursor() as cursor:
-                cursor.execute(query, params or ())
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                if not self.conn.closed:
+                    self.conn.rollback()
+                raise
+    
+    def execute_query(self, query, params=None, prepare=None, timeout=None):
+        """Execute any SQL query with optional parameters.
+        
+        ``prepare=True`` prepares the statement on first use (psycopg keeps it
+        per connection); ``None`` leaves it to the connection's threshold.
+        ``timeout`` (seconds) sets a transaction-local statement_timeout, so
+        Postgres cancels the query server-side when it runs too long; that
+        (or waiting too long for a pooled connection) raises QueryTimeout.
+        """
+        with telemetry.timed_db('execute_query'):
+            try:
+                with self.connection(timeout=timeout) as conn:
+                    with conn.cursor() as cursor:
+                        self._begin(cursor, query, params, timeout)
+                        # Only pass params when given, so literal '%' in
+                        # unparameterized SQL (e.g. ILIKE '%x%') isn't parsed
+                        cursor.execute(query, params, prepare=prepare)
+                    
+                        # Handle different query types
+                        if cursor.description:  # SELECT query
+                            # Already in dict format due to dict_row factory
+                            return cursor.fetchall()
+                        else:  # INSERT/UPDATE/DELETE query
+                            return cursor.rowcount
+                    
+            except (psycopg.errors.QueryCanceled, PoolTimeout) as e:
+                logger.error(f"Query timed out after {timeout}s: {e}")
+                raise QueryTimeout(str(e)) from e
+            except Exception as e:
+                logger.error(f"Query execution failed: {e}")
+                raise
+    
+    def fetch_result_set(self, query, params=None, prepare=None, timeout=None,
+                         guard=False, max_rows=None):
+        """Run a SELECT and fetch at most ``max_rows`` rows as a ResultSet.
+        
+        Rows come back as tuples in batches of ``fetch_batch_size``. Unless
+        the statement is to be prepared, a server-side (named) cursor is used,
+        so rows past the cap are never sent by the server. ``guard=True``
+        checks the plan with the query guard first, in the same transaction
+        (QueryRejected if it's too expensive).
+        """
+        max_rows = max_rows or self.config.get('max_result_rows', 1000)
+        batch_size = self.config.get('fetch_batch_size', 200)
+        server_side = self.config.get('server_side_cursors', True) and not prepare
+        with telemetry.timed_db('fetch_result_set'):
+            try:
+                with self.connection(timeout=timeout) as conn:
+                    with conn.cursor() as cursor:
+                        self._begin(cursor, query, params, timeout, guard)
                 
-                # Handle different query types
-                if cursor.description:  # SELECT query
-                    result = cursor.fetchall()
-                    # Already in dict format due to dict_row factory
-                    return result
-                else:  # INSERT/UPDATE/DELETE query
-                    self.conn.commit()
-                    return cursor.rowcount
+                    if server_side:
+                        with conn.cursor(name='chatbot_results', row_factory=tuple_row) as cursor:
+                            cursor.itersize = batch_size
+                            cursor.execute(query, params)
+                            return ResultSet.fetch(cursor, max_rows, batch_size)
+                
+                    with conn.cursor(row_factory=tuple_row) as cursor:
+                        cursor.execute(query, params, prepare=prepare)
+                        return ResultSet.fetch(cursor, max_rows, batch_size)
                     
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Query execution failed: {e}")
-            raise
+            except (psycopg.errors.QueryCanceled, PoolTimeout) as e:
+                logger.error(f"Query timed out after {timeout}s: {e}")
+                raise QueryTimeout(str(e)) from e
+            except Exception as e:
+                logger.error(f"Query execution failed: {e}")
+                raise
+    
+    def _begin(self, cursor, query, params, timeout, guard=False):
+        """Apply the statement timeout and (optionally) the plan check."""
+        if timeout is not None:
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, true)",
+                (statement_timeout_ms(timeout),)
+            )
+        if guard and self.query_guard is not None:
+            cursor.execute(QueryGuard.explain_sql(query), params, prepare=False)
+            self.query_guard.check(query, cursor.fetchall())
+    
+    def get_pool_stats(self):
+        """Return connection pool metrics for sizing under load."""
+        if self.pool is None:
+            return {'pooled': False, 'connected': bool(self.conn and not self.conn.closed)}
+        return pool_stats(self.pool)
     
-    def get_schema_summary(self):
-        """Get a summary of all tables and their columns."""
+    def get_schema_summary(self, raise_errors=False):
+        """Get a summary of all tables and their columns.
+        
+        Errors are logged and give ``{}`` unless ``raise_errors`` is set.
+        """
         query = """
         SELECT 
             table_name,
@@ -78,6 +246,8 @@ class DatabaseConnector:
             return schema
         except Exception as e:
             logger.error(f"Failed to get schema summary: {e}")
+            if raise_errors:
+                raise
             return {}
     
     def search_projects(self, search_term=None):
@@ -112,8 +282,9 @@ class DatabaseConnector:
         query = f'SELECT * FROM "{table_name}" LIMIT %s'
         return self.execute_query(query, (limit,))
     
-    def execute_safe(self, query, params=None):
-        """Clean, safety-check, and execute SELECT/CTE queries only."""
+    @staticmethod
+    def clean_sql(query):
+        """Strip code fences, a leading 'sql' tag and extra whitespace."""
         # 1) Remove fences
         cleaned = query.replace('```', '')
 
@@ -121,21 +292,30 @@ class DatabaseConnector:
         cleaned = re.sub(r'^\s*sql\s*', '', cleaned, flags=re.IGNORECASE)
 
         # 3) Strip out extra whitespace
-        cleaned = cleaned.strip()
+        return cleaned.strip()
+    
+    def execute_safe(self, query, params=None, prepare=None, timeout=None):
+        """Clean, safety-check, and execute SELECT/CTE queries only."""
+        cleaned = self.clean_sql(query)
 
         # Debug log so you can see exactly what you’re executing
-        print("Executing cleaned SQL:", repr(cleaned))
+        logger.debug(f"Executing cleaned SQL: {cleaned!r}")
 
         # 4) Safety check on the _cleaned_ SQL
         if not self._is_safe_query(cleaned):
             raise ValueError("Only SELECT (or WITH) queries are allowed for safety")
 
-        # 5) Finally execute the truly clean SQL
-        return self.execute_query(cleaned, params)
+        # 5) Cap the result size before the planner check
+        if self.query_guard is not None:
+            cleaned = self.query_guard.apply_limit(cleaned)
+
+        # 6) Finally execute the truly clean SQL, fetching a bounded result
+        return self.fetch_result_set(cleaned, params, prepare=prepare, timeout=timeout, guard=True)
     
      # In db_connector.py, replace your _is_safe_query() with:
 
-    def _is_safe_query(self, query):
+    @staticmethod
+    def _is_safe_query(query):
         """Check if query is safe to execute."""
         # We assume 'query' is already cleaned.
         normalized = re.sub(r'\s+', ' ', query.strip()).lower()
@@ -143,7 +323,10 @@ class DatabaseConnector:
 
 
     def close(self):
-        """Close database connection."""
+        """Close database connection (or connection pool)."""
+        if self.pool is not None and not self.pool.closed:
+            self.pool.close()
+            logger.info("Database connection pool closed")
         if self.conn and not self.conn.closed:
             self.conn.close()
             logger.info("Database connection closed")
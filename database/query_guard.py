@@ -0,0 +1,108 @@
+"""
+Planner-based cost gate for LLM-generated SQL.
+
+Before a generated query runs, it gets a LIMIT if it has none, and its
+``EXPLAIN (FORMAT JSON)`` estimate is checked against configurable cost
+and row ceilings. A query over either ceiling is rejected before it can
+scan or return millions of rows from the shared database.
+"""
+import re
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+PARENTHESIZED = re.compile(r"\([^()]*\)")
+TOP_LEVEL_LIMIT = re.compile(r"\blimit\b|\bfetch\s+(?:first|next)\b", re.IGNORECASE)
+
+class QueryRejected(ValueError):
+    """The planner estimates a query is too expensive to run."""
+
+class QueryGuard:
+    def __init__(self,
+                 max_cost: float = 1_000_000,
+                 max_rows: float = 100_000,
+                 default_limit: Optional[int] = 1000):
+        """Initialize the ceilings.
+
+        ``max_cost`` is in Postgres planner cost units and ``max_rows`` is
+        the top plan node's row estimate. ``default_limit`` is appended to
+        queries with no top-level LIMIT (None disables the rewrite).
+        """
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.default_limit = default_limit
+        self.checked = 0
+        self.rejected = 0
+        self.limited = 0
+
+    @staticmethod
+    def has_limit(sql: str) -> bool:
+        """Whether the outermost query has a LIMIT / FETCH FIRST clause."""
+        stripped = QUOTED.sub("''", sql)
+        # Drop subqueries and function calls so only the top level remains
+        previous = None
+        while previous != stripped:
+            previous = stripped
+            stripped = PARENTHESIZED.sub(' ', stripped)
+        return bool(TOP_LEVEL_LIMIT.search(stripped))
+
+    def apply_limit(self, sql: str) -> str:
+        """Append the default LIMIT when the query has none."""
+        if not self.default_limit or self.has_limit(sql):
+            return sql
+        self.limited += 1
+        # New line so a trailing '-- comment' can't swallow the clause
+        return f"{sql.rstrip().rstrip(';').rstrip()}\nLIMIT {int(self.default_limit)}"
+
+    @staticmethod
+    def explain_sql(sql: str) -> str:
+        return f"EXPLAIN (FORMAT JSON) {sql}"
+
+    def check(self, sql: str, explain_rows: List[Dict]) -> Dict:
+        """Check an EXPLAIN (FORMAT JSON) result; raise QueryRejected if over a ceiling."""
+        self.checked += 1
+        plan = self._top_plan(explain_rows)
+        summary = {
+            'node': plan.get('Node Type'),
+            'total_cost': plan.get('Total Cost', 0.0),
+            'plan_rows': plan.get('Plan Rows', 0),
+        }
+        logger.info(
+            f"Query plan: {summary['node']} cost={summary['total_cost']} rows={summary['plan_rows']}"
+        )
+        logger.debug(f"Full plan for {sql!r}: {json.dumps(plan)}")
+
+        if self.max_cost and summary['total_cost'] > self.max_cost:
+            self.rejected += 1
+            logger.warning(f"Rejected query (estimated cost {summary['total_cost']} > {self.max_cost}): {sql!r}")
+            raise QueryRejected(
+                f"Query rejected: estimated cost {summary['total_cost']:.0f} exceeds the limit of {self.max_cost:.0f}"
+            )
+        if self.max_rows and summary['plan_rows'] > self.max_rows:
+            self.rejected += 1
+            logger.warning(f"Rejected query (estimated rows {summary['plan_rows']} > {self.max_rows}): {sql!r}")
+            raise QueryRejected(
+                f"Query rejected: estimated {summary['plan_rows']} rows exceeds the limit of {self.max_rows:.0f}"
+            )
+        return summary
+
+    @staticmethod
+    def _top_plan(explain_rows: List[Dict]) -> Dict:
+        """Pull the top plan node out of the EXPLAIN result row."""
+        document = next(iter(explain_rows[0].values()))
+        if isinstance(document, str):
+            document = json.loads(document)
+        return document[0]['Plan']
+
+    def stats(self) -> Dict:
+        return {
+            'checked': self.checked,
+            'rejected': self.rejected,
+            'limited': self.limited,
+            'max_cost': self.max_cost,
+            'max_rows': self.max_rows,
+            'default_limit': self.default_limit,
+        }
@@ -0,0 +1,283 @@
+"""
+Read-replica routing.
+
+ReplicaRouter has the same read API as DatabaseConnector, so it can be
+handed to ChatHandler, the caches and the schema catalog unchanged. Reads
+go to a healthy replica (round-robin among replicas whose replication lag
+is under ``max_lag``) and fail over to the next replica, then the primary,
+when a connection fails. Writes go to the primary via ``execute_write``;
+``primary`` and ``replica_status()`` let health checks address each
+endpoint separately.
+
+Lag is re-checked in a background thread at most every ``check_interval``
+seconds, so routing a query never waits on a health probe.
+"""
+import time
+import logging
+import threading
+from itertools import count
+from typing import Dict, List
+import psycopg
+from psycopg_pool import PoolTimeout
+from .db_connector import DatabaseConnector, QueryTimeout
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'primary'
+
+# Replay lag in seconds (0 when fully caught up, since an idle primary would
+# otherwise look like growing lag; NULL when unknown) and seconds since the
+# WAL receiver last heard from the primary (NULL when it isn't streaming: a
+# replica cut off from the primary has nothing left to replay, so its replay
+# lag alone reads 0 however far behind it falls)
+LAG_SQL = """
+SELECT
+    pg_is_in_recovery() AS standby,
+    CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag,
+    (SELECT EXTRACT(EPOCH FROM now() - MAX(last_msg_receipt_time))
+     FROM pg_stat_wal_receiver WHERE status = 'streaming') AS receiver_age
+"""
+
+def parse_endpoint(endpoint: str, default_port: int = 5432):
+    """'host' or 'host:port' -> (host, port)."""
+    host, _, port = endpoint.strip().partition(':')
+    return host, int(port) if port else default_port
+
+def lag_problem(row: Dict, max_lag: float):
+    """Why a LAG_SQL row rules the endpoint out for reads, or None if it's usable."""
+    if not row['standby']:
+        return None
+    if row['receiver_age'] is None:
+        return "WAL receiver is not streaming"
+    if float(row['receiver_age']) > max_lag:
+        return f"no WAL received for {float(row['receiver_age']):.0f}s"
+    if row['lag'] is None:
+        return "replay lag is unknown"
+    if float(row['lag']) > max_lag:
+        return f"{float(row['lag']):.1f}s behind"
+    return None
+
+def is_connection_failure(error: Exception) -> bool:
+    """Whether an error means the endpoint is unusable (so another may work)."""
+    if isinstance(error, QueryTimeout):
+        # Waiting for a pooled connection timed out; a slow query did not
+        return isinstance(error.__cause__, PoolTimeout)
+    return (isinstance(error, psycopg.OperationalError)
+            and not isinstance(error, psycopg.errors.QueryCanceled))
+
+class ReplicaRouter:
+    def __init__(self,
+                 primary: DatabaseConnector,
+                 replicas: Dict[str, DatabaseConnector],
+                 max_lag: float = 30,
+                 check_interval: float = 10):
+        """Route reads across ``replicas`` (name -> connector), falling back to ``primary``."""
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._status = {
+            name: {'healthy': True, 'lag': None, 'checked_at': None, 'error': None}
+            for name in replicas
+        }
+        self._turn = count()
+        self._checked_at = 0.0
+        self._checking = threading.Lock()
+        self.reads = {name: 0 for name in [*replicas, PRIMARY]}
+        self.failovers = 0
+
+    @classmethod
+    def from_endpoints(cls, primary: DatabaseConnector, endpoints: List[str], **kwargs) -> 'ReplicaRouter':
+        """Build replica connectors that share the primary's settings and credentials."""
+        replicas = {}
+        for endpoint in endpoints:
+            host, port = parse_endpoint(endpoint, primary.config.get('port', 5432))
+            try:
+                replicas[endpoint] = DatabaseConnector(
+                    dict(primary.config, host=host, port=port),
+                    query_guard=primary.query_guard
+                )
+            except Exception as e:
+                logger.error(f"Replica {endpoint} unavailable at startup, not routing to it: {e}")
+        return cls(primary, replicas, **kwargs)
+
+    # ---- endpoint selection ----
+
+    def candidates(self) -> List[str]:
+        """Endpoints to try for a read: healthy replicas in rotation, then the primary."""
+        self._maybe_refresh()
+        healthy = [name for name, status in self._status.items() if status['healthy']]
+        if healthy:
+            start = next(self._turn) % len(healthy)
+            healthy = healthy[start:] + healthy[:start]
+        return healthy + [PRIMARY]
+
+    def connector(self, name: str) -> DatabaseConnector:
+        return self.primary if name == PRIMARY else self.replicas[name]
+
+    def mark_failed(self, name: str, error: Exception):
+        """Take a replica out of rotation until its next successful lag check."""
+        if name == PRIMARY:
+            return
+        logger.warning(f"Replica {name} failed, routing reads elsewhere: {error}")
+        self._status[name].update(healthy=False, error=str(error))
+        self.failovers += 1
+
+    def record_read(self, name: str):
+        self.reads[name] += 1
+
+    def _maybe_refresh(self):
+        """Start a background lag check if the last one is stale."""
+        if not self.replicas or time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if not self._checking.acquire(blocking=False):
+            return
+        self._checked_at = time.monotonic()
+        threading.Thread(target=self._refresh, name='replica-lag-check', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            for name, replica in self.replicas.items():
+                status = self._status[name]
+                try:
+                    row = replica.execute_query(LAG_SQL, timeout=5)[0]
+                    problem = lag_problem(row, self.max_lag)
+                    if problem and status['healthy']:
+                        logger.warning(f"Replica {name}: {problem}, routing reads elsewhere")
+                    lag = None if row['lag'] is None else round(float(row['lag']), 3)
+                    status.update(healthy=problem is None, lag=lag, error=problem)
+                except Exception as e:
+                    if status['healthy']:
+                        logger.warning(f"Replica {name} lag check failed: {e}")
+                    status.update(healthy=False, lag=None, error=str(e))
+                status['checked_at'] = time.time()
+        finally:
+            self._checking.release()
+
+    # ---- reads (replica first) ----
+
+    def _read(self, method: str, *args, **kwargs):
+        error = None
+        for name in self.candidates():
+            try:
+                result = getattr(self.connector(name), method)(*args, **kwargs)
+            except Exception as e:
+                if not is_connection_failure(e):
+                    raise
+                self.mark_failed(name, e)
+                error = e
+                continue
+            self.record_read(name)
+            return result
+        raise error
+
+    def execute_query(self, query, params=None, prepare=None, timeout=None):
+        """Run a read query on a replica (or the primary as a fallback)."""
+        return self._read('execute_query', query, params, prepare=prepare, timeout=timeout)
+
+    def execute_safe(self, query, params=None, prepare=None, timeout=None):
+        return self._read('execute_safe', query, params, prepare=prepare, timeout=timeout)
+
+    def fetch_result_set(self, query, params=None, prepare=None, timeout=None, guard=False, max_rows=None):
+        return self._read('fetch_result_set', query, params, prepare=prepare, timeout=timeout,
+                          guard=guard, max_rows=max_rows)
+
+    # ---- primary only ----
+
+    def execute_write(self, query, params=None, timeout=None):
+        """Run a write on the primary."""
+        return self.primary.execute_query(query, params, timeout=timeout)
+
+    def __getattr__(self, name):
+        # Everything else (clean_sql, get_schema_summary, ...) uses the primary
+        return getattr(self.primary, name)
+
+    # ---- introspection ----
+
+    def replica_status(self) -> Dict:
+        return {
+            'max_lag': self.max_lag,
+            'replicas': {name: dict(status) for name, status in self._status.items()},
+            'reads': dict(self.reads),
+            'failovers': self.failovers,
+        }
+
+    def get_pool_stats(self) -> Dict:
+        stats = self.primary.get_pool_stats()
+        stats['replicas'] = {name: r.get_pool_stats() for name, r in self.replicas.items()}
+        return stats
+
+    def after_fork(self):
+        """Reconnect in a forked worker (the primary is reconnected by the caller).
+
+        A lag check running in the parent at fork time would leave its lock
+        held in the child, so the lock is replaced and a check is due at once.
+        """
+        self._checking = threading.Lock()
+        self._checked_at = 0.0
+        for name, replica in self.replicas.items():
+            try:
+                replica.connect()
+            except Exception as e:
+                self.mark_failed(name, e)
+
+    def close(self):
+        for replica in self.replicas.values():
+            replica.close()
+        self.primary.close()
+
+class AsyncReplicaRouter:
+    def __init__(self, router: ReplicaRouter, primary, replicas: Dict):
+        """Async reads over AsyncDatabaseConnectors, sharing ``router``'s health state."""
+        self.router = router
+        self.primary = primary
+        self.replicas = replicas
+
+    def connector(self, name: str):
+        return self.primary if name == PRIMARY else self.replicas[name]
+
+    async def open(self):
+        await self.primary.open()
+        for name, replica in list(self.replicas.items()):
+            try:
+                await replica.open()
+            except Exception as e:
+                logger.error(f"Async pool for replica {name} failed to open: {e}")
+                self.replicas.pop(name)
+
+    async def _read(self, method: str, *args, **kwargs):
+        error = None
+        for name in self.router.candidates():
+            if name != PRIMARY and name not in self.replicas:
+                continue
+            try:
+                result = await getattr(self.connector(name), method)(*args, **kwargs)
+            except Exception as e:
+                if not is_connection_failure(e):
+                    raise
+                self.router.mark_failed(name, e)
+                error = e
+                continue
+            self.router.record_read(name)
+            return result
+        raise error
+
+    async def execute_query(self, query, params=None, prepare=None, timeout=None):
+        return await self._read('execute_query', query, params, prepare=prepare, timeout=timeout)
+
+    async def execute_safe(self, query, params=None, prepare=None, timeout=None):
+        return await self._read('execute_safe', query, params, prepare=prepare, timeout=timeout)
+
+    def get_pool_stats(self) -> Dict:
+        stats = self.primary.get_pool_stats()
+        stats['replicas'] = {name: r.get_pool_stats() for name, r in self.replicas.items()}
+        return stats
+
+    async def close(self):
+        for replica in self.replicas.values():
+            await replica.close()
+        await self.primary.close()
@@ -0,0 +1,60 @@
+"""
+Compact, bounded query results.
+
+Rows are kept as tuples next to a single column list (rather than one dict
+per row) and fetching stops at a row cap, with ``truncated`` recording that
+more rows were available. A ResultSet still reads like a list of dicts, so
+existing consumers keep working.
+"""
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Optional
+
+class ResultSet(Sequence):
+    __slots__ = ('columns', 'rows', 'truncated', 'max_rows')
+
+    def __init__(self, columns: List[str], rows: List[tuple], truncated: bool = False,
+                 max_rows: Optional[int] = None):
+        self.columns = columns
+        self.rows = rows
+        self.truncated = truncated
+        self.max_rows = max_rows
+
+    @classmethod
+    def fetch(cls, cursor, max_rows: int, batch_size: int = 200) -> 'ResultSet':
+        """Fetch up to ``max_rows`` tuple rows from an executed cursor in batches."""
+        columns = [d.name for d in cursor.description] if cursor.description else []
+        rows = []
+        while len(rows) <= max_rows:
+            batch = cursor.fetchmany(min(batch_size, max_rows + 1 - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+        return cls(columns, rows[:max_rows], len(rows) > max_rows, max_rows)
+
+    @classmethod
+    async def fetch_async(cls, cursor, max_rows: int, batch_size: int = 200) -> 'ResultSet':
+        """Async version of fetch."""
+        columns = [d.name for d in cursor.description] if cursor.description else []
+        rows = []
+        while len(rows) <= max_rows:
+            batch = await cursor.fetchmany(min(batch_size, max_rows + 1 - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+        return cls(columns, rows[:max_rows], len(rows) > max_rows, max_rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [dict(zip(self.columns, row)) for row in self.rows[index]]
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in self.rows:
+            yield dict(zip(self.columns, row))
+
+    def __repr__(self) -> str:
+        more = ', truncated' if self.truncated else ''
+        return f"<ResultSet {len(self.rows)} rows x {len(self.columns)} columns{more}>"
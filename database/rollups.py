@@ -0,0 +1,289 @@
+"""
+Precomputed project rollups.
+
+Per-phase completion counts, per-project invoice totals and the dashboard
+totals are kept in materialized views, so the summary, budget and dashboard
+handlers read a few indexed rows instead of re-aggregating the base tables
+on every request.
+
+The views are refreshed in a background thread (``REFRESH MATERIALIZED
+VIEW CONCURRENTLY``, so readers are never blocked) when the source tables'
+watermarks (see database.watermarks) move, and unconditionally every
+``max_age`` seconds in case write counters lagged. The watermarks of the
+last refresh are kept in the database, so each change is refreshed once
+for all workers, and writes made while the app was down are picked up at
+startup. Readers only use the views while the refresher is keeping up;
+otherwise they get None and query live.
+"""
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+from .watermarks import updated_at_indexes, read_watermarks
+
+logger = logging.getLogger(__name__)
+
+# Tables the rollups are computed from (their watermarks drive refreshes)
+SOURCE_TABLES = ('projects', 'phases', 'subphases', 'leads', 'invoices')
+
+# Stops several workers refreshing at the same time
+REFRESH_LOCK_KEY = 72_410_018
+
+# Source watermarks and time of the last refresh, shared by all workers
+STATE_TABLE = 'chatbot_rollup_state'
+
+VIEWS = {
+    'chatbot_phase_rollup': {
+        'query': """
+            SELECT
+              ph.id        AS phase_id,
+              ph.project_id,
+              p.name       AS project_name,
+              ph.name      AS phase_name,
+              ph."order"   AS phase_order,
+              ph.status    AS phase_status,
+              COUNT(sp.id) FILTER (WHERE sp.status = 'Completed') AS done,
+              COUNT(sp.id) AS total
+            FROM phases ph
+            JOIN projects p ON p.id = ph.project_id
+            LEFT JOIN subphases sp ON sp.phase_id = ph.id
+            GROUP BY ph.id, p.name
+        """,
+        'unique': 'phase_id',
+        'indexes': ['project_id'],
+    },
+    'chatbot_invoice_rollup': {
+        'query': """
+            SELECT
+              p.id   AS project_id,
+              p.name AS project,
+              COUNT(i.id) AS invoice_count,
+              COALESCE(SUM(i."totalAmount"), 0)::numeric(12,2) AS total_invoiced
+            FROM projects p
+            LEFT JOIN leads    l ON p.client_id   = l.id
+            LEFT JOIN invoices i ON i.customer_id = l.id
+            GROUP BY p.id
+        """,
+        'unique': 'project_id',
+        'indexes': [],
+    },
+    'chatbot_dashboard_rollup': {
+        'query': """
+            SELECT
+                1 AS id,
+                COUNT(DISTINCT p.id) as total_projects,
+                COUNT(CASE WHEN p."percentComplete" < 100 THEN 1 END) as active_projects,
+                COUNT(CASE WHEN p."percentComplete" = 100 THEN 1 END) as completed_projects,
+                ROUND(AVG(p."percentComplete"), 2) as avg_completion,
+                COUNT(DISTINCT ph.id) as total_phases,
+                COUNT(DISTINCT sp.id) as total_tasks,
+                COUNT(CASE WHEN sp.status = 'Completed' THEN 1 END) as completed_tasks
+            FROM projects p
+            LEFT JOIN phases ph ON p.id = ph.project_id
+            LEFT JOIN subphases sp ON ph.id = sp.phase_id
+        """,
+        'unique': 'id',
+        'indexes': [],
+    },
+}
+
+class ProjectRollups:
+    def __init__(self,
+                 db,
+                 schema_catalog=None,
+                 refresh_interval: float = 60,
+                 max_age: float = 900):
+        """Create the rollup views if needed.
+
+        ``db`` is a DatabaseConnector or ReplicaRouter (DDL and refreshes go
+        to the primary). Source-table changes are checked every
+        ``refresh_interval`` seconds; views older than ``max_age`` are
+        refreshed regardless and aren't read until they are.
+        """
+        self.db = db
+        self.writer = getattr(db, 'primary', db)
+        self.catalog = schema_catalog
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.available = False
+        self._indexed = None       # (fingerprint, {table: indexed updatedAt column})
+        self._refreshed_at = 0.0   # last REFRESH (monotonic)
+        self._checked_at = 0.0     # last time the views were known current
+        self._checking = threading.Lock()
+        self.refreshes = 0
+        self.skipped = 0
+        self.reads = 0
+        self.fallbacks = 0
+        self.ensure()
+
+    def ensure(self) -> bool:
+        """Create the materialized views and their indexes if they don't exist.
+
+        Views left by an earlier process may be out of date, so they aren't
+        read until the first refresh check has compared their watermarks.
+        """
+        try:
+            with self.writer.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+                        f"id int PRIMARY KEY, watermarks text NOT NULL, refreshed_at timestamptz NOT NULL)"
+                    )
+                    for name, view in VIEWS.items():
+                        cursor.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {view['query']}")
+                        # REFRESH ... CONCURRENTLY needs a unique index
+                        cursor.execute(
+                            f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {name} ({view['unique']})"
+                        )
+                        for column in view['indexes']:
+                            cursor.execute(
+                                f"CREATE INDEX IF NOT EXISTS {name}_{column}_idx ON {name} ({column})"
+                            )
+            self.available = True
+            self._checked_at = 0.0
+            logger.info(f"Project rollups ready ({', '.join(VIEWS)})")
+        except Exception as e:
+            self.available = False
+            logger.error(f"Project rollups unavailable, handlers will aggregate live: {e}")
+        return self.available
+
+    # ---- refreshing ----
+
+    def watermarks(self) -> Dict[str, str]:
+        """Current watermark of each source table (read on the primary)."""
+        fingerprint = getattr(self.catalog, 'fingerprint', None)
+        if self._indexed is None or self._indexed[0] != fingerprint:
+            self._indexed = (fingerprint, updated_at_indexes(self.writer))
+        tables = [t for t in SOURCE_TABLES if self.catalog is None or t in self.catalog.tables]
+        return read_watermarks(self.writer, tables, self._indexed[1])
+
+    def refresh(self, force: bool = False) -> bool:
+        """Refresh the views if the source tables changed (or ``force``); True if refreshed."""
+        now = time.monotonic()
+        watermarks = self.watermarks()
+        started = time.perf_counter()
+        with self.writer.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (REFRESH_LOCK_KEY,))
+                if not cursor.fetchone()['locked']:
+                    # Another worker is refreshing right now; check again after the interval
+                    self._checked_at = now
+                    return False
+                cursor.execute(
+                    f"SELECT watermarks, EXTRACT(EPOCH FROM now() - refreshed_at) AS age "
+                    f"FROM {STATE_TABLE} WHERE id = 1"
+                )
+                state = cursor.fetchone()
+                if (not force and state is not None and json.loads(state['watermarks']) == watermarks
+                        and float(state['age']) < self.max_age):
+                    # Up to date, possibly refreshed by another worker
+                    self.skipped += 1
+                    self._refreshed_at = now - float(state['age'])
+                    self._checked_at = now
+                    return False
+                for name in VIEWS:
+                    cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}")
+                cursor.execute(
+                    f"""
+                    INSERT INTO {STATE_TABLE} (id, watermarks, refreshed_at) VALUES (1, %s, now())
+                    ON CONFLICT (id) DO UPDATE
+                    SET watermarks = EXCLUDED.watermarks, refreshed_at = EXCLUDED.refreshed_at
+                    """,
+                    (json.dumps(watermarks, sort_keys=True),)
+                )
+        self._refreshed_at = self._checked_at = now
+        self.refreshes += 1
+        logger.info(f"Project rollups refreshed in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+
+    def _maybe_refresh(self):
+        """Start a background refresh check if the last one is stale."""
+        if time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        if not self._checking.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh, name='rollup-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Project rollup refresh failed: {e}")
+        finally:
+            self._checking.release()
+
+    def after_fork(self):
+        """Reset refresh state in a forked worker (a refresh thread doesn't survive fork)."""
+        self._checking = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        """Whether readers may use the views (and kick a refresh when one is due)."""
+        if not self.available:
+            return False
+        self._maybe_refresh()
+        return time.monotonic() - self._checked_at <= self.max_age
+
+    # ---- reads (None means: aggregate live) ----
+
+    def _read(self, query: str, params=None, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        if not self.is_fresh():
+            self.fallbacks += 1
+            return None
+        try:
+            rows = self.db.execute_query(query, params, timeout=timeout)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logger.error(f"Project rollup read failed: {e}")
+            self.fallbacks += 1
+            return None
+        self.reads += 1
+        return rows
+
+    def phase_progress(self, project_id, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Per-phase done/total subphase counts for one project."""
+        return self._read(
+            """
+            SELECT phase_name, phase_order, phase_status, done, total
+            FROM chatbot_phase_rollup
+            WHERE project_id = %s
+            ORDER BY phase_order;
+            """,
+            (project_id,),
+            timeout
+        )
+
+    def invoice_totals(self, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Invoice count and total per project, largest first."""
+        return self._read(
+            """
+            SELECT project, invoice_count, total_invoiced
+            FROM chatbot_invoice_rollup
+            ORDER BY total_invoiced DESC;
+            """,
+            timeout=timeout
+        )
+
+    def dashboard(self) -> Optional[Dict]:
+        """The dashboard totals row."""
+        rows = self._read(
+            """
+            SELECT total_projects, active_projects, completed_projects, avg_completion,
+                   total_phases, total_tasks, completed_tasks
+            FROM chatbot_dashboard_rollup;
+            """
+        )
+        return rows[0] if rows else None
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            'available': self.available,
+            'age_seconds': round(now - self._refreshed_at, 1) if self.available and self._refreshed_at else None,
+            'checked_seconds_ago': round(now - self._checked_at, 1) if self.available else None,
+            'refreshes': self.refreshes,
+            'skipped': self.skipped,
+            'reads': self.reads,
+            'fallbacks': self.fallbacks,
+        }
@@ -0,0 +1,170 @@
+"""
+Cached, versioned schema catalog.
+
+The catalog keeps the introspected schema (tables, columns, foreign keys and
+the formatted AI prompt) in memory and on disk, keyed by a cheap fingerprint
+over the system catalogs. information_schema is only scanned again when the
+fingerprint changes, i.e. after real DDL.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from .schema_extractor import SchemaExtractor
+
+logger = logging.getLogger(__name__)
+
+# Hash over pg_class/pg_attribute/pg_attrdef/pg_constraint for the public schema.
+# Changes whenever a table, column, type, nullability, default or FK changes.
+FINGERPRINT_QUERY = """
+SELECT md5(
+    COALESCE((
+        SELECT string_agg(
+            c.relname || '.' || a.attname || ':' || format_type(a.atttypid, a.atttypmod)
+            || ':' || a.attnotnull::text || ':' || COALESCE(pg_get_expr(d.adbin, d.adrelid), ''),
+            ',' ORDER BY c.relname, a.attnum
+        )
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.oid
+        LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+        WHERE n.nspname = 'public'
+          AND c.relkind IN ('r', 'p', 'v', 'f')
+          AND a.attnum > 0
+          AND NOT a.attisdropped
+    ), '')
+    || '|' ||
+    COALESCE((
+        SELECT string_agg(con.conname || ':' || pg_get_constraintdef(con.oid), ',' ORDER BY con.conname)
+        FROM pg_constraint con
+        JOIN pg_namespace n ON n.oid = con.connamespace
+        WHERE n.nspname = 'public'
+          AND con.contype = 'f'
+    ), '')
+) AS fingerprint;
+"""
+
+class SchemaCatalog:
+    def __init__(self,
+                 schema_extractor: SchemaExtractor,
+                 cache_path: Optional[str] = None,
+                 check_interval: float = 60):
+        """Initialize the catalog.
+
+        ``check_interval`` is how often (seconds) the fingerprint is re-read
+        on access; ``cache_path`` is where the snapshot is persisted.
+        """
+        self.extractor = schema_extractor
+        self.db = schema_extractor.db
+        self.cache_path = cache_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    def get_fingerprint(self) -> Optional[str]:
+        """Return the current schema fingerprint from the system catalogs."""
+        try:
+            return self.db.execute_query(FINGERPRINT_QUERY)[0]['fingerprint']
+        except Exception as e:
+            logger.error(f"Failed to read schema fingerprint: {e}")
+            return None
+
+    def snapshot(self) -> Dict:
+        """Return the current snapshot, rebuilding only if the schema changed."""
+        if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot
+            self.refresh()
+            return self._snapshot
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-check the fingerprint and rebuild if needed. Returns True if rebuilt."""
+        fingerprint = self.get_fingerprint()
+        self._checked_at = time.monotonic()
+
+        if self._snapshot is None and not force:
+            self._snapshot = self._load_from_disk()
+
+        if (not force and self._snapshot is not None
+                and (fingerprint is None or self._snapshot['fingerprint'] == fingerprint)):
+            return False
+
+        try:
+            snapshot = self._build(fingerprint)
+        except Exception as e:
+            if self._snapshot is None:
+                raise
+            # Keep serving the previous snapshot; retried after check_interval
+            logger.error(f"Schema catalog rebuild failed, keeping the previous snapshot: {e}")
+            return False
+        self._snapshot = snapshot
+        self._save_to_disk(snapshot)
+        return True
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self.snapshot()['fingerprint']
+
+    @property
+    def tables(self) -> Dict[str, List[Dict]]:
+        return self.snapshot()['tables']
+
+    @property
+    def relationships(self) -> List[Dict]:
+        return self.snapshot()['relationships']
+
+    @property
+    def prompt(self) -> str:
+        return self.snapshot()['prompt']
+
+    def _build(self, fingerprint: Optional[str]) -> Dict:
+        """Introspect information_schema and build a fresh snapshot.
+
+        Raises instead of building (and caching) a partial or empty catalog
+        when introspection fails.
+        """
+        tables = self.db.get_schema_summary(raise_errors=True)
+        if not tables:
+            raise RuntimeError("Schema introspection found no tables in the public schema")
+        relationships = self.extractor._get_relationships(raise_errors=True)
+        logger.info(f"Schema catalog rebuilt ({len(tables)} tables, fingerprint {fingerprint})")
+        return {
+            'fingerprint': fingerprint,
+            'built_at': time.time(),
+            'tables': tables,
+            'relationships': relationships,
+            'prompt': self.extractor.format_schema_prompt(tables, relationships)
+        }
+
+    def _load_from_disk(self) -> Optional[Dict]:
+        """Load a previously persisted snapshot, if any."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path) as f:
+                snapshot = json.load(f)
+            logger.info(f"Schema catalog loaded from {self.cache_path}")
+            return snapshot
+        except Exception as e:
+            logger.error(f"Failed to load schema catalog: {e}")
+            return None
+
+    def _save_to_disk(self, snapshot: Dict):
+        """Persist the snapshot atomically so other workers can reuse it."""
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Failed to save schema catalog: {e}")
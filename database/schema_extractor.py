@@ -8,9 +8,15 @@ from .db_connector import DatabaseConnector
 logger = logging.getLogger(__name__)
 
 class SchemaExtractor:
-    def __init__(self, db_config):
-        """Initialize schema extractor."""
-        self.db = DatabaseConnector(db_config)
+    def __init__(self, db_config=None, db: DatabaseConnector = None):
+        """Initialize schema extractor.
+        
+        Pass an existing ``db`` to share its connection pool; a new
+        DatabaseConnector is only opened when just ``db_config`` is given.
+        """
+        if db is None and db_config is None:
+            raise ValueError("Either db_config or db is required")
+        self.db = db if db is not None else DatabaseConnector(db_config)
     
     def get_full_schema(self):
         """Get complete database schema information."""
@@ -28,8 +34,13 @@ class SchemaExtractor:
     
     def get_formatted_schema_prompt(self):
         """Get schema formatted for AI prompts."""
-        schema = self.db.get_schema_summary()
-        
+        return self.format_schema_prompt(
+            self.db.get_schema_summary(),
+            self._get_relationships()
+        )
+    
+    def format_schema_prompt(self, schema, relationships=None):
+        """Format a table -> columns mapping (plus FKs) for AI prompts."""
         prompt_sections = []
         prompt_sections.append("**Available Database Tables:**\n")
         
@@ -47,16 +58,16 @@ class SchemaExtractor:
                 prompt_sections.append(col_info)
         
         # Add relationships if available
-        relationships = self._get_relationships_summary()
-        if relationships:
+        summary = self._get_relationships_summary(relationships)
+        if summary:
             prompt_sections.append("\n**Key Relationships:**")
-            for rel in relationships:
+            for rel in summary:
                 prompt_sections.append(f"- {rel}")
         
         return "\n".join(prompt_sections)
     
-    def _get_relationships(self):
-        """Get foreign key relationships."""
+    def _get_relationships(self, raise_errors=False):
+        """Get foreign key relationships (``[]`` on error unless ``raise_errors``)."""
         query = """
         SELECT
             tc.table_name,
@@ -80,11 +91,14 @@ class SchemaExtractor:
             return self.db.execute_query(query)
         except Exception as e:
             logger.error(f"Failed to get relationships: {e}")
+            if raise_errors:
+                raise
             return []
     
-    def _get_relationships_summary(self):
+    def _get_relationships_summary(self, relationships=None):
         """Get simplified relationships for AI prompt."""
-        relationships = self._get_relationships()
+        if relationships is None:
+            relationships = self._get_relationships()
         summary = []
         
         for rel in relationships:
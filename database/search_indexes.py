@@ -0,0 +1,173 @@
+"""
+Search index management for the chatbot's name lookups.
+
+The chatbot matches names with ``ILIKE '%term%'``, which a B-tree index
+can't serve. A ``pg_trgm`` GIN index on the column can (and also serves
+similarity searches); a ``to_tsvector`` GIN index serves word searches on
+longer names. This module reports which searched columns lack those
+indexes (from SchemaExtractor._get_indexes) and, on request, creates them.
+
+    python -m database.search_indexes            # report only
+    python -m database.search_indexes --create   # CREATE INDEX CONCURRENTLY
+    python -m database.search_indexes --create --fts
+
+Creating is opt-in: it needs CREATE privileges (and CREATE EXTENSION for
+pg_trgm) and builds indexes concurrently, so writes aren't blocked.
+"""
+import re
+import sys
+import argparse
+import logging
+from typing import Dict, List
+import psycopg
+from .db_connector import DatabaseConnector, build_conn_string
+from .schema_extractor import SchemaExtractor
+
+logger = logging.getLogger(__name__)
+
+TRGM = 'trgm'
+FTS = 'fts'
+
+# Columns the chatbot searches, and what searches them
+SEARCH_COLUMNS = [
+    {
+        'table': 'projects', 'column': 'name', 'kinds': (TRGM,),
+        'used_by': [
+            "ChatHandler.search_across_database (p.name ILIKE / similarity)",
+            "DatabaseConnector.search_projects (p.name ILIKE '%term%')",
+            "Generated SQL project filters (p.name ILIKE '%...%')",
+        ],
+    },
+    {
+        'table': 'phases', 'column': 'name', 'kinds': (TRGM,),
+        'used_by': ["ChatHandler.search_across_database (ph.name ILIKE / similarity)"],
+    },
+    {
+        'table': 'subphases', 'column': 'name', 'kinds': (TRGM, FTS),
+        'used_by': [
+            "ChatHandler.search_across_database (sp.name ILIKE / similarity)",
+            "Generated SQL task/subphase filters (sp.name ILIKE '%...%')",
+        ],
+    },
+]
+
+def index_name(table: str, column: str, kind: str) -> str:
+    return f"idx_{table}_{column}_{kind}".lower()
+
+def index_sql(table: str, column: str, kind: str) -> str:
+    name = index_name(table, column, kind)
+    if kind == TRGM:
+        expression = f'"{column}" gin_trgm_ops'
+    else:
+        expression = f"to_tsvector('simple', COALESCE(\"{column}\", ''))"
+    return f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" USING gin ({expression})'
+
+def covers(indexdef: str, column: str, kind: str) -> bool:
+    """Whether an index definition serves ``kind`` searches on ``column``."""
+    definition = indexdef.lower()
+    if 'using gin' not in definition and 'using gist' not in definition:
+        return False
+    quoted = rf'(?:"{re.escape(column.lower())}"|\b{re.escape(column.lower())}\b)'
+    if kind == TRGM:
+        return bool(re.search(quoted + r'\s+gi(?:n|st)_trgm_ops', definition))
+    return 'to_tsvector' in definition and bool(re.search(quoted, definition))
+
+class SearchIndexManager:
+    def __init__(self, db: DatabaseConnector, schema_extractor: SchemaExtractor = None):
+        self.db = db
+        self.schema_extractor = schema_extractor or SchemaExtractor(db=db)
+
+    def has_trgm_extension(self) -> bool:
+        try:
+            rows = self.db.execute_query("SELECT 1 AS installed FROM pg_extension WHERE extname = 'pg_trgm'")
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Failed to check for pg_trgm: {e}")
+            return False
+
+    def status(self) -> List[Dict]:
+        """Each searched column with the index kinds it has and lacks."""
+        indexes = self.schema_extractor._get_indexes()
+        report = []
+        for spec in SEARCH_COLUMNS:
+            defs = [ix for ix in indexes if ix['tablename'] == spec['table']]
+            present = {}
+            for kind in (TRGM, FTS):
+                match = next((ix['indexname'] for ix in defs if covers(ix['indexdef'], spec['column'], kind)), None)
+                if match:
+                    present[kind] = match
+            report.append({
+                'table': spec['table'],
+                'column': spec['column'],
+                'indexes': present,
+                'missing': [kind for kind in spec['kinds'] if kind not in present],
+                'used_by': spec['used_by'],
+            })
+        return report
+
+    def usable(self) -> Dict[str, List[str]]:
+        """Index kinds queries can rely on, per table (trgm only with the extension installed)."""
+        has_extension = self.has_trgm_extension()
+        return {
+            entry['table']: [kind for kind in entry['indexes'] if kind != TRGM or has_extension]
+            for entry in self.status()
+        }
+
+    def create(self, kinds=(TRGM,)) -> List[str]:
+        """Create the missing indexes of the given kinds; returns the statements run."""
+        missing = [
+            (entry['table'], entry['column'], kind)
+            for entry in self.status()
+            for kind in entry['missing'] if kind in kinds
+        ]
+        if not missing:
+            return []
+
+        executed = []
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+        with psycopg.connect(build_conn_string(self.db.config), autocommit=True) as conn:
+            if TRGM in kinds and not self.has_trgm_extension():
+                conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                executed.append("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for table, column, kind in missing:
+                sql = index_sql(table, column, kind)
+                logger.info(f"Creating search index: {sql}")
+                conn.execute(sql)
+                executed.append(sql)
+        return executed
+
+def format_report(report: List[Dict], has_extension: bool) -> str:
+    lines = [f"pg_trgm extension: {'installed' if has_extension else 'not installed'}", ""]
+    for entry in report:
+        have = ', '.join(f"{kind} ({name})" for kind, name in entry['indexes'].items()) or 'none'
+        lines.append(f"{entry['table']}.{entry['column']}: search indexes: {have}")
+        if entry['missing']:
+            lines.append(f"  missing: {', '.join(entry['missing'])}; these queries would benefit:")
+            lines.extend(f"    - {use}" for use in entry['used_by'])
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Report or create the chatbot's search indexes.")
+    parser.add_argument('--create', action='store_true', help='create missing indexes (CONCURRENTLY)')
+    parser.add_argument('--fts', action='store_true', help='also create to_tsvector indexes')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    with DatabaseConnector(dict(Config.DB_CONFIG, pool_enabled=False)) as db:
+        manager = SearchIndexManager(db)
+        if args.create:
+            kinds = (TRGM, FTS) if args.fts else (TRGM,)
+            try:
+                executed = manager.create(kinds)
+            except Exception as e:
+                logger.error(f"Creating search indexes failed: {e}")
+                return 1
+            print(f"Created {len(executed)} object(s)" if executed else "All search indexes already exist")
+            print()
+        print(format_report(manager.status(), manager.has_trgm_extension()))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
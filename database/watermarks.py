@@ -0,0 +1,55 @@
+"""
+Table change watermarks.
+
+A table's watermark is a string that changes whenever the table is written
+to: its ``updatedAt`` high-water mark plus its delete count from
+pg_stat_user_tables (MAX(updatedAt) never moves on a DELETE). MAX(updatedAt)
+is only read where an index leads with that column; other tables fall back
+to their insert/update/delete counters, which the statistics collector may
+report a few seconds late. The counters don't advance on a standby, so
+watermarks must be read from the primary.
+"""
+from typing import Dict, List
+
+UPDATED_AT_COLUMNS = ('updatedAt', 'updated_at')
+
+# Tables with an index leading on their updatedAt column (MAX() is an index probe there)
+UPDATED_AT_INDEX_QUERY = """
+SELECT DISTINCT c.relname AS table_name, a.attname AS column_name
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = i.indkey[0]
+WHERE n.nspname = 'public'
+  AND a.attname IN ('updatedAt', 'updated_at')
+"""
+
+# Write counters per table; cheap to read, but flushed by each backend with some delay
+TABLE_WRITES_QUERY = """
+SELECT relname AS table_name, n_tup_ins, n_tup_upd, n_tup_del
+FROM pg_stat_user_tables
+WHERE schemaname = 'public' AND relname = ANY(%s)
+"""
+
+def updated_at_indexes(db) -> Dict[str, str]:
+    """Table -> updatedAt column usable for MAX() without a scan."""
+    return {row['table_name']: row['column_name'] for row in db.execute_query(UPDATED_AT_INDEX_QUERY)}
+
+def read_watermarks(db, tables: List[str], indexed: Dict[str, str]) -> Dict[str, str]:
+    """Current watermark of each of ``tables`` (``indexed`` from updated_at_indexes)."""
+    watermarks = {}
+    writes = {
+        row['table_name']: row
+        for row in db.execute_query(TABLE_WRITES_QUERY, (list(tables),))
+    }
+    selects = [f'(SELECT MAX("{indexed[t]}") FROM "{t}") AS "{t}"' for t in tables if t in indexed]
+    latest = db.execute_query("SELECT " + ", ".join(selects))[0] if selects else {}
+    for table in tables:
+        counts = writes.get(table)
+        if table in latest:
+            # Deletes don't move MAX(updatedAt)
+            deleted = counts['n_tup_del'] if counts else None
+            watermarks[table] = f"{latest[table]}|{deleted}"
+        elif counts:
+            watermarks[table] = f"{counts['n_tup_ins']}/{counts['n_tup_upd']}/{counts['n_tup_del']}"
+    return watermarks
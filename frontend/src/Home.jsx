@@ -395,7 +395,7 @@ const Home = () => {
         setIsLoading(true);
 
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -406,20 +406,53 @@ const Home = () => {
                 })
             });
 
-            if (!response.ok) {
+            if (!response.ok || !response.body) {
                 throw new Error('Server error');
             }
 
-            const data = await response.json();
-            
-            const botMessage = {
+            // Bot message that fills in as server-sent events arrive
+            let botMessage = {
                 type: 'bot',
-                content: data.message,
+                content: '',
                 timestamp: new Date().toISOString(),
-                metadata: {
-                    success: data.success
-                }
+                streaming: true,
+                progress: ''
             };
+            setMessages([...updatedMessages, botMessage]);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                const blocks = buffer.split('\n\n');
+                buffer = blocks.pop();
+
+                for (const block of blocks) {
+                    const { event, data } = parseSseBlock(block);
+                    if (event === 'progress') {
+                        botMessage = { ...botMessage, progress: data.message };
+                    } else if (event === 'token') {
+                        botMessage = { ...botMessage, content: botMessage.content + data.text, progress: '' };
+                    } else if (event === 'done') {
+                        botMessage = {
+                            type: 'bot',
+                            content: data.message,
+                            timestamp: new Date().toISOString(),
+                            metadata: {
+                                success: data.success
+                            }
+                        };
+                    } else if (event === 'error') {
+                        throw new Error(data.message);
+                    }
+                    setMessages([...updatedMessages, botMessage]);
+                }
+            }
 
             const finalMessages = [...updatedMessages, botMessage];
             setMessages(finalMessages);
@@ -441,6 +474,19 @@ const Home = () => {
         }
     };
 
+    const parseSseBlock = (block) => {
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach((line) => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data += line.slice(5).trim();
+            }
+        });
+        return { event, data: data ? JSON.parse(data) : {} };
+    };
+
     const handleKeyPress = (e) => {
         if (e.key === 'Enter' && !e.shiftKey) {
             e.preventDefault();
@@ -536,6 +582,9 @@ const Home = () => {
                                     </div>
                                 )}
                                 <div className="message-content">
+                                    {message.progress && (
+                                        <div className="stream-progress">{message.progress}…</div>
+                                    )}
                                     {message.type === 'user' ? (
                                         <div className="message-text">{message.content}</div>
                                     ) : (
@@ -564,7 +613,7 @@ const Home = () => {
                         </div>
                     ))}
                     
-                    {isLoading && (
+                    {isLoading && !messages[messages.length - 1]?.streaming && (
                         <div className="message-wrapper">
                             <div className="message bot-message">
                                 <div className="bot-avatar">
@@ -0,0 +1,85 @@
+"""
+Gunicorn settings for production: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+The app is preloaded, so the schema catalog, project-name index and intent
+router are built once in the master and shared copy-on-write by the
+workers. The master's database pools are closed before it forks and each
+worker opens its own (services.after_fork); workers close theirs on exit.
+If the database isn't reachable when the master starts, workers boot
+anyway and each starts the services in the background (/api/health
+answers 503 until they are ready).
+
+Requests mostly wait on Gemini and Postgres, so each worker runs threads
+(gthread) and a few workers are enough: the default is one per CPU, at
+most 4. Override with WEB_CONCURRENCY (workers) and GUNICORN_THREADS; keep
+DB_POOL_MAX_SIZE at or above the thread count. Every worker opens its own
+pool, so workers x DB_POOL_MAX_SIZE connections must fit the primary's
+max_connections (checked at startup).
+"""
+import os
+from config import Config
+
+def _cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(_cpus(), 4)))
+threads = int(os.environ.get('GUNICORN_THREADS', min(Config.DB_CONFIG['pool_max_size'], 8)))
+preload_app = True
+
+# A request gives up at RESPONSE_TIMEOUT; only kill workers stuck well past it
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', max(Config.RESPONSE_TIMEOUT, 30) * 2))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth (0 disables)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+def _check_connection_budget(server, services):
+    """Warn when the workers' pools together can exceed the primary's connection limit."""
+    per_worker = Config.DB_CONFIG['pool_max_size'] if Config.DB_CONFIG.get('pool_enabled') else 1
+    needed = workers * per_worker
+    server.log.info(f"Up to {needed} database connections per server ({workers} workers x {per_worker})")
+    if not services.is_ready():
+        return
+    try:
+        available = services.primary_db.execute_query(
+            "SELECT current_setting('max_connections')::int"
+            " - current_setting('superuser_reserved_connections')::int AS available"
+        )[0]['available']
+    except Exception as e:
+        server.log.warning(f"Couldn't read max_connections: {e}")
+        return
+    if needed > available:
+        server.log.warning(
+            f"{workers} workers x DB_POOL_MAX_SIZE={per_worker} = {needed} connections exceeds the "
+            f"{available} the database allows; lower WEB_CONCURRENCY or DB_POOL_MAX_SIZE"
+        )
+
+def when_ready(server):
+    # Runs in the master after preloading, before the first fork
+    import services
+    try:
+        services.init()
+    except Exception as e:
+        server.log.warning(f"Services not started before forking, workers will retry: {e}")
+    _check_connection_budget(server, services)
+    services.close_connections()
+    server.log.info(f"App preloaded; starting {workers} workers x {threads} threads")
+
+def post_fork(server, worker):
+    import services
+    services.after_fork()
+
+def worker_exit(server, worker):
+    import services
+    services.close_connections()
@@ -5,8 +5,14 @@ from config import Config
 import logging
 import os
 
-def create_app(config_class=Config):
-    """Create Flask application instance."""
+def create_app(config_class=Config, warm_services=True):
+    """Create Flask application instance.
+    
+    Returns straight away: the database connection and cache warm-up run
+    on a background thread (``warm_services``) and requests wait for them
+    briefly, then get a 503. A preloading server starts them itself
+    instead (see gunicorn.conf.py).
+    """
     app = Flask(__name__)
     
     # Load configuration
@@ -19,7 +25,8 @@ def create_app(config_class=Config):
          methods=['GET', 'POST', 'OPTIONS']
     )
     
-    # Configure logging
+    # Configure logging (the log directory must exist first)
+    os.makedirs('logs', exist_ok=True)
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s %(levelname)s: %(message)s',
@@ -29,13 +36,14 @@ def create_app(config_class=Config):
         ]
     )
     
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
     # Register blueprints
     from routes import api_bp
     app.register_blueprint(api_bp)
     
+    if warm_services:
+        import services
+        services.start()
+    
     # Add a simple test route
     @app.route('/test')
     def test():
@@ -51,4 +59,91 @@ def create_app(config_class=Config):
             else:
                 return send_from_directory('frontend/build', 'index.html')
     
-    return app
\ No newline at end of file
+    return app
+
+def create_asgi_app(config_class=Config):
+    """Create the ASGI (Quart) application instance.
+    
+    Serves the same /api routes as create_app, but awaits Gemini and the
+    database instead of holding a worker thread per request. Run it with
+    ``uvicorn asgi:app``. The services start in the background once the
+    server is up, and the async pool is opened when they are ready.
+    """
+    import asyncio
+    import services
+    from quart import Quart, send_from_directory as quart_send_from_directory
+    from quart_cors import cors
+    
+    app = Quart(__name__)
+    app.config.from_object(config_class)
+    
+    app = cors(app,
+               allow_origin=['http://localhost:3000', 'http://127.0.0.1:3000'],
+               allow_headers=['Content-Type', 'Authorization'],
+               allow_methods=['GET', 'POST', 'OPTIONS']
+    )
+    
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler('logs/app.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    from routes_async import api_bp
+    app.register_blueprint(api_bp)
+    
+    async def open_async_pool():
+        # Until the pool is open, chat_handler falls back to the sync pool
+        while not services.is_ready():
+            await asyncio.sleep(0.5)
+        from database import AsyncDatabaseConnector, AsyncReplicaRouter, ReplicaRouter
+        db, query_guard = services.db, services.query_guard
+        async_db = AsyncDatabaseConnector(config_class.DB_CONFIG, query_guard=query_guard)
+        if isinstance(db, ReplicaRouter):
+            # Same replicas (and shared lag state) as the sync router
+            async_db = AsyncReplicaRouter(db, async_db, {
+                name: AsyncDatabaseConnector(replica.config, query_guard=query_guard)
+                for name, replica in db.replicas.items()
+            })
+        try:
+            await async_db.open()
+        except Exception as e:
+            app.logger.error(f"Async pool unavailable, serving from the sync pool: {e}")
+            return
+        services.chat_handler.async_db = async_db
+    
+    # The async pool must be opened inside the server's event loop
+    startup = {}
+    
+    @app.before_serving
+    async def start_services():
+        services.start()
+        startup['task'] = asyncio.ensure_future(open_async_pool())
+    
+    @app.after_serving
+    async def close_async_pool():
+        task = startup.pop('task', None)
+        if task is not None and not task.done():
+            task.cancel()
+        if services.chat_handler is not None and services.chat_handler.async_db is not None:
+            await services.chat_handler.async_db.close()
+            services.chat_handler.async_db = None
+    
+    @app.route('/test')
+    async def test():
+        return {'message': 'Server is running!'}
+    
+    if not app.debug:
+        @app.route('/', defaults={'path': ''})
+        @app.route('/<path:path>')
+        async def serve_react(path):
+            if path != "" and os.path.exists(os.path.join('frontend/build', path)):
+                return await quart_send_from_directory('frontend/build', path)
+            else:
+                return await quart_send_from_directory('frontend/build', 'index.html')
+    
+    return app
@@ -1,26 +1,38 @@
 """
 API routes for the chatbot application.
 """
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+import json
 import logging
-from chatbot.chat_handler import ChatHandler
+import telemetry
+import services
 from config import Config
 
 logger = logging.getLogger(__name__)
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# Initialize chat handler
-chat_handler = ChatHandler(
-    api_key=Config.GEMINI_API_KEY,
-    db_config=Config.DB_CONFIG
-)
+def _starting():
+    """A 503 response while the services are still starting, else None.
 
-# In-memory conversation store (use Redis for production)
-conversations = {}
+    Waits up to STARTUP_REQUEST_WAIT seconds first, so requests sent just
+    after boot are served once the caches are warm instead of failing.
+    """
+    if services.is_ready():
+        return None
+    services.start()
+    if services.wait_ready(Config.STARTUP_REQUEST_WAIT):
+        return None
+    return jsonify({
+        'error': 'Service is starting',
+        'startup': services.status()
+    }), 503, {'Retry-After': '5'}
 
 @api_bp.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages"""
+    starting = _starting()
+    if starting:
+        return starting
     try:
         data = request.get_json()
         
@@ -31,22 +43,25 @@ def chat():
         chat_id = data.get('chat_id', 'default')
         
         # Get conversation history
-        conversation = conversations.get(chat_id, [])
+        conversation = services.conversation_store.get(chat_id)
         
         # Process message
-        response = chat_handler.process_query(message, conversation)
+        response = services.chat_handler.process_query(message, conversation)
         
-        # Update conversation history
-        conversation.append({'role': 'user', 'content': message})
-        conversation.append({'role': 'assistant', 'content': response['message']})
-        
-        # Keep only last N messages
-        conversations[chat_id] = conversation[-Config.MAX_CONVERSATION_LENGTH:]
+        # Update conversation history (the store keeps only the last N messages)
+        services.conversation_store.append(
+            chat_id,
+            {'role': 'user', 'content': message},
+            {'role': 'assistant', 'content': response['message']}
+        )
         
         return jsonify({
             'message': response['message'],
             'success': response['success'],
-            'chat_id': chat_id
+            'chat_id': chat_id,
+            'cached': response.get('cached', False),
+            'timed_out': response.get('timed_out', False),
+            'timings': response.get('timings')
         })
         
     except Exception as e:
@@ -56,36 +71,143 @@ def chat():
             'message': str(e)
         }), 500
 
+def _sse(event, data):
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@api_bp.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat messages, streaming progress and answer text as SSE"""
+    starting = _starting()
+    if starting:
+        return starting
+    data = request.get_json()
+    
+    if not data or 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    message = data.get('message')
+    chat_id = data.get('chat_id', 'default')
+    conversation = services.conversation_store.get(chat_id)
+    
+    def generate():
+        try:
+            for event in services.chat_handler.process_query_stream(message, conversation):
+                if event['event'] != 'done':
+                    yield _sse(event['event'], event['data'])
+                    continue
+                
+                response = event['data']
+                services.conversation_store.append(
+                    chat_id,
+                    {'role': 'user', 'content': message},
+                    {'role': 'assistant', 'content': response['message']}
+                )
+                yield _sse('done', {
+                    'message': response['message'],
+                    'success': response['success'],
+                    'chat_id': chat_id,
+                    'cached': response.get('cached', False),
+                    'timed_out': response.get('timed_out', False),
+                    'timings': response.get('timings')
+                })
+        except Exception as e:
+            logger.error(f"Error in chat stream: {e}")
+            yield _sse('error', {
+                'error': 'Internal server error',
+                'message': str(e)
+            })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """Simple health check"""
+    """Readiness: 200 once the services have started and the database answers"""
+    if not services.is_ready():
+        services.start()
+        return jsonify({
+            'status': 'starting',
+            'live': True,
+            'ready': False,
+            'startup': services.status()
+        }), 503
     try:
-        # Test database connection
-        chat_handler.db.execute_query("SELECT 1")
+        # Test the primary; replicas report their last lag check
+        services.primary_db.execute_query("SELECT 1")
         
         return jsonify({
             'status': 'healthy',
+            'live': True,
+            'ready': True,
             'database': 'connected',
-            'api': 'operational'
+            'api': 'operational',
+            'startup': services.status(),
+            'pool': services.db.get_pool_stats(),
+            'replicas': services.db.replica_status() if services.db is not services.primary_db else None
         })
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return jsonify({
             'status': 'unhealthy',
+            'live': True,
+            'ready': False,
             'database': 'disconnected',
             'error': str(e)
         }), 500
 
+@api_bp.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: the process is serving requests (no database access)"""
+    return jsonify({'live': True, 'ready': services.is_ready()})
+
+@api_bp.route('/stats', methods=['GET'])
+def get_stats():
+    """Connection pool and answer cache statistics"""
+    starting = _starting()
+    if starting:
+        return starting
+    try:
+        return jsonify({
+            'pool': services.db.get_pool_stats(),
+            'replicas': services.db.replica_status() if services.db is not services.primary_db else None,
+            'cache': services.response_cache.stats() if services.response_cache else None,
+            'sql_cache': services.sql_cache.stats() if services.sql_cache else None,
+            'query_guard': services.query_guard.stats() if services.query_guard else None,
+            'project_index': services.project_index.stats(),
+            'intent_router': services.intent_router.stats(),
+            'rollups': services.rollups.stats() if services.rollups else None,
+            'search': services.search_engine.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting stats: {e}")
+        return jsonify({
+            'error': 'Failed to get stats',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Latency histograms, token counts, cache and pool metrics (Prometheus text format)"""
+    return Response(telemetry.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @api_bp.route('/tables', methods=['GET'])
 def get_tables():
     """Get available database tables and schema"""
+    starting = _starting()
+    if starting:
+        return starting
     try:
-        schema = chat_handler.db.get_schema_summary()
+        schema = services.schema_catalog.tables
         
         return jsonify({
             'tables': list(schema.keys()),
             'schema': schema,
-            'count': len(schema)
+            'count': len(schema),
+            'fingerprint': services.schema_catalog.fingerprint
         })
     except Exception as e:
         logger.error(f"Error getting tables: {e}")
@@ -97,9 +219,11 @@ def get_tables():
 @api_bp.route('/clear-chat/<chat_id>', methods=['POST'])
 def clear_chat(chat_id):
     """Clear conversation history for a specific chat"""
+    starting = _starting()
+    if starting:
+        return starting
     try:
-        if chat_id in conversations:
-            del conversations[chat_id]
+        services.conversation_store.clear(chat_id)
         
         return jsonify({
             'success': True,
@@ -0,0 +1,266 @@
+"""
+ASGI (Quart) API routes for the chatbot application.
+
+Same URLs and payloads as routes.py, but Gemini and database calls are
+awaited, so one worker can hold many slow chat requests open at once.
+"""
+from quart import Blueprint, request, jsonify, current_app, Response
+import asyncio
+import json
+import logging
+import telemetry
+import services
+from config import Config
+
+logger = logging.getLogger(__name__)
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+def _sse(event, data):
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _starting():
+    """A 503 response while the services are still starting, else None.
+
+    Waits up to STARTUP_REQUEST_WAIT seconds first, so requests sent just
+    after boot are served once the caches are warm instead of failing.
+    """
+    if services.is_ready():
+        return None
+    services.start()
+    if await asyncio.to_thread(services.wait_ready, Config.STARTUP_REQUEST_WAIT):
+        return None
+    return jsonify({
+        'error': 'Service is starting',
+        'startup': services.status()
+    }), 503, {'Retry-After': '5'}
+
+def _pool_stats():
+    """Stats for the async pool when it's open, else the sync pool."""
+    if services.chat_handler.async_db is not None:
+        return services.chat_handler.async_db.get_pool_stats()
+    return services.db.get_pool_stats()
+
+@api_bp.route('/chat', methods=['POST'])
+async def chat():
+    """Handle chat messages"""
+    starting = await _starting()
+    if starting:
+        return starting
+    try:
+        data = await request.get_json()
+
+        if not data or 'message' not in data:
+            return jsonify({'error': 'No message provided'}), 400
+
+        message = data.get('message')
+        chat_id = data.get('chat_id', 'default')
+
+        conversation = await asyncio.to_thread(services.conversation_store.get, chat_id)
+
+        response = await services.chat_handler.process_query_async(message, conversation)
+
+        await asyncio.to_thread(
+            services.conversation_store.append,
+            chat_id,
+            {'role': 'user', 'content': message},
+            {'role': 'assistant', 'content': response['message']}
+        )
+
+        return jsonify({
+            'message': response['message'],
+            'success': response['success'],
+            'chat_id': chat_id,
+            'cached': response.get('cached', False),
+            'timed_out': response.get('timed_out', False),
+            'timings': response.get('timings')
+        })
+
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Handle chat messages, streaming progress and answer text as SSE"""
+    starting = await _starting()
+    if starting:
+        return starting
+    data = await request.get_json()
+
+    if not data or 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+
+    message = data.get('message')
+    chat_id = data.get('chat_id', 'default')
+    conversation = await asyncio.to_thread(services.conversation_store.get, chat_id)
+
+    async def generate():
+        try:
+            async for event in services.chat_handler.process_query_stream_async(message, conversation):
+                if event['event'] != 'done':
+                    yield _sse(event['event'], event['data'])
+                    continue
+
+                response = event['data']
+                await asyncio.to_thread(
+                    services.conversation_store.append,
+                    chat_id,
+                    {'role': 'user', 'content': message},
+                    {'role': 'assistant', 'content': response['message']}
+                )
+                yield _sse('done', {
+                    'message': response['message'],
+                    'success': response['success'],
+                    'chat_id': chat_id,
+                    'cached': response.get('cached', False),
+                    'timed_out': response.get('timed_out', False),
+                    'timings': response.get('timings')
+                })
+        except Exception as e:
+            logger.error(f"Error in chat stream: {e}")
+            yield _sse('error', {
+                'error': 'Internal server error',
+                'message': str(e)
+            })
+
+    response = await current_app.make_response((
+        generate(),
+        200,
+        {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    ))
+    response.timeout = None  # a slow answer must not be cut off
+    return response
+
+@api_bp.route('/health', methods=['GET'])
+async def health_check():
+    """Readiness: 200 once the services have started and the database answers"""
+    if not services.is_ready():
+        services.start()
+        return jsonify({
+            'status': 'starting',
+            'live': True,
+            'ready': False,
+            'startup': services.status()
+        }), 503
+    try:
+        # Test the primary; replicas report their last lag check
+        if services.chat_handler.async_db is not None:
+            primary = getattr(services.chat_handler.async_db, 'primary', services.chat_handler.async_db)
+            await primary.execute_query("SELECT 1")
+        else:
+            await asyncio.to_thread(services.primary_db.execute_query, "SELECT 1")
+
+        return jsonify({
+            'status': 'healthy',
+            'live': True,
+            'ready': True,
+            'database': 'connected',
+            'api': 'operational',
+            'startup': services.status(),
+            'pool': _pool_stats(),
+            'replicas': services.db.replica_status() if services.db is not services.primary_db else None
+        })
+    except Exception as e:
+        logger.error(f"Health check failed: {e}")
+        return jsonify({
+            'status': 'unhealthy',
+            'live': True,
+            'ready': False,
+            'database': 'disconnected',
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/health/live', methods=['GET'])
+async def liveness_check():
+    """Liveness: the process is serving requests (no database access)"""
+    return jsonify({'live': True, 'ready': services.is_ready()})
+
+@api_bp.route('/stats', methods=['GET'])
+async def get_stats():
+    """Connection pool and answer cache statistics"""
+    starting = await _starting()
+    if starting:
+        return starting
+    try:
+        return jsonify({
+            'pool': _pool_stats(),
+            'replicas': services.db.replica_status() if services.db is not services.primary_db else None,
+            'cache': await asyncio.to_thread(services.response_cache.stats) if services.response_cache else None,
+            'sql_cache': services.sql_cache.stats() if services.sql_cache else None,
+            'query_guard': services.query_guard.stats() if services.query_guard else None,
+            'project_index': services.project_index.stats(),
+            'intent_router': services.intent_router.stats(),
+            'rollups': services.rollups.stats() if services.rollups else None,
+            'search': services.search_engine.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting stats: {e}")
+        return jsonify({
+            'error': 'Failed to get stats',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """Latency histograms, token counts, cache and pool metrics (Prometheus text format)"""
+    body = await asyncio.to_thread(telemetry.REGISTRY.render)
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@api_bp.route('/tables', methods=['GET'])
+async def get_tables():
+    """Get available database tables and schema"""
+    starting = await _starting()
+    if starting:
+        return starting
+    try:
+        schema = await asyncio.to_thread(lambda: services.schema_catalog.tables)
+
+        return jsonify({
+            'tables': list(schema.keys()),
+            'schema': schema,
+            'count': len(schema),
+            'fingerprint': services.schema_catalog.fingerprint
+        })
+    except Exception as e:
+        logger.error(f"Error getting tables: {e}")
+        return jsonify({
+            'error': 'Failed to get tables',
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/clear-chat/<chat_id>', methods=['POST'])
+async def clear_chat(chat_id):
+    """Clear conversation history for a specific chat"""
+    starting = await _starting()
+    if starting:
+        return starting
+    try:
+        await asyncio.to_thread(services.conversation_store.clear, chat_id)
+
+        return jsonify({
+            'success': True,
+            'message': f'Chat {chat_id} cleared successfully'
+        })
+    except Exception as e:
+        logger.error(f"Error clearing chat {chat_id}: {e}")
+        return jsonify({
+            'error': 'Failed to clear chat',
+            'message': str(e)
+        }), 500
+
+# Error handlers
+@api_bp.errorhandler(404)
+async def not_found(error):
+    return jsonify({'error': 'Not found'}), 404
+
+@api_bp.errorhandler(500)
+async def internal_error(error):
+    return jsonify({'error': 'Internal server error'}), 500
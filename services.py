@@ -0,0 +1,354 @@
+"""
+Shared application services.
+
+The database pool, schema catalog, caches, chat handler and conversation
+store are built once per process here and used by both the Flask (WSGI)
+and the ASGI route modules.
+
+Nothing is built at import time: init() connects to the database and warms
+the schema catalog and project-name index, and start() runs it on a
+background thread (retrying until the database is reachable) so the server
+can accept connections straight away. Until then the names below are None;
+routes check is_ready() / wait_ready() first and /api/health reports the
+startup state.
+"""
+import time
+import logging
+import threading
+from typing import Dict, Optional
+import telemetry
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+STARTUP_IDLE = 'idle'
+STARTUP_STARTING = 'starting'
+STARTUP_READY = 'ready'
+STARTUP_FAILED = 'failed'
+
+# Longest pause (seconds) between background startup attempts
+STARTUP_RETRY_MAX_DELAY = 60
+
+query_guard = None
+primary_db = None
+db = None
+schema_extractor = None
+schema_catalog = None
+schema_retriever = None
+response_cache = None
+sql_cache = None
+project_index = None
+rollups = None
+intent_router = None
+search_engine = None
+chat_handler = None
+conversation_store = None
+
+_ready = threading.Event()
+_init_lock = threading.Lock()
+_start_lock = threading.Lock()
+_thread = None
+_state = STARTUP_IDLE
+_error = None
+_attempts = 0
+_startup_seconds = None
+
+def _build() -> Dict:
+    """Construct every service; the database is connected and the caches warmed on return."""
+    from chatbot.chat_handler import ChatHandler
+    from chatbot.schema_retriever import SchemaRetriever
+    from chatbot.result_formatter import ResultFormatter
+    from chatbot.response_cache import ResponseCache, create_cache_backend
+    from chatbot.sql_cache import SqlTemplateCache
+    from chatbot.conversation_store import create_conversation_store
+    from chatbot.project_index import ProjectIndex
+    from chatbot.intent_router import IntentRouter, BUILTIN_INTENTS, load_intent_file
+    from chatbot.search import SearchEngine
+    from database import DatabaseConnector, SchemaExtractor, SchemaCatalog, QueryGuard, ReplicaRouter, ProjectRollups
+
+    # Planner cost gate for LLM-generated SQL
+    query_guard = None
+    if Config.SQL_GUARD_ENABLED:
+        query_guard = QueryGuard(
+            max_cost=Config.SQL_GUARD_MAX_COST,
+            max_rows=Config.SQL_GUARD_MAX_ROWS,
+            default_limit=Config.SQL_GUARD_DEFAULT_LIMIT or None
+        )
+
+    # One data-access object (and connection pool) shared by every consumer.
+    # With replicas configured, reads are routed to them; writes and health
+    # checks use primary_db directly.
+    primary_db = DatabaseConnector(Config.DB_CONFIG, query_guard=query_guard)
+    db = primary_db
+    try:
+        if Config.DB_REPLICAS:
+            db = ReplicaRouter.from_endpoints(
+                primary_db,
+                Config.DB_REPLICAS,
+                max_lag=Config.DB_REPLICA_MAX_LAG,
+                check_interval=Config.DB_REPLICA_CHECK_INTERVAL
+            )
+        schema_extractor = SchemaExtractor(db=db)
+        schema_catalog = SchemaCatalog(
+            schema_extractor,
+            cache_path=Config.SCHEMA_CACHE_PATH,
+            check_interval=Config.SCHEMA_CHECK_INTERVAL
+        )
+        schema_retriever = SchemaRetriever(
+            schema_catalog,
+            schema_extractor,
+            max_tables=Config.SCHEMA_CONTEXT_MAX_TABLES,
+            max_columns=Config.SCHEMA_CONTEXT_MAX_COLUMNS
+        )
+
+        response_cache = None
+        if Config.RESPONSE_CACHE_ENABLED:
+            response_cache = ResponseCache(
+                create_cache_backend(
+                    Config.RESPONSE_CACHE_BACKEND,
+                    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+                    url=Config.RESPONSE_CACHE_URL
+                ),
+                # Write counters don't advance on a standby, so watermarks come from the primary
+                primary_db,
+                schema_catalog,
+                ttls=Config.RESPONSE_CACHE_TTLS,
+                watermark_interval=Config.RESPONSE_CACHE_WATERMARK_INTERVAL
+            )
+
+        sql_cache = None
+        if Config.SQL_CACHE_ENABLED:
+            sql_cache = SqlTemplateCache(schema_catalog, max_entries=Config.SQL_CACHE_MAX_ENTRIES)
+
+        # Project names for the intercepts (refreshed incrementally from updatedAt)
+        project_index = ProjectIndex(db, refresh_interval=Config.PROJECT_INDEX_REFRESH_INTERVAL)
+
+        # Precomputed phase/invoice/dashboard aggregates (refreshed in the background)
+        rollups = None
+        if Config.ROLLUPS_ENABLED:
+            rollups = ProjectRollups(
+                db,
+                schema_catalog,
+                refresh_interval=Config.ROLLUP_REFRESH_INTERVAL,
+                max_age=Config.ROLLUP_MAX_AGE
+            )
+
+        # Rule-based intents answered without the LLM (built-ins plus INTENT_ROUTES_PATH)
+        intent_router = IntentRouter(BUILTIN_INTENTS + load_intent_file(Config.INTENT_ROUTES_PATH))
+
+        # Cross-entity search (pg_trgm when indexed, else ILIKE plus the project index)
+        search_engine = SearchEngine(db, project_index, limit=Config.SEARCH_RESULT_LIMIT)
+
+        # Initialize chat handler
+        chat_handler = ChatHandler(
+            api_key=Config.GEMINI_API_KEY,
+            db=db,
+            schema_extractor=schema_extractor,
+            schema_catalog=schema_catalog,
+            schema_retriever=schema_retriever,
+            combined_planning=Config.LLM_COMBINED_PLANNING,
+            result_formatter=ResultFormatter(
+                max_table_rows=Config.RESULT_FORMAT_MAX_ROWS,
+                max_columns=Config.RESULT_FORMAT_MAX_COLUMNS
+            ),
+            format_policy=Config.RESULT_FORMAT_POLICY,
+            response_cache=response_cache,
+            sql_cache=sql_cache,
+            response_timeout=Config.RESPONSE_TIMEOUT or None,
+            project_index=project_index,
+            intent_router=intent_router,
+            rollups=rollups,
+            search_engine=search_engine
+        )
+
+        # Bounded conversation store; use the sqlite/redis backend to share across workers
+        conversation_store = create_conversation_store(
+            Config.CONVERSATION_STORE_BACKEND,
+            url=Config.CONVERSATION_STORE_URL,
+            max_messages=Config.MAX_CONVERSATION_LENGTH,
+            ttl=Config.CONVERSATION_TTL,
+            max_chats=Config.CONVERSATION_MAX_CHATS
+        )
+    except Exception:
+        # Don't leave a half-built pool open between attempts
+        db.close()
+        raise
+
+    # The schema catalog was warmed by ChatHandler and the project index on load
+    return dict(
+        query_guard=query_guard,
+        primary_db=primary_db,
+        db=db,
+        schema_extractor=schema_extractor,
+        schema_catalog=schema_catalog,
+        schema_retriever=schema_retriever,
+        response_cache=response_cache,
+        sql_cache=sql_cache,
+        project_index=project_index,
+        rollups=rollups,
+        intent_router=intent_router,
+        search_engine=search_engine,
+        chat_handler=chat_handler,
+        conversation_store=conversation_store
+    )
+
+
+# ---- startup ----
+
+def init():
+    """Build the services in this thread (a no-op once they are ready).
+
+    Raises when the database can't be reached; nothing is published then,
+    so a later call starts over.
+    """
+    global _state, _error, _attempts, _startup_seconds
+    with _init_lock:
+        if _ready.is_set():
+            return
+        _state = STARTUP_STARTING
+        _attempts += 1
+        started = time.monotonic()
+        try:
+            built = _build()
+        except Exception as e:
+            _state, _error = STARTUP_FAILED, str(e)
+            raise
+        globals().update(built)
+        _startup_seconds = round(time.monotonic() - started, 3)
+        _state, _error = STARTUP_READY, None
+        _ready.set()
+    logger.info(f"Services ready in {_startup_seconds}s")
+
+def _init_until_ready():
+    delay = 1
+    while True:
+        try:
+            init()
+            return
+        except Exception as e:
+            logger.error(f"Service startup failed (attempt {_attempts}), retrying in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_DELAY)
+
+def start():
+    """Run init() on a background thread, retrying until it succeeds (idempotent)."""
+    global _thread
+    with _start_lock:
+        if _ready.is_set() or (_thread is not None and _thread.is_alive()):
+            return
+        _thread = threading.Thread(target=_init_until_ready, name='services-init', daemon=True)
+        _thread.start()
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    """Block until the services are ready or ``timeout`` seconds pass; True if ready."""
+    return _ready.wait(timeout)
+
+def status() -> Dict:
+    """Startup state for /api/health: idle, starting, ready or failed (while retrying)."""
+    return {
+        'state': _state,
+        'error': _error,
+        'attempts': _attempts,
+        'startup_seconds': _startup_seconds
+    }
+
+
+# ---- metrics read at scrape time (/api/metrics) ----
+
+def _pools():
+    if not _ready.is_set():
+        return []
+    pools = [('primary', primary_db)]
+    pools += [(name, replica) for name, replica in getattr(db, 'replicas', {}).items()]
+    if chat_handler.async_db is not None:
+        pools.append(('async', getattr(chat_handler.async_db, 'primary', chat_handler.async_db)))
+    return pools
+
+def _pool_samples():
+    for name, connector in _pools():
+        stats = connector.get_pool_stats()
+        if not stats.get('pooled'):
+            continue
+        for state in ('in_use', 'available', 'waiting'):
+            yield {'pool': name, 'state': state}, stats[state]
+
+def _pool_wait_samples():
+    for name, connector in _pools():
+        stats = connector.get_pool_stats()
+        if stats.get('pooled'):
+            yield {'pool': name}, stats['checkout_timeouts']
+
+def _cache_samples():
+    for name, cache in (('response', response_cache), ('sql', sql_cache)):
+        if cache is not None:
+            yield {'cache': name, 'result': 'hit'}, cache.hits
+            yield {'cache': name, 'result': 'miss'}, cache.misses
+
+def _cache_ratio_samples():
+    for name, cache in (('response', response_cache), ('sql', sql_cache)):
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            yield {'cache': name}, cache.hits / lookups if lookups else 0.0
+
+def _intent_samples():
+    if intent_router is None:
+        return
+    yield {'result': 'hit'}, sum(intent_router.hits.values())
+    yield {'result': 'miss'}, intent_router.misses
+
+def _guard_samples():
+    if query_guard is not None:
+        for result in ('checked', 'rejected', 'limited'):
+            yield {'result': result}, getattr(query_guard, result)
+
+def _ready_samples():
+    yield {}, 1 if _ready.is_set() else 0
+
+telemetry.REGISTRY.register_collector(
+    'chatbot_ready', 'Whether the services have started (database connected, caches warm)', 'gauge', _ready_samples)
+telemetry.REGISTRY.register_collector(
+    'chatbot_db_pool_connections', 'Pooled database connections by state', 'gauge', _pool_samples)
+telemetry.REGISTRY.register_collector(
+    'chatbot_db_pool_checkout_timeouts_total', 'Timed-out waits for a pooled connection', 'counter', _pool_wait_samples)
+telemetry.REGISTRY.register_collector(
+    'chatbot_cache_lookups_total', 'Answer and SQL cache lookups', 'counter', _cache_samples)
+telemetry.REGISTRY.register_collector(
+    'chatbot_cache_hit_ratio', 'Answer and SQL cache hit ratio', 'gauge', _cache_ratio_samples)
+telemetry.REGISTRY.register_collector(
+    'chatbot_intent_router_total', 'Questions answered by a rule-based intent vs sent on', 'counter', _intent_samples)
+telemetry.REGISTRY.register_collector(
+    'chatbot_query_guard_total', 'Generated SQL checked, rejected or given a LIMIT', 'counter', _guard_samples)
+
+telemetry.configure_tracing(
+    file_path=Config.TRACE_EXPORT_FILE,
+    endpoint=Config.TRACE_EXPORT_ENDPOINT,
+    service_name=Config.TRACE_SERVICE_NAME
+)
+
+# ---- process lifecycle (see gunicorn.conf.py) ----
+
+def close_connections():
+    """Close the database pools (worker exit, or the preloading master before it forks)."""
+    if db is not None:
+        db.close()
+
+def after_fork():
+    """Give a freshly forked worker its own connections and background threads.
+
+    Pooled connections and pool threads aren't usable after fork(), so the
+    master closes its pools once the app is loaded and each worker opens
+    new ones; the caches built while preloading are inherited as they are.
+    If the master couldn't start the services, the worker starts them itself.
+    """
+    telemetry.after_fork()
+    if not _ready.is_set():
+        start()
+        return
+    primary_db.connect()
+    for service in (db, rollups, conversation_store):
+        # Looked up on the class: ReplicaRouter delegates unknown attributes to the primary
+        if hasattr(type(service), 'after_fork'):
+            service.after_fork()
@@ -0,0 +1,312 @@
+"""
+Metrics and tracing for the chat pipeline.
+
+Metrics (counters, histograms and scrape-time collectors) live in a small
+in-process registry rendered in the Prometheus text format at /api/metrics;
+with several workers, each worker exposes its own series. Each chat request
+can also be exported as a trace (a root span plus one span per pipeline
+stage) in OTLP/JSON, either appended to a local file or posted to an
+OpenTelemetry collector's HTTP endpoint from a background thread.
+"""
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % _number(float(bound))
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(float(series[-2]))}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, name: str, help: str, kind: str,
+                           collect: Callable[[], Iterable[Tuple[Dict, float]]]):
+        """Add a gauge/counter read at scrape time: ``collect()`` yields (labels, value)."""
+        self._collectors.append((name, help, kind, collect))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help, kind, collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.error(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                names = tuple(sorted(labels))
+                lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    'chatbot_requests_total', 'Chat requests by answer category and outcome', ('category', 'outcome')
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'chatbot_request_seconds', 'End-to-end chat request latency', ('category',)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    'chatbot_stage_seconds', 'Latency of each chat pipeline stage', ('stage',)
+)
+LLM_SECONDS = REGISTRY.histogram(
+    'chatbot_llm_seconds', 'Gemini call latency (streams: until the last chunk)', ('call',)
+)
+LLM_TOKENS = REGISTRY.counter(
+    'chatbot_llm_tokens_total', 'Gemini tokens used', ('call', 'kind')
+)
+LLM_ERRORS = REGISTRY.counter(
+    'chatbot_llm_errors_total', 'Failed Gemini calls', ('call',)
+)
+DB_SECONDS = REGISTRY.histogram(
+    'chatbot_db_query_seconds', 'Database statement latency', ('operation',)
+)
+DB_ERRORS = REGISTRY.counter(
+    'chatbot_db_errors_total', 'Failed database statements', ('operation', 'error')
+)
+
+def observe_llm(call: str, seconds: float, response=None):
+    """Record one Gemini call's latency and (when reported) its token usage."""
+    LLM_SECONDS.observe(seconds, call=call)
+    usage = getattr(response, 'usage_metadata', None) if response is not None else None
+    if usage is None:
+        return
+    for kind, field in (('prompt', 'prompt_token_count'), ('completion', 'candidates_token_count')):
+        count = getattr(usage, field, None)
+        if count:
+            LLM_TOKENS.inc(count, call=call, kind=kind)
+
+def observe_db(operation: str, seconds: float, error: Optional[Exception] = None):
+    DB_SECONDS.observe(seconds, operation=operation)
+    if error is not None:
+        DB_ERRORS.inc(operation=operation, error=type(error).__name__)
+
+@contextmanager
+def timed_db(operation: str):
+    """Time a database call (failures are counted by exception type)."""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        observe_db(operation, time.perf_counter() - started, error)
+
+def record_request(timer, category: Optional[str], outcome: str):
+    """Record a finished request's stage and total latencies, and export its trace."""
+    category = category or 'none'
+    REQUESTS.inc(category=category, outcome=outcome)
+    REQUEST_SECONDS.observe(timer.total_ms() / 1000, category=category)
+    for name, _, duration_ns in timer.spans:
+        STAGE_SECONDS.observe(duration_ns / 1e9, stage=name)
+    if _exporter is not None:
+        _exporter.export(timer, {'chat.category': category, 'chat.outcome': outcome})
+
+# ---- traces (OTLP/JSON) ----
+
+def _attributes(values: Dict) -> List[Dict]:
+    return [{'key': k, 'value': {'stringValue': str(v)}} for k, v in values.items()]
+
+class SpanExporter:
+    def __init__(self, file_path: Optional[str] = None, endpoint: Optional[str] = None,
+                 service_name: str = 'construction-chatbot', max_queue: int = 1000):
+        """Export request traces as OTLP/JSON to a file (one line per batch) and/or a collector.
+
+        ``endpoint`` is an OTLP/HTTP traces URL such as
+        http://localhost:4318/v1/traces. Traces are queued and written by a
+        background thread; when the queue is full new traces are dropped.
+        """
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        if file_path:
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        self.start()
+
+    def start(self):
+        """Start the export thread (again, in a forked worker)."""
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        threading.Thread(target=self._run, name='span-exporter', daemon=True).start()
+
+    def export(self, timer, attributes: Dict):
+        """Queue a request trace built from a StageTimer's spans."""
+        trace_id = f"{random.getrandbits(128):032x}"
+        root_id = f"{random.getrandbits(64):016x}"
+        spans = [{
+            'traceId': trace_id,
+            'spanId': root_id,
+            'name': 'chat.request',
+            'kind': 2,  # SERVER
+            'startTimeUnixNano': str(timer.started_ns),
+            'endTimeUnixNano': str(timer.started_ns + int(timer.total_ms() * 1e6)),
+            'attributes': _attributes(attributes),
+        }]
+        for name, start_ns, duration_ns in timer.spans:
+            spans.append({
+                'traceId': trace_id,
+                'spanId': f"{random.getrandbits(64):016x}",
+                'parentSpanId': root_id,
+                'name': f"chat.{name}",
+                'kind': 1,  # INTERNAL
+                'startTimeUnixNano': str(start_ns),
+                'endTimeUnixNano': str(start_ns + duration_ns),
+            })
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _payload(self, batch: List[Dict]) -> Dict:
+        return {'resourceSpans': [{
+            'resource': {'attributes': _attributes({'service.name': self.service_name})},
+            'scopeSpans': [{'scope': {'name': 'chatbot'}, 'spans': batch}],
+        }]}
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            # Send whatever else is already waiting in the same payload
+            while len(batch) < 500:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            body = json.dumps(self._payload(batch))
+            try:
+                if self.file_path:
+                    with open(self.file_path, 'a') as f:
+                        f.write(body + "\n")
+                if self.endpoint:
+                    import urllib.request  # only needed with a collector; slow to import
+                    request = urllib.request.Request(
+                        self.endpoint, data=body.encode(), method='POST',
+                        headers={'Content-Type': 'application/json'}
+                    )
+                    urllib.request.urlopen(request, timeout=5).close()
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.warning(f"Trace export failed: {e}")
+
+    def stats(self) -> Dict:
+        return {'exported_spans': self.exported, 'dropped_traces': self.dropped, 'failed_spans': self.failed}
+
+_exporter: Optional[SpanExporter] = None
+
+def after_fork():
+    """Restart the trace export thread in a forked worker."""
+    if _exporter is not None:
+        _exporter.start()
+
+def configure_tracing(file_path: Optional[str] = None, endpoint: Optional[str] = None,
+                      service_name: str = 'construction-chatbot') -> Optional[SpanExporter]:
+    """Enable trace export (no-op when neither a file nor an endpoint is given)."""
+    global _exporter
+    if not file_path and not endpoint:
+        return None
+    _exporter = SpanExporter(file_path, endpoint, service_name)
+    logger.info(f"Exporting traces to {file_path or ''}{' and ' if file_path and endpoint else ''}{endpoint or ''}")
+    return _exporter
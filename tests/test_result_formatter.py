@@ -0,0 +1,15 @@
+from decimal import Decimal
+from chatbot.result_formatter import ResultFormatter
+
+
+def test_integer_total_is_a_count():
+    text = ResultFormatter().format('How many phases per project?', [{'name': 'CABOT-1A', 'total': 7}], force=True)
+    assert '**Total:** 7' in text
+    assert '$' not in text
+
+
+def test_numeric_amounts_are_currency():
+    formatter = ResultFormatter()
+    assert formatter.format_value('total', Decimal('1234.5')) == '$1,234.50'
+    assert formatter.format_value('totalAmount', 99.0) == '$99.00'
+    assert formatter.format_value('paid', 3) == '3'
@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+"""
+from config import ProductionConfig
+from main import create_app
+
+# Services are started by gunicorn.conf.py (in the master, before it forks)
+app = create_app(ProductionConfig, warm_services=False)